@@ -0,0 +1,129 @@
+"""Read-only command line queries, answered without loading GTK.
+
+Listing games only needs the PGA database, so these commands skip the GUI
+setup, the migrations and the system checks. Nothing in this module may
+import GI.
+"""
+import json
+import logging
+import os
+import sys
+
+from lutris import pga, settings
+from lutris.util.log import logger
+
+# Options that can be answered without the GUI, with the commands they select.
+# When several are given, the first command of HEADLESS_COMMAND_ORDER runs,
+# as in Application.do_command_line.
+HEADLESS_COMMAND_ORDER = ("version", "list-games")
+HEADLESS_COMMANDS = {
+    "-v": "version",
+    "--version": "version",
+    "-l": "list-games",
+    "--list-games": "list-games",
+}
+# Options modifying the output of the commands
+HEADLESS_FLAGS = {
+    "-o": "installed",
+    "--installed": "installed",
+    "-j": "json",
+    "--json": "json",
+    "-d": "debug",
+    "--debug": "debug",
+}
+# Options taking a value that don't change the output
+HEADLESS_VALUE_OPTIONS = ("--trace", )
+
+
+def parse_headless_args(argv):
+    """Return the command and the flags given in `argv`, or None if the
+    command line needs the GUI application.
+    """
+    args = []
+    for arg in argv[1:]:
+        if len(arg) > 2 and arg[0] == "-" and arg[1] != "-":
+            # Grouped short options like -lo
+            args += ["-" + char for char in arg[1:]]
+        else:
+            args.append(arg)
+    commands = set()
+    flags = set()
+    skip_value = False
+    for arg in args:
+        if skip_value:
+            skip_value = False
+        elif arg in HEADLESS_COMMANDS:
+            commands.add(HEADLESS_COMMANDS[arg])
+        elif arg in HEADLESS_FLAGS:
+            flags.add(HEADLESS_FLAGS[arg])
+        elif arg in HEADLESS_VALUE_OPTIONS:
+            skip_value = True
+        elif not arg.startswith(tuple(option + "=" for option in HEADLESS_VALUE_OPTIONS)):
+            return None
+    for command in HEADLESS_COMMAND_ORDER:
+        if command in commands:
+            return command, flags
+    return None
+
+
+def format_game_list(game_list):
+    """Return the lines listing games for --list-games"""
+    return [
+        "{:4} | {:<40} | {:<40} | {:<15} | {:<64}".format(
+            game["id"],
+            game["name"][:40],
+            game["slug"][:40],
+            game["runner"] or "-",
+            game["directory"] or "-",
+        )
+        for game in game_list
+    ]
+
+
+def format_game_json(game_list):
+    """Return games in JSON for --list-games --json"""
+    games = [
+        {
+            "id": game["id"],
+            "slug": game["slug"],
+            "name": game["name"],
+            "runner": game["runner"],
+            "directory": game["directory"],
+        }
+        for game in game_list
+    ]
+    return json.dumps(games, indent=2)
+
+
+def run_headless(argv):
+    """Run a read-only command if `argv` only asks for one.
+
+    Returns the exit status of the command, or None if the command line
+    must be handled by the GUI application.
+    """
+    parsed_args = parse_headless_args(argv)
+    if not parsed_args:
+        return None
+    command, flags = parsed_args
+    if command == "list-games" and not os.path.exists(settings.PGA_DB):
+        # The application creates the database
+        return None
+    if "debug" in flags:
+        logger.setLevel(logging.DEBUG)
+
+    lines = []
+    if command == "version":
+        lines = [os.path.basename(argv[0]) + "-" + settings.VERSION]
+    elif command == "list-games":
+        game_list = pga.get_games(
+            filter_installed="installed" in flags,
+            select="id, name, slug, runner, directory"
+        )
+        if "json" in flags:
+            lines = [format_game_json(game_list)]
+        else:
+            lines = format_game_list(game_list)
+    for line in lines:
+        sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+    return 0
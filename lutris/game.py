@@ -8,13 +8,14 @@ import subprocess
 from gi.repository import GLib, Gtk, GObject
 
 from lutris import pga
-from lutris import runtime
 from lutris.exceptions import GameConfigError, watch_lutris_errors
 from lutris.util import xdgshortcuts
 from lutris.runners import import_runner, InvalidRunner, wine
+from lutris.runners.runner import Runner
 from lutris.util import audio, jobs, system, strings
 from lutris.util.display import DISPLAY_MANAGER, get_compositor_commands, restore_gamma
 from lutris.util.log import logger
+from lutris.util.manifest import remove_game_files, remove_manifest
 from lutris.config import LutrisConfig
 from lutris.command import MonitoredCommand
 from lutris.gui import dialogs
@@ -27,6 +28,22 @@ from lutris.settings import DEFAULT_DISCORD_CLIENT_ID
 HEARTBEAT_DELAY = 2000
 
 
+def remove_game_data(game_id, runner, game_path):
+    """Delete the files of a game with its runner.
+
+    Runners removing the whole game folder start with the files of the
+    manifest, the folder is then only walked if anything remains in it.
+    """
+    removed_from_manifest = (
+        game_path
+        and type(runner).remove_game_data is Runner.remove_game_data
+        and remove_game_files(game_id, game_path)
+        and not os.path.exists(game_path)
+    )
+    if not removed_from_manifest:
+        runner.remove_game_data(game_path=game_path)
+
+
 class Game(GObject.Object):
     """This class takes cares of loading the configuration for a game
        and running it.
@@ -212,7 +229,7 @@ class Game(GObject.Object):
         """
         if from_disk and self.runner:
             logger.debug("Removing game %s from disk", self.id)
-            self.runner.remove_game_data(game_path=self.directory)
+            remove_game_data(self.id, self.runner, self.directory)
 
         # Do not keep multiple copies of the same game
         existing_games = pga.get_games_where(slug=self.slug)
@@ -224,6 +241,8 @@ class Game(GObject.Object):
             pga.delete_game(self.id)
         else:
             pga.set_uninstalled(self.id)
+        if from_disk or from_library:
+            remove_manifest(self.id)
         if self.config:
             self.config.remove()
         xdgshortcuts.remove_launcher(self.slug, self.id, desktop=True, menu=True)
@@ -273,13 +292,6 @@ class Game(GObject.Object):
             if not installed:
                 return False
 
-        if self.runner.use_runtime():
-            runtime_updater = runtime.RuntimeUpdater()
-            if runtime_updater.is_updating():
-                logger.warning("Runtime updates: %s", runtime_updater.current_updates)
-                dialogs.ErrorDialog(
-                    "Runtime currently updating", "Game might not work as expected"
-                )
         if (
                 "wine" in self.runner_name
                 and not wine.get_system_wine_version()
@@ -15,7 +15,6 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import json
 import logging
 import os
 import signal
@@ -34,21 +33,27 @@ from gi.repository import Gio, GLib, Gtk
 from lutris import pga
 from lutris.game import Game
 from lutris import settings
-from lutris.gui.dialogs import ErrorDialog, InstallOrPlayDialog
+from lutris.gui.dialogs import DontShowAgainDialog, ErrorDialog, InstallOrPlayDialog
 from lutris.gui.dialogs.issue import IssueReportWindow
 from lutris.gui.installerwindow import InstallerWindow
 from lutris.gui.widgets.status_icon import LutrisStatusIcon
 from lutris.migrations import migrate
 from lutris.command import exec_command
+from lutris.cli import format_game_json, format_game_list
 from lutris.util.steam.appmanifest import AppManifest, get_appmanifests
 from lutris.util.steam.config import get_steamapps_paths
 from lutris.util import datapath
 from lutris.util import log
 from lutris.util.jobs import AsyncCall
 from lutris.util.log import logger
+from lutris.util.disk_usage import DISK_USAGE
+from lutris.util.manifest import InstallManifest
+from lutris.util.strings import get_formatted_size
+from lutris.util.tracing import TRACER
+from lutris.util.media_cache import MEDIA_MISSES
 from lutris.util.http import Request, HTTPError
 from lutris.api import parse_installer_url
-from lutris.startup import init_lutris, run_all_checks
+from lutris.startup import fill_missing_platforms, init_lutris, pop_deferred_dialogs, run_all_checks
 from lutris.util.wine.dxvk import init_dxvk_versions, wait_for_dxvk_init
 
 from .lutriswindow import LutrisWindow
@@ -145,6 +150,22 @@ class Application(Gtk.Application):
             "reinstall", 0, GLib.OptionFlags.NONE, GLib.OptionArg.NONE,
             _("Reinstall game"), None,
         )
+        self.add_main_option(
+            "clear-media-cache", 0, GLib.OptionFlags.NONE, GLib.OptionArg.NONE,
+            _("Look up again media previously found to be unavailable"), None
+        )
+        self.add_main_option(
+            "disk-usage", 0, GLib.OptionFlags.NONE, GLib.OptionArg.NONE,
+            _("Show the disk space used by installed games and runners"), None,
+        )
+        self.add_main_option(
+            "verify", 0, GLib.OptionFlags.NONE, GLib.OptionArg.STRING,
+            _("Check the installed files of a game"), "GAME_SLUG",
+        )
+        self.add_main_option(
+            "trace", 0, GLib.OptionFlags.NONE, GLib.OptionArg.STRING,
+            _("Write a trace of the time spent starting Lutris (Chrome trace format)"), "FILE",
+        )
         self.add_main_option(
             "submit-issue", 0, GLib.OptionFlags.NONE, GLib.OptionArg.NONE,
             _("Submit an issue"), None
@@ -165,18 +186,31 @@ class Application(Gtk.Application):
 
     def do_activate(self):
         if not self.window:
-            self.window = LutrisWindow(application=self)
+            with TRACER.span("LutrisWindow"):
+                self.window = LutrisWindow(application=self)
             screen = self.window.props.screen
             Gtk.StyleContext.add_provider_for_screen(
                 screen, self.css_provider, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
             )
         if not self.run_in_background:
             self.window.present()
+            self.show_deferred_dialogs()
         else:
             # Reset run in background to False. Future calls will set it
             # accordingly
             self.run_in_background = False
 
+    def on_startup_checks_done(self, _passed_checks, _error):
+        fill_missing_platforms()
+        self.show_deferred_dialogs()
+
+    def show_deferred_dialogs(self):
+        """Show the dialogs of the startup checks if the main window is visible"""
+        if not self.window or not self.window.get_visible():
+            return
+        for dialog in pop_deferred_dialogs():
+            DontShowAgainDialog(parent=self.window, **dialog)
+
     def show_window(self, window_class, **kwargs):
         """Instanciate a window keeping 1 instance max
 
@@ -242,9 +276,20 @@ class Application(Gtk.Application):
             logger.setLevel(logging.NOTSET)
             return 0
 
+        # Maintenance commands, run without the migrations and DXVK updates
+        if options.contains("clear-media-cache"):
+            MEDIA_MISSES.invalidate()
+            return 0
+
+        if options.contains("disk-usage"):
+            self.print_disk_usage(command_line)
+            return 0
+
+        if options.contains("verify"):
+            return self.verify_game(command_line, options.lookup_value("verify").get_string())
+
         logger.info("Running Lutris %s", settings.VERSION)
         migrate()
-        run_all_checks()
         AsyncCall(init_dxvk_versions)
 
         # List game
@@ -339,6 +384,10 @@ class Application(Gtk.Application):
                 )
 
         # Graphical commands
+        if not self.window:
+            # The checks don't delay the main window, their dialogs are
+            # shown once it is visible.
+            AsyncCall(run_all_checks, self.on_startup_checks_done)
         self.activate()
         self.set_tray_icon()
 
@@ -427,30 +476,53 @@ class Application(Gtk.Application):
         return installer_info
 
     def print_game_list(self, command_line, game_list):
-        for game in game_list:
+        for line in format_game_list(game_list):
+            self._print(command_line, line)
+
+    def print_game_json(self, command_line, game_list):
+        self._print(command_line, format_game_json(game_list))
+
+    def print_disk_usage(self, command_line):
+        DISK_USAGE.update_games()
+        games = sorted(
+            pga.get_games(filter_installed=True),
+            key=lambda game: game["disk_size"] or 0,
+            reverse=True
+        )
+        for game in games:
             self._print(
                 command_line,
-                "{:4} | {:<40} | {:<40} | {:<15} | {:<64}".format(
-                    game["id"],
+                "{:>10} | {:<40} | {}".format(
+                    get_formatted_size(game["disk_size"]) if game["disk_size"] else "-",
                     game["name"][:40],
-                    game["slug"][:40],
-                    game["runner"] or "-",
                     game["directory"] or "-",
-                ),
+                )
+            )
+        for runner, size in DISK_USAGE.get_runner_sizes().items():
+            self._print(command_line, "{:>10} | runner {}".format(get_formatted_size(size), runner))
+        if os.path.isdir(settings.RUNTIME_DIR):
+            self._print(
+                command_line,
+                "{:>10} | runtime".format(get_formatted_size(DISK_USAGE.get_size(settings.RUNTIME_DIR)))
             )
 
-    def print_game_json(self, command_line, game_list):
-        games = [
-            {
-                "id": game["id"],
-                "slug": game["slug"],
-                "name": game["name"],
-                "runner": game["runner"],
-                "directory": game["directory"],
-            }
-            for game in game_list
-        ]
-        self._print(command_line, json.dumps(games, indent=2))
+    def verify_game(self, command_line, game_slug):
+        """Print the files of a game that were modified or deleted since
+        it was installed.
+        """
+        game = pga.get_game_by_field(game_slug, "slug")
+        if not game or not game["directory"]:
+            self._print(command_line, "%s is not installed" % game_slug)
+            return 1
+        manifest = InstallManifest.for_game(game["id"], game["directory"])
+        if not manifest.entries:
+            self._print(command_line, "No installed files recorded for %s" % game_slug)
+            return 1
+        damaged = manifest.verify()
+        for relpath, status in damaged.items():
+            self._print(command_line, "{:<8} {}".format(status, relpath))
+        self._print(command_line, "%d of %d files damaged" % (len(damaged), len(manifest.entries)))
+        return 1 if damaged else 0
 
     def print_steam_list(self, command_line):
         steamapps_paths = get_steamapps_paths()
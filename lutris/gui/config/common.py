@@ -1,7 +1,6 @@
 """Shared config dialog stuff"""
 # pylint: disable=no-member,not-an-iterable
 import importlib
-import os
 from gi.repository import Gtk, Gdk, Pango, GLib
 from lutris.game import Game
 from lutris.config import LutrisConfig, make_game_config_id
@@ -21,6 +20,7 @@ from lutris.gui.widgets.utils import (
 )
 from lutris.util.strings import slugify
 from lutris.util import resources
+from lutris.util.media_cache import MEDIA_MISSES
 from lutris.util.linux import gather_system_info_str
 
 
@@ -583,6 +583,7 @@ class GameDialogCommon:
                 file_format = "png"
             pixbuf = get_pixbuf(image_path, size)
             pixbuf.savev(dest_path, file_format, [], [])
+            resources.store_media(self.game.slug, image_type, dest_path)
             self._set_image(image_type)
 
             if image_type == "icon":
@@ -593,11 +594,10 @@ class GameDialogCommon:
     def on_custom_image_reset_clicked(self, _widget, image_type):
         if image_type == "banner":
             self.game.has_custom_banner = False
-            dest_path = resources.get_banner_path(self.game.slug)
         elif image_type == "icon":
             self.game.has_custom_icon = False
-            dest_path = resources.get_icon_path(self.game.slug)
         else:
             raise ValueError("Unsupported image type %s" % image_type)
-        os.remove(dest_path)
+        resources.remove_media(self.game.slug, image_type)
+        MEDIA_MISSES.remove(self.game.slug, image_type)
         self._set_image(image_type)
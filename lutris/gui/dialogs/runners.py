@@ -15,11 +15,11 @@ from lutris.gui.config.runner import RunnerConfigDialog
 from lutris.gui.widgets.utils import get_icon, ICON_SIZE, get_builder_from_file, open_uri
 
 
-def simple_downloader(url, destination, callback, callback_args=None):
+def simple_downloader(url, destination, callback, callback_args=None, downloader=None):
     """Default downloader used for runners"""
     if not callback_args:
         callback_args = {}
-    dialog = DownloadDialog(url, destination)
+    dialog = DownloadDialog(url, destination, downloader=downloader)
     dialog.run()
     return callback(**callback_args)
 
@@ -309,12 +309,14 @@ class InstallerWindow(BaseApplicationWindow):
         self.interpreter.file_selected(file_path)
 
     def start_download(
-        self, file_uri, dest_file, callback=None, data=None, referer=None
+        self, file_uri, dest_file, callback=None, data=None, referer=None, downloader=None
     ):
         self.clean_widgets()
         logger.debug("Downloading %s to %s", file_uri, dest_file)
         self.download_progress = DownloadProgressBox(
-            {"url": file_uri, "dest": dest_file, "referer": referer}, cancelable=True
+            {"url": file_uri, "dest": dest_file, "referer": referer},
+            cancelable=True,
+            downloader=downloader
         )
         self.download_progress.cancel_button.hide()
         self.download_progress.connect("complete", self.on_download_complete, callback, data)
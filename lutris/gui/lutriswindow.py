@@ -13,6 +13,7 @@ from lutris.gui.installerwindow import InstallerWindow
 from lutris.runtime import RuntimeUpdater
 
 from lutris.util.log import logger
+from lutris.util.disk_usage import DISK_USAGE
 from lutris.util.jobs import AsyncCall
 
 from lutris.util import http
@@ -161,6 +162,7 @@ class LutrisWindow(Gtk.ApplicationWindow):
         self.panel_revealer.set_reveal_child(self.right_side_panel_visible)
         self.panel_revealer.set_transition_duration(300)
         self.update_runtime()
+        self.update_disk_usage()
 
         # Connect account and/or sync
         credentials = api.read_api_key()
@@ -578,6 +580,17 @@ class LutrisWindow(Gtk.ApplicationWindow):
         self.sync_button.set_sensitive(False)
         AsyncCall(sync_from_remote, update_gui)
 
+    def update_disk_usage(self):
+        """Measure the size of installed games in the background"""
+        def update_gui(updated_ids, error):
+            if error:
+                logger.error("Failed to measure the size of games: %s", error)
+                return
+            for game_id in updated_ids:
+                self.game_store.update_game_by_id(game_id)
+
+        AsyncCall(DISK_USAGE.update_games, update_gui)
+
     def open_sync_dialog(self):
         """Opens the service sync dialog"""
         self.add_popover.hide()
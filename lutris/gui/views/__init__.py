@@ -15,7 +15,9 @@
     COL_INSTALLED_AT_TEXT,
     COL_PLAYTIME,
     COL_PLAYTIME_TEXT,
-) = list(range(15))
+    COL_DISK_SIZE,
+    COL_DISK_SIZE_TEXT,
+) = list(range(17))
 
 COLUMN_NAMES = {
     COL_NAME: "name",
@@ -25,4 +27,5 @@ COLUMN_NAMES = {
     COL_LASTPLAYED_TEXT: "lastplayed",
     COL_INSTALLED_AT_TEXT: "installed_at",
     COL_PLAYTIME_TEXT: "playtime",
+    COL_DISK_SIZE_TEXT: "disk_size",
 }
@@ -16,6 +16,8 @@ from lutris.gui.views import (
     COL_INSTALLED_AT_TEXT,
     COL_PLAYTIME,
     COL_PLAYTIME_TEXT,
+    COL_DISK_SIZE,
+    COL_DISK_SIZE_TEXT,
     COLUMN_NAMES
 )
 
@@ -53,6 +55,8 @@ class GameListView(Gtk.TreeView, GameView):
         self.set_sort_with_column(COL_INSTALLED_AT_TEXT, COL_INSTALLED_AT)
         self.set_column(default_text_cell, "Play Time", COL_PLAYTIME_TEXT, 100)
         self.set_sort_with_column(COL_PLAYTIME_TEXT, COL_PLAYTIME)
+        self.set_column(default_text_cell, "Disk Size", COL_DISK_SIZE_TEXT, 100)
+        self.set_sort_with_column(COL_DISK_SIZE_TEXT, COL_DISK_SIZE)
 
         self.get_selection().set_mode(Gtk.SelectionMode.SINGLE)
 
@@ -3,7 +3,7 @@ import time
 from lutris import runners
 from lutris.game import Game
 from lutris.util.log import logger
-from lutris.util.strings import gtk_safe, get_formatted_playtime
+from lutris.util.strings import gtk_safe, get_formatted_playtime, get_formatted_size
 from lutris.gui.widgets.utils import get_pixbuf_for_game
 
 
@@ -123,3 +123,15 @@ class PgaGame:
             logger.warning("Invalid playtime value %s for %s", self.playtime, self)
             _playtime_text = ""  # Do not show erroneous values
         return _playtime_text
+
+    @property
+    def disk_size(self):
+        """Space used by the game folder in bytes"""
+        return self._pga_data.get("disk_size") or 0
+
+    @property
+    def disk_size_text(self):
+        """Space used by the game folder (textual representation)"""
+        if not self.disk_size:
+            return ""
+        return get_formatted_size(self.disk_size)
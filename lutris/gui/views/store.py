@@ -1,15 +1,16 @@
 """Store object for a list of games"""
 # pylint: disable=not-an-iterable
-import concurrent.futures
 from gi.repository import Gtk, GObject, GLib
 from gi.repository.GdkPixbuf import Pixbuf
 from lutris import pga
 from lutris.gui.widgets.utils import get_pixbuf_for_game
-from lutris.util.resources import get_icon_path, download_media, update_desktop_icons
+from lutris.util.resources import get_icon_path, has_media
+from lutris.util.media_cache import MEDIA_MISSES
+from lutris.util.media_pipeline import MEDIA_PIPELINE
 from lutris.util.log import logger
-from lutris.util import system
 from lutris import api
 from lutris.util.jobs import AsyncCall
+from lutris.util.tracing import traced
 from lutris.gui.views.pga_game import PgaGame
 from . import (
     COL_ID,
@@ -27,6 +28,8 @@ from . import (
     COL_INSTALLED_AT_TEXT,
     COL_PLAYTIME,
     COL_PLAYTIME_TEXT,
+    COL_DISK_SIZE,
+    COL_DISK_SIZE_TEXT,
 )
 
 
@@ -70,7 +73,6 @@ def sort_func(model, row1, row2, sort_col):
 class GameStore(GObject.Object):
     __gsignals__ = {
         "media-loaded": (GObject.SIGNAL_RUN_FIRST, None, ()),
-        "icon-loaded": (GObject.SIGNAL_RUN_FIRST, None, (str, str)),
         "icons-changed": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
         "sorting-changed": (GObject.SIGNAL_RUN_FIRST, None, (str, bool)),
     }
@@ -86,6 +88,8 @@ class GameStore(GObject.Object):
         "installed_at_text": COL_INSTALLED_AT_TEXT,
         "playtime": COL_PLAYTIME,
         "playtime_text": COL_PLAYTIME_TEXT,
+        "disk_size": COL_DISK_SIZE,
+        "disk_size_text": COL_DISK_SIZE_TEXT,
     }
 
     def __init__(
@@ -131,6 +135,8 @@ class GameStore(GObject.Object):
             str,
             float,
             str,
+            GObject.TYPE_INT64,
+            str,
         )
         sort_col = COL_NAME
         if show_installed_first:
@@ -150,11 +156,8 @@ class GameStore(GObject.Object):
         self.modelsort.set_sort_func(sort_col, sort_func, sort_col)
         self.sort_view(sort_key, sort_ascending)
         self.medias = {"banner": {}, "icon": {}}
-        self.banner_misses = set()
-        self.icon_misses = set()
         self.media_loaded = False
         self.connect("media-loaded", self.on_media_loaded)
-        self.connect("icon-loaded", self.on_icon_loaded)
 
     def __str__(self):
         return (
@@ -162,6 +165,7 @@ class GameStore(GObject.Object):
             "filter_text: {filter_text}>".format(**self.__dict__)
         )
 
+    @traced
     def load(self, from_search=False):
         if not self.games:
             return
@@ -183,25 +187,23 @@ class GameStore(GObject.Object):
     def has_icon(self, game_slug, media_type=None):
         """Return True if the game_slug has the icon of `icon_type`"""
         media_type = media_type or self.icon_type
-        return system.path_exists(get_icon_path(game_slug, media_type))
+        return has_media(game_slug, media_type)
 
     def get_missing_media(self, slugs=None):
         """Query the Lutris.net API for missing icons"""
         slugs = slugs or self.game_slugs
         unavailable_banners = {
-            slug for slug in slugs
+            slug for slug in MEDIA_MISSES.filter(slugs, "banner")
             if not self.has_icon(slug, "banner")
         }
         unavailable_icons = {
-            slug for slug in slugs
+            slug for slug in MEDIA_MISSES.filter(slugs, "icon")
             if not self.has_icon(slug, "icon")
         }
+        MEDIA_MISSES.log_stats()
 
         # Remove duplicate slugs
-        missing_media_slugs = (
-            (unavailable_banners - self.banner_misses)
-            | (unavailable_icons - self.icon_misses)
-        )
+        missing_media_slugs = unavailable_banners | unavailable_icons
         if not missing_media_slugs:
             return
         if len(missing_media_slugs) > 10:
@@ -224,8 +226,8 @@ class GameStore(GObject.Object):
             if game["slug"] in unavailable_icons and game["icon_url"]:
                 self.medias["icon"][game["slug"]] = game["icon_url"]
                 unavailable_icons.remove(game["slug"])
-        self.banner_misses = unavailable_banners
-        self.icon_misses = unavailable_icons
+        MEDIA_MISSES.add(unavailable_banners, "banner")
+        MEDIA_MISSES.add(unavailable_icons, "icon")
         self.media_loaded = True
         self.emit("media-loaded")
 
@@ -340,25 +342,14 @@ class GameStore(GObject.Object):
         row[COL_INSTALLED_AT_TEXT] = game.installed_at_text
         row[COL_PLAYTIME] = game.playtime
         row[COL_PLAYTIME_TEXT] = game.playtime_text
+        row[COL_DISK_SIZE] = game.disk_size
+        row[COL_DISK_SIZE_TEXT] = game.disk_size_text
         if not self.has_icon(game.slug):
             self.refresh_icon(game.slug)
 
     def refresh_icon(self, game_slug):
         AsyncCall(self.fetch_icon, None, game_slug)
 
-    def on_icon_loaded(self, _store, game_slug, media_type):
-        if not self.has_icon(game_slug):
-            logger.debug("%s has no %s", game_slug, media_type)
-            return
-        if media_type != self.icon_type:
-            return
-        if self.search_mode:
-            GLib.idle_add(self.update_icon, game_slug)
-            return
-        for pga_game in pga.get_games_by_slug(game_slug):
-            logger.debug("Updating %s", pga_game["id"])
-            GLib.idle_add(self.update, pga_game)
-
     def update_icon(self, game_slug):
         row = self.get_row_by_slug(game_slug)
         row[COL_ICON] = get_pixbuf_for_game(game_slug, self.icon_type, True)
@@ -368,47 +359,44 @@ class GameStore(GObject.Object):
             self.games_to_refresh.add(slug)
             return
 
-        for media_type in ("banner", "icon"):
-            url = self.medias[media_type].get(slug)
-            if url:
-                logger.debug("Getting %s for %s: %s", media_type, slug, url)
-                download_media(url, get_icon_path(slug, media_type))
-                self.emit("icon-loaded", slug, media_type)
+        MEDIA_PIPELINE.fetch([
+            (slug, media_type, self.medias[media_type][slug], get_icon_path(slug, media_type))
+            for media_type in ("banner", "icon")
+            if self.medias[media_type].get(slug)
+        ], self.on_media_batch)
 
     def on_media_loaded(self, _response):
         """Callback to handle a response from the API with the new media"""
         if not self.medias:
             return
-        for media_type in ("banner", "icon"):
-            self.download_icons([
-                (slug, self.medias[media_type][slug], get_icon_path(slug, media_type))
-                for slug in self.medias[media_type]
-            ], media_type)
+        MEDIA_PIPELINE.fetch([
+            (slug, media_type, url, get_icon_path(slug, media_type))
+            for media_type in ("banner", "icon")
+            for slug, url in self.medias[media_type].items()
+        ], self.on_media_batch)
 
-    def download_icons(self, downloads, media_type):
-        """Download a list of media files concurrently.
+    def on_media_batch(self, batch):
+        """Schedule a single view update for a batch of downloaded media.
 
-        Limits the number of simultaneous downloads to avoid API throttling
-        and UI being overloaded with signals.
+        Called from the download threads, rows are updated in the main loop.
         """
-        if not downloads:
-            return
+        GLib.idle_add(self.update_media_rows, batch)
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
-            future_downloads = {
-                executor.submit(download_media, url, dest_path): slug
-                for slug, url, dest_path in downloads
-            }
-            for future in concurrent.futures.as_completed(future_downloads):
-                slug = future_downloads[future]
-                try:
-                    future.result()
-                except Exception as ex:  # pylint: disable=broad-except
-                    logger.exception('%r failed: %s', slug, ex)
-                else:
-                    self.emit("icon-loaded", slug, media_type)
-        if media_type == "icon":
-            update_desktop_icons()
+    def update_media_rows(self, batch):
+        """Refresh the rows of every game in `batch` having the displayed media type"""
+        slugs = {
+            slug for slug, media_type in batch
+            if media_type == self.icon_type and self.has_icon(slug)
+        }
+        if not slugs:
+            return False
+        if self.search_mode:
+            for slug in slugs:
+                self.update_icon(slug)
+            return False
+        for pga_game in pga.get_games_where(slug__in=list(slugs)):
+            self.update(pga_game)
+        return False
 
     def add_games_by_ids(self, game_ids):
         self.add_games(pga.get_games_by_ids(game_ids))
@@ -438,6 +426,8 @@ class GameStore(GObject.Object):
                 game.installed_at_text,
                 game.playtime,
                 game.playtime_text,
+                game.disk_size,
+                game.disk_size_text,
             )
         )
         if not self.has_icon(game.slug):
@@ -1,4 +1,5 @@
 """Various utilities using the GObject framework"""
+import io
 import os
 import array
 try:
@@ -64,6 +65,17 @@ def get_pixbuf(image, size, fallback=None):
     return None
 
 
+def get_pixbuf_from_data(data, size):
+    """Return a pixbuf at `size` from the content of an image file"""
+    width, height = size
+    stream = Gio.MemoryInputStream.new_from_bytes(GLib.Bytes.new(data))
+    try:
+        return GdkPixbuf.Pixbuf.new_from_stream_at_scale(stream, width, height, True, None)
+    except GLib.GError:
+        logger.error("Unable to load icon from image data")
+        return None
+
+
 def get_stock_icon(name, size):
     """Return a picxbuf from a stock icon name"""
     theme = Gtk.IconTheme.get_default()
@@ -124,7 +136,12 @@ def get_pixbuf_for_game(game_slug, icon_type, is_installed=True):
 
     size = IMAGE_SIZES[icon_type]
 
-    pixbuf = get_pixbuf(icon_path, size, fallback=default_icon_path)
+    pixbuf = None
+    media_data = resources.get_media_data(game_slug, icon_type)
+    if media_data:
+        pixbuf = get_pixbuf_from_data(media_data, size)
+    if not pixbuf:
+        pixbuf = get_pixbuf(icon_path, size, fallback=default_icon_path)
     if not is_installed:
         unavailable_game_overlay = os.path.join(datapath.get(), "media/unavailable.png")
         transparent_pixbuf = get_overlay(unavailable_game_overlay, size).copy()
@@ -146,7 +163,10 @@ def get_pixbuf_for_game(game_slug, icon_type, is_installed=True):
 
 
 def convert_to_background(background_path, target_size=(320, 1080)):
-    """Converts a image to a pane background"""
+    """Converts a image to a pane background
+
+    `background_path` can be a path or a file object
+    """
 
     coverart = Image.open(background_path)
     coverart = coverart.convert("RGBA")
@@ -191,8 +211,11 @@ def get_pixbuf_for_panel(game_slug):
     if Image is None:
         # PIL is not available
         return
-    source_path = os.path.join(settings.COVERART_PATH, "%s.jpg" % game_slug)
-    if not os.path.exists(source_path):
+    source_path = resources.get_coverart_path(game_slug)
+    coverart_data = resources.get_media_data(game_slug, "coverart")
+    if coverart_data:
+        source_path = io.BytesIO(coverart_data)
+    elif not os.path.exists(source_path):
         source_path = os.path.join(datapath.get(), "media/generic-panel-bg.png")
     dest_path = os.path.join(settings.CACHE_DIR, "panel_bg.png")
     background = convert_to_background(source_path)
@@ -6,6 +6,7 @@ import shutil
 import shlex
 import json
 import glob
+import threading
 
 from gi.repository import GLib
 
@@ -16,6 +17,7 @@ from lutris.cache import get_cache_path
 from lutris.util import extract, disks, system
 from lutris.util.fileio import EvilConfigParser, MultiOrderedDict
 from lutris.util.log import logger
+from lutris.util.manifest import InstallManifest
 from lutris.util.wine.wine import get_wine_version_exe, WINE_DEFAULT_ARCH
 from lutris.util import selective_merge
 
@@ -175,9 +177,38 @@ class CommandsMixin:
             merge_single = "nomerge" not in data
             extractor = data.get("format")
             logger.debug("extracting file %s to %s", filename, dest_path)
-            self._killable_process(
-                extract.extract_archive, filename, dest_path, merge_single, extractor
+            self._cancellable_extract(filename, dest_path, merge_single, extractor, msg)
+
+    def _cancellable_extract(self, filename, dest_path, merge_single, extractor, msg):
+        """Extract an archive in the installer thread, showing its progress"""
+        last_percent = [None]
+
+        def on_progress(progress):
+            if progress.percent == last_percent[0]:
+                return
+            last_percent[0] = progress.percent
+            progress_text = "%s: %d%% (%0.2fMB/s), %s remaining" % (
+                msg,
+                progress.percent,
+                progress.speed / 1024 / 1024,
+                progress.time_left,
             )
+            GLib.idle_add(self.parent.set_status, progress_text)
+
+        cancel_event = threading.Event()
+        self.abort_current_task = cancel_event.set
+        try:
+            extract.extract_archive(
+                filename,
+                dest_path,
+                merge_single,
+                extractor,
+                callback=on_progress,
+                cancel_event=cancel_event,
+                manifest=self._get_manifest()
+            )
+        finally:
+            self.abort_current_task = None
 
     def input_menu(self, data):
         """Display an input request as a dropdown menu with options."""
@@ -266,12 +297,14 @@ class CommandsMixin:
             # as destination.
             if os.path.dirname(src) != dst:
                 self._killable_process(shutil.copy, src, dst)
+                self._record_files(os.path.join(dst, os.path.basename(src)))
             if params["src"] in self.game_files.keys():
                 self.game_files[params["src"]] = os.path.join(
                     dst, os.path.basename(src)
                 )
             return
         self._killable_process(system.merge_folders, src, dst)
+        self._record_files(src, dst)
 
     def copy(self, params):
         """Alias for merge"""
@@ -295,6 +328,10 @@ class CommandsMixin:
                 # Maybe should display confirmation dialog (Overwrite / Skip) ?
                 logger.info("Destination file exists, skipping")
                 return
+        if os.path.isdir(dst):
+            dst_path = os.path.join(dst, os.path.basename(src))
+        else:
+            dst_path = dst
         try:
             if self._is_cached_file(src):
                 action = shutil.copy
@@ -303,6 +340,7 @@ class CommandsMixin:
             self._killable_process(action, src, dst)
         except shutil.Error:
             raise ScriptingError("Can't move %s \nto destination %s" % (src, dst))
+        self._record_files(dst_path)
 
     def rename(self, params):
         """Rename file or folder."""
@@ -518,6 +556,28 @@ class CommandsMixin:
             file_path = self._substitute(fileid)
         return file_path
 
+    def _get_manifest(self):
+        """Return the manifest recording the files installed in the game folder"""
+        if not self.target_path:
+            return None
+        if not self.manifest or self.manifest.root != os.path.abspath(self.target_path):
+            self.manifest = InstallManifest(self.target_path)
+        return self.manifest
+
+    def _record_files(self, path, destination=None):
+        """Add files copied or moved by the installer to the manifest.
+
+        Files copied from `path` to `destination` are recorded from their
+        source, the copies having the same size and modification time.
+        """
+        manifest = self._get_manifest()
+        if not manifest:
+            return
+        try:
+            manifest.add_tree(path, destination)
+        except OSError as ex:
+            logger.warning("Failed to record %s in the install manifest: %s", path, ex)
+
     def _killable_process(self, func, *args, **kwargs):
         """Run function `func` in a separate, killable process."""
         process = multiprocessing.Pool(1)
@@ -15,6 +15,7 @@ from lutris.util.display import DISPLAY_MANAGER
 from lutris.util.strings import unpack_dependencies
 from lutris.util.jobs import AsyncCall
 from lutris.util.log import logger
+from lutris.util.manifest import InstallManifest, get_manifest_path
 from lutris.util.steam.log import get_app_state_log
 from lutris.util.http import Request, HTTPError
 from lutris.util.wine.wine import get_wine_version_exe, get_system_wine_version
@@ -105,6 +106,7 @@ class ScriptInterpreter(CommandsMixin):
         self.target_path = None
         self.parent = parent
         self.game_dir_created = False  # Whether a game folder was created during the install
+        self.manifest = None  # Files installed in the game folder
         self.game_files = {}
         self.game_disc = None
         self.cancelled = False
@@ -664,6 +666,9 @@ class ScriptInterpreter(CommandsMixin):
                 "This is an extension to %s, not creating a new game entry",
                 self.extends,
             )
+            base_game = self._get_installed_dependency(self.extends)
+            if base_game:
+                self._save_manifest(base_game["id"], merge=True)
             return
         configpath = make_game_config_id(self.slug)
         config_filename = os.path.join(settings.CONFIG_DIR, "games/%s.yml" % configpath)
@@ -694,6 +699,7 @@ class ScriptInterpreter(CommandsMixin):
 
         game = Game(self.game_id)
         game.save()
+        self._save_manifest(self.game_id)
 
         logger.debug("Saved game entry %s (%d)", self.game_slug, self.game_id)
 
@@ -736,6 +742,19 @@ class ScriptInterpreter(CommandsMixin):
             config_file.write(yaml_config)
         game.emit("game-installed")
 
+    def _save_manifest(self, game_id, merge=False):
+        """Save the files installed for a game, adding them to the ones
+        already installed if `merge` is set.
+        """
+        if not self.manifest:
+            return
+        if merge:
+            manifest = InstallManifest.for_game(game_id, self.manifest.root)
+            manifest.update(self.manifest)
+        else:
+            manifest = self.manifest
+        manifest.save(get_manifest_path(game_id))
+
     def _substitute_config(self, script_config):
         """Substitute values such as $GAMEDIR in a config dict."""
         config = {}
@@ -783,6 +802,9 @@ class ScriptInterpreter(CommandsMixin):
 
         if self.game_dir_created:
             system.remove_folder(self.target_path)
+        elif self.manifest:
+            # Only remove the files installed in an existing folder
+            self.manifest.remove_files()
 
     # -------------
     # Utility stuff
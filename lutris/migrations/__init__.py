@@ -1,6 +1,7 @@
 import importlib
 from lutris import settings
 from lutris.util.log import logger
+from lutris.util.tracing import traced
 
 MIGRATION_VERSION = 8  # Never decrease this number
 
@@ -21,6 +22,7 @@ def get_migration_module(migration_name):
     return importlib.import_module("lutris.migrations.%s" % migration_name)
 
 
+@traced
 def migrate():
     current_version = int(settings.read_setting("migration_version") or 0)
     if current_version >= MIGRATION_VERSION:
@@ -35,6 +35,7 @@ DATABASE = {
         {"name": "has_custom_banner", "type": "INTEGER"},
         {"name": "has_custom_icon", "type": "INTEGER"},
         {"name": "playtime", "type": "REAL"},
+        {"name": "disk_size", "type": "INTEGER"},
     ],
     "store_games": [
         {"name": "id", "type": "INTEGER", "indexed": True},
@@ -50,7 +51,16 @@ DATABASE = {
     "sources": [
         {"name": "id", "type": "INTEGER", "indexed": True},
         {"name": "uri", "type": "TEXT UNIQUE"},
-    ]
+    ],
+    "media_misses": [
+        {"name": "key", "type": "TEXT", "indexed": True},
+        {"name": "checked_at", "type": "INTEGER"},
+    ],
+    "disk_usage": [
+        {"name": "path", "type": "TEXT", "indexed": True},
+        {"name": "mtime", "type": "INTEGER"},
+        {"name": "size", "type": "INTEGER"},
+    ],
 }
 
 
@@ -363,6 +373,66 @@ def check_for_file(game, file_id):
     return False
 
 
+def get_media_misses():
+    """Return a dict of media keys known to be unavailable with their check time"""
+    with sql.db_cursor(PGA_DB) as cursor:
+        rows = cursor.execute("select key, checked_at from media_misses")
+        results = rows.fetchall()
+    return dict(results)
+
+
+def add_media_misses(keys, checked_at):
+    """Record a list of media keys as unavailable at time `checked_at`"""
+    with sql.db_cursor(PGA_DB) as cursor:
+        cursor.executemany(
+            "insert or replace into media_misses(key, checked_at) values (?, ?)",
+            [(key, checked_at) for key in keys]
+        )
+
+
+def delete_media_misses(keys=None):
+    """Forget about unavailable media keys, or about all of them if `keys` is None"""
+    with sql.db_cursor(PGA_DB) as cursor:
+        if keys is None:
+            cursor.execute("delete from media_misses")
+        else:
+            cursor.executemany("delete from media_misses where key=?", [(key,) for key in keys])
+
+
+def set_disk_size(game_id, disk_size):
+    """Save the size of the folder of a game"""
+    sql.db_update(PGA_DB, "games", {"disk_size": disk_size}, ("id", game_id))
+
+
+def get_disk_usage(path):
+    """Return a dict of the folders under `path`, including itself, with the
+    (mtime, size) tuples recorded for them.
+    """
+    with sql.db_cursor(PGA_DB) as cursor:
+        # Folders under path sort between "path/" and "path0", "0" following "/"
+        rows = cursor.execute(
+            "select path, mtime, size from disk_usage where path = ? or (path > ? and path < ?)",
+            (path, path + "/", path + "0")
+        )
+        results = rows.fetchall()
+    return {folder: (mtime, size) for folder, mtime, size in results}
+
+
+def set_disk_usage(folders):
+    """Record folder sizes from a dict of paths with (mtime, size) tuples"""
+    with sql.db_cursor(PGA_DB) as cursor:
+        cursor.executemany(
+            "insert or replace into disk_usage(path, mtime, size) values (?, ?, ?)",
+            [(folder, mtime, size) for folder, (mtime, size) in folders.items()]
+        )
+
+
+def delete_disk_usage(folders):
+    """Forget the size of folders"""
+    with sql.db_cursor(PGA_DB) as cursor:
+        cursor.executemany("delete from disk_usage where path=?", [(folder,) for folder in folders])
+
+
 def get_used_runners():
     """Return a list of the runners in use by installed games."""
     with sql.db_cursor(PGA_DB) as cursor:
@@ -24,10 +24,9 @@ class citra(Runner):  # pylint: disable=invalid-name
 
     def prelaunch(self):
         """Check all required libraries are installed"""
-        available_libs = set()
-        for lib in LINUX_SYSTEM.shared_libraries:
-            if lib in self.require_libs:
-                available_libs.add(lib)
+        available_libs = self.require_libs & LINUX_SYSTEM.library_index.get_names(
+            LINUX_SYSTEM.runtime_architectures
+        )
         unavailable_libs = self.require_libs - available_libs
         if unavailable_libs:
             raise UnavailableLibraries(unavailable_libs)
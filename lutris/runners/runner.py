@@ -7,7 +7,8 @@ from lutris import pga, settings, runtime
 from lutris.config import LutrisConfig
 from lutris.gui import dialogs
 from lutris.command import MonitoredCommand
-from lutris.util.extract import extract_archive, ExtractFailure
+from lutris.util.downloader import Downloader
+from lutris.util.extract import ArchiveStream, extract_archive, get_stream_mode, ExtractFailure
 from lutris.util.log import logger
 from lutris.util import system
 from lutris.util.http import Request
@@ -365,6 +366,19 @@ class Runner:
         runner_archive = os.path.join(settings.CACHE_DIR, tarball_filename)
         if not dest:
             dest = settings.RUNNER_DIR
+        if get_stream_mode(runner_archive):
+            # Tarballs are extracted while they are downloaded
+            os.makedirs(dest, exist_ok=True)
+            stream = ArchiveStream(runner_archive, dest, merge_single=merge_single)
+            stream_downloader = Downloader(url, runner_archive, stream=stream)
+            downloader(
+                url,
+                runner_archive,
+                self.on_streamed,
+                {"downloader": stream_downloader, "callback": callback},
+                downloader=stream_downloader,
+            )
+            return
         downloader(url, runner_archive, self.extract, {
             "archive": runner_archive,
             "dest": dest,
@@ -381,7 +395,17 @@ class Runner:
             logger.error("Failed to extract the archive %s file may be corrupt", archive)
             raise RunnerInstallationError("Failed to extract {}: {}".format(archive, ex))
         os.remove(archive)
+        self.on_installed(callback)
+
+    def on_streamed(self, downloader=None, callback=None):
+        if downloader.state != downloader.COMPLETED:
+            raise RunnerInstallationError(
+                "Failed to download and extract {}: {}".format(downloader.url, downloader.error)
+            )
+        self.on_installed(callback)
 
+    def on_installed(self, callback=None):
+        """Actions taken once the runner files are in place"""
         if self.name == "wine":
             logger.debug("Clearing wine version cache")
             from lutris.util.wine.wine import get_wine_versions
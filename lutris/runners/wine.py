@@ -14,7 +14,7 @@ from lutris.util import system
 from lutris.util.log import logger
 from lutris.util.strings import parse_version, split_arguments
 from lutris.util.display import DISPLAY_MANAGER
-from lutris.util.graphics.vkquery import is_vulkan_supported
+from lutris.util.graphics.inventory import GRAPHICS_INVENTORY
 from lutris.util.wine.prefix import WinePrefixManager
 from lutris.util.wine.x360ce import X360ce
 from lutris.util.wine import dxvk
@@ -177,7 +177,7 @@ class wine(Runner):
 
         def dxvk_vulkan_callback(widget, option, config):
             response = True
-            if not is_vulkan_supported():
+            if not GRAPHICS_INVENTORY.vulkan_supported:
                 if not thread_safe_call(display_vulkan_error):
                     response = False
             return widget, option, response
@@ -727,9 +727,9 @@ class wine(Runner):
         )
         return True
 
-    def set_regedit_keys(self):
+    def set_regedit_keys(self, prefix_manager=None):
         """Reset regedit keys according to config."""
-        prefix_manager = WinePrefixManager(self.prefix_path)
+        prefix_manager = prefix_manager or WinePrefixManager(self.prefix_path)
         # Those options are directly changed with the prefix manager and skip
         # any calls to regedit.
         managed_keys = {
@@ -739,22 +739,23 @@ class wine(Runner):
             "WineDesktop": prefix_manager.set_desktop_size,
         }
 
-        for key, path in self.reg_keys.items():
-            value = self.runner_config.get(key) or "auto"
-            if not value or value == "auto" and key not in managed_keys.keys():
-                prefix_manager.clear_registry_subkeys(path, key)
-            elif key in self.runner_config:
-                if key in managed_keys.keys():
-                    # Do not pass fallback 'auto' value to managed keys
-                    if value == "auto":
-                        value = None
-                    managed_keys[key](value)
-                    continue
-                # Convert numeric strings to integers so they are saved as dword
-                if value.isdigit():
-                    value = int(value)
-
-                prefix_manager.set_registry_key(path, key, value)
+        with prefix_manager.registry_transaction():
+            for key, path in self.reg_keys.items():
+                value = self.runner_config.get(key) or "auto"
+                if not value or value == "auto" and key not in managed_keys.keys():
+                    prefix_manager.clear_registry_subkeys(path, key)
+                elif key in self.runner_config:
+                    if key in managed_keys.keys():
+                        # Do not pass fallback 'auto' value to managed keys
+                        if value == "auto":
+                            value = None
+                        managed_keys[key](value)
+                        continue
+                    # Convert numeric strings to integers so they are saved as dword
+                    if value.isdigit():
+                        value = int(value)
+
+                    prefix_manager.set_registry_key(path, key, value)
 
     def toggle_dxvk(self, enable, version=None, dxvk_manager: dxvk.DXVKManager = None):
         # manual version only sets the dlls to native
@@ -791,10 +792,11 @@ class wine(Runner):
         if not system.path_exists(os.path.join(self.prefix_path, "user.reg")):
             create_prefix(self.prefix_path, arch=self.wine_arch)
         prefix_manager = WinePrefixManager(self.prefix_path)
-        if self.runner_config.get("autoconf_joypad", True):
-            prefix_manager.configure_joypads()
-        self.sandbox(prefix_manager)
-        self.set_regedit_keys()
+        with prefix_manager.registry_transaction():
+            if self.runner_config.get("autoconf_joypad", True):
+                prefix_manager.configure_joypads()
+            self.sandbox(prefix_manager)
+            self.set_regedit_keys(prefix_manager)
         self.setup_x360ce(self.runner_config.get("x360ce-path"))
         if self.runner_config.get("vkd3d"):
             dxvk_manager = dxvk.VKD3DManager
@@ -954,7 +956,7 @@ class wine(Runner):
         if using_dxvk:
             # Set this to 1 to enable access to more RAM for 32bit applications
             launch_info["env"]["WINE_LARGE_ADDRESS_AWARE"] = "1"
-            if not is_vulkan_supported():
+            if not GRAPHICS_INVENTORY.vulkan_supported:
                 if not display_vulkan_error(True):
                     return {"error": "VULKAN_NOT_FOUND"}
 
@@ -1001,10 +1003,12 @@ class wine(Runner):
             drive = os.path.join(prefix_path, "dosdevices", path[:2].lower())
             if os.path.islink(drive):  # Try to resolve the path
                 drive = os.readlink(drive)
-            return os.path.join(drive, path[3:])
+            unix_path = os.path.join(drive, path[3:])
+            return system.fix_path_case(unix_path) or unix_path
 
         if path[0] == "/":  # drive-relative path. C is as good a guess as any..
-            return os.path.join(prefix_path, "drive_c", path[1:])
+            unix_path = os.path.join(prefix_path, "drive_c", path[1:])
+            return system.fix_path_case(unix_path) or unix_path
 
         # Relative path
         return path
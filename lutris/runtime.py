@@ -1,25 +1,62 @@
 """Runtime handling module"""
 import os
 import time
+import urllib.parse
 
 from gi.repository import GLib
-from lutris.settings import RUNTIME_DIR, RUNTIME_URL
+from lutris.settings import RUNNER_DIR, RUNTIME_DIR, RUNTIME_URL
 from lutris.util import http, jobs, system
+from lutris.util.dedup import DEDUP_RECORD_PATH, FileDeduplicator, is_deduplication_enabled
+from lutris.util.delta_update import DeltaUpdateError, FolderUpdate
 from lutris.util.downloader import Downloader
-from lutris.util.extract import extract_archive
+from lutris.util.extract import ArchiveStream, extract_archive, get_stream_mode
+from lutris.util.generations import FolderGenerations
 from lutris.util.log import logger
+from lutris.util.strings import get_formatted_size
 from lutris.util.system import LINUX_SYSTEM
 
 RUNTIME_DISABLED = os.environ.get("LUTRIS_RUNTIME", "").lower() in ("0", "off")
 DEFAULT_RUNTIME = "Ubuntu-18.04"
 
+# Incremented when a runtime is updated
+RUNTIME_GENERATION = 0
+# Results of get_env and get_paths, see get_env_cache_key
+ENV_CACHE = {}
+
+
+def get_env_cache_key(name, *args):
+    """Return the key of the environment built by `name` with `args`, for
+    the current runtimes and system libraries.
+    """
+    return (
+        name,
+        args,
+        os.environ.get("LD_LIBRARY_PATH"),
+        RUNTIME_GENERATION,
+        LINUX_SYSTEM.library_index.generation,
+    )
+
+
+def clear_env_cache():
+    """Forget the environments built for the previous runtimes"""
+    global RUNTIME_GENERATION  # pylint: disable=global-statement
+    RUNTIME_GENERATION += 1
+    ENV_CACHE.clear()
+
 
 class Runtime:
-    """Class for manipulating runtime folders"""
+    """Class for manipulating runtime folders
+
+    Updates are prepared in a staging folder next to the runtime then
+    published as a new generation of it, games started during an update use
+    the complete previous version.
+    """
 
     def __init__(self, name, updater):
         self.name = name
         self.updater = updater
+        self.archive_url = None
+        self.staging_path = None
 
     @property
     def local_runtime_path(self):
@@ -28,6 +65,15 @@ class Runtime:
             return None
         return os.path.join(RUNTIME_DIR, self.name)
 
+    @property
+    def generations(self):
+        return FolderGenerations(self.local_runtime_path)
+
+    @property
+    def staged_runtime_path(self):
+        """Return the path of the runtime folder being prepared"""
+        return os.path.join(self.staging_path, self.name)
+
     def get_updated_at(self):
         """Return the modification date of the runtime folder"""
         if not system.path_exists(self.local_runtime_path):
@@ -59,22 +105,63 @@ class Runtime:
         )
         return True
 
-    def download(self, remote_runtime_info):
-        """Downloads a runtime locally"""
+    def needs_update(self, remote_runtime_info):
+        """Return True if the remote runtime is newer than the local one"""
         remote_updated_at = remote_runtime_info["created_at"]
         remote_updated_at = time.strptime(
             remote_updated_at[: remote_updated_at.find(".")], "%Y-%m-%dT%H:%M:%S"
         )
-        if not self.should_update(remote_updated_at):
-            return None
+        return self.should_update(remote_updated_at)
 
-        url = remote_runtime_info["url"]
+    def download(self, remote_runtime_info):
+        """Downloads a runtime locally"""
+        self.archive_url = remote_runtime_info["url"]
+        self.staging_path = self.generations.create_staging()
+        manifest_url = remote_runtime_info.get("manifest_url")
+        if manifest_url and system.path_exists(self.local_runtime_path):
+            # Only download the files that changed, the archive is the fallback
+            return jobs.AsyncCall(self.update_from_manifest, self.on_manifest_updated, manifest_url)
+        return self.download_archive(self.archive_url)
+
+    def download_archive(self, url):
+        """Download the runtime archive and extract it to the staging folder"""
         archive_path = os.path.join(RUNTIME_DIR, os.path.basename(url))
-        downloader = Downloader(url, archive_path, overwrite=True)
+        stream = None
+        if get_stream_mode(archive_path):
+            # Extract the archive while downloading it
+            stream = ArchiveStream(archive_path, self.staging_path, merge_single=False)
+        downloader = Downloader(url, archive_path, overwrite=True, stream=stream)
         downloader.start()
         GLib.timeout_add(100, self.check_download_progress, downloader)
         return downloader
 
+    def update_from_manifest(self, manifest_url):
+        """Update a copy of the local runtime from the manifest of the remote
+        one, return the number of files and bytes downloaded.
+        """
+        manifest = http.Request(manifest_url).get().json
+        if not manifest.get("files"):
+            raise DeltaUpdateError("Empty manifest for runtime %s" % self.name)
+        files_url = manifest.get("files_url") or urllib.parse.urljoin(manifest_url, self.name + "/")
+        self.generations.clone_current(self.staged_runtime_path)
+        return FolderUpdate(self.staged_runtime_path, manifest, files_url).run()
+
+    def on_manifest_updated(self, result, error):
+        """Callback method when a runtime was updated from its manifest"""
+        if error:
+            logger.warning("Failed to update runtime %s from its manifest: %s", self.name, error)
+            system.remove_folder(self.staged_runtime_path)
+            self.download_archive(self.archive_url)
+            return
+        logger.info(
+            "Runtime %s updated, %d files downloaded (%d bytes), %d removed",
+            self.name,
+            result["downloaded_files"],
+            result["downloaded_bytes"],
+            result["removed_files"],
+        )
+        self.on_updated()
+
     def check_download_progress(self, downloader):
         """Call download.check_progress(), return True if download finished."""
         if not downloader or downloader.state in [
@@ -82,11 +169,15 @@ class Runtime:
             downloader.ERROR,
         ]:
             logger.debug("Runtime update interrupted")
+            self.on_failed()
             return False
 
         downloader.check_progress()
         if downloader.state == downloader.COMPLETED:
-            self.on_downloaded(downloader.dest)
+            if downloader.stream:
+                self.on_updated()
+            else:
+                self.on_downloaded(downloader.dest)
             return False
         return True
 
@@ -96,15 +187,8 @@ class Runtime:
         Arguments:
             path (str): local path to the runtime archive
         """
-        directory, _filename = os.path.split(path)
-
-        # Delete the existing runtime path
-        initial_path = os.path.join(directory, self.name)
-        system.remove_folder(initial_path)
-
-        # Extract the runtime archive
         jobs.AsyncCall(
-            extract_archive, self.on_extracted, path, RUNTIME_DIR, merge_single=False
+            extract_archive, self.on_extracted, path, self.staging_path, merge_single=False
         )
 
     def on_extracted(self, result, error):
@@ -112,12 +196,31 @@ class Runtime:
         if error:
             logger.error("Runtime update failed")
             logger.error(error)
+            self.on_failed()
             return
         archive_path, _destination_path = result
         os.unlink(archive_path)
+        self.on_updated()
+        return False
+
+    def on_updated(self):
+        """Callback method when a runtime is ready in the staging folder"""
+        if not os.path.isdir(self.staged_runtime_path):
+            logger.error("Runtime archive of %s doesn't contain a %s folder", self.name, self.name)
+            self.on_failed()
+            return
+        self.generations.publish(self.staged_runtime_path)
+        system.remove_folder(self.staging_path)
         self.set_updated_at()
+        clear_env_cache()
+        self.updater.notify_finish(self)
+
+    def on_failed(self):
+        """Callback method when a runtime update failed, the current version
+        of the runtime is kept.
+        """
+        system.remove_folder(self.staging_path)
         self.updater.notify_finish(self)
-        return False
 
 
 class RuntimeUpdater:
@@ -125,6 +228,11 @@ class RuntimeUpdater:
 
     current_updates = 0
     status_updater = None
+    # Runtimes downloaded and extracted simultaneously
+    max_workers = 3
+
+    def __init__(self):
+        self.pending_runtimes = []
 
     def is_updating(self):
         """Return True if the update process is running"""
@@ -142,11 +250,27 @@ class RuntimeUpdater:
 
         for remote_runtime in self._iter_remote_runtimes():
             runtime = Runtime(remote_runtime["name"], self)
-            downloader = runtime.download(remote_runtime)
-            if downloader:
+            if runtime.needs_update(remote_runtime):
+                self.pending_runtimes.append((runtime, remote_runtime))
                 self.current_updates += 1
+        if not self.current_updates:
+            self.deduplicate_files()
+        self.start_pending_updates()
         return None
 
+    def start_pending_updates(self):
+        """Start the pending updates while fewer than max_workers run"""
+        running_updates = self.current_updates - len(self.pending_runtimes)
+        while self.pending_runtimes and running_updates < self.max_workers:
+            runtime, remote_runtime = self.pending_runtimes.pop(0)
+            try:
+                runtime.download(remote_runtime)
+            except OSError as ex:
+                logger.error("Failed to start the update of runtime %s: %s", runtime.name, ex)
+                self.current_updates -= 1
+                continue
+            running_updates += 1
+
     @staticmethod
     def _iter_remote_runtimes():
         request = http.Request(RUNTIME_URL)
@@ -184,10 +308,32 @@ class RuntimeUpdater:
 
     def notify_finish(self, runtime):
         """A runtime has finished downloading"""
-        logger.debug("Runtime %s is now updated and available", runtime.name)
+        logger.debug("Runtime %s is done updating", runtime.name)
         self.current_updates -= 1
+        self.start_pending_updates()
         if self.current_updates == 0:
             logger.info("Runtime updated")
+            self.deduplicate_files()
+
+    def deduplicate_files(self):
+        """Link the identical files of the runtimes and runners, if the user
+        enabled it.
+        """
+        if not is_deduplication_enabled():
+            return
+        deduplicator = FileDeduplicator([RUNTIME_DIR, RUNNER_DIR], DEDUP_RECORD_PATH)
+        jobs.AsyncCall(deduplicator.run, self.on_files_deduplicated)
+
+    @staticmethod
+    def on_files_deduplicated(result, error):
+        if error:
+            logger.error("Failed to deduplicate the runtime files: %s", error)
+            return
+        logger.info(
+            "Linked %d duplicated files, %s reclaimed",
+            result["linked_files"],
+            get_formatted_size(result["reclaimed_bytes"]),
+        )
 
 
 def get_env(version=None, prefer_system_libs=False, wine_path=None):
@@ -202,6 +348,13 @@ def get_env(version=None, prefer_system_libs=False, wine_path=None):
     Returns:
         dict
     """
+    cache_key = get_env_cache_key("env", version, prefer_system_libs, wine_path)
+    if cache_key not in ENV_CACHE:
+        ENV_CACHE[cache_key] = build_env(version, prefer_system_libs, wine_path)
+    return dict(ENV_CACHE[cache_key])
+
+
+def build_env(version, prefer_system_libs, wine_path):
     # Adding the STEAM_RUNTIME here is probably unneeded and unwanted
     return {
         key: value
@@ -273,6 +426,13 @@ def get_runtime_paths(version=None, prefer_system_libs=True, wine_path=None):
 
 def get_paths(version=None, prefer_system_libs=True, wine_path=None):
     """Return a list of paths containing the runtime libraries."""
+    cache_key = get_env_cache_key("paths", version, prefer_system_libs, wine_path)
+    if cache_key not in ENV_CACHE:
+        ENV_CACHE[cache_key] = build_paths(version, prefer_system_libs, wine_path)
+    return list(ENV_CACHE[cache_key])
+
+
+def build_paths(version, prefer_system_libs, wine_path):
     if not RUNTIME_DISABLED:
         paths = get_runtime_paths(
             version=version,
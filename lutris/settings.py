@@ -1,6 +1,6 @@
 """Internal settings."""
 import os
-from gi.repository import GLib
+from lutris.util import xdg_dirs
 from lutris.util.settings import SettingsIO
 from lutris import __version__
 
@@ -12,18 +12,20 @@ AUTHORS = [
 ]
 
 # Paths
-CONFIG_DIR = os.path.join(GLib.get_user_config_dir(), "lutris")
+CONFIG_DIR = os.path.join(xdg_dirs.get_user_config_dir(), "lutris")
 CONFIG_FILE = os.path.join(CONFIG_DIR, "lutris.conf")
-DATA_DIR = os.path.join(GLib.get_user_data_dir(), "lutris")
+DATA_DIR = os.path.join(xdg_dirs.get_user_data_dir(), "lutris")
 RUNNER_DIR = os.path.join(DATA_DIR, "runners")
 RUNTIME_DIR = os.path.join(DATA_DIR, "runtime")
-CACHE_DIR = os.path.join(GLib.get_user_cache_dir(), "lutris")
+CACHE_DIR = os.path.join(xdg_dirs.get_user_cache_dir(), "lutris")
 GAME_CONFIG_DIR = os.path.join(CONFIG_DIR, "games")
 
 TMP_PATH = os.path.join(CACHE_DIR, "tmp")
 BANNER_PATH = os.path.join(DATA_DIR, "banners")
 COVERART_PATH = os.path.join(DATA_DIR, "coverart")
-ICON_PATH = os.path.join(GLib.get_user_data_dir(), "icons", "hicolor", "128x128", "apps")
+MEDIA_PACK_PATH = os.path.join(DATA_DIR, "media.pack")
+MANIFEST_DIR = os.path.join(DATA_DIR, "manifests")
+ICON_PATH = os.path.join(xdg_dirs.get_user_data_dir(), "icons", "hicolor", "128x128", "apps")
 
 sio = SettingsIO(CONFIG_FILE)
 PGA_DB = sio.read_setting("pga_path") or os.path.join(DATA_DIR, "pga.db")
@@ -1,15 +1,22 @@
 """Check to run at program start"""
 # pylint: disable=no-member
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from lutris.util.log import logger
 from lutris import pga
 from lutris.game import Game
 from lutris import settings
 from lutris.util.system import create_folder
-from lutris.util.graphics import drivers
-from lutris.util.graphics import vkquery
+from lutris.util.graphics.inventory import GRAPHICS_INVENTORY
 from lutris.util.linux import LINUX_SYSTEM
-from lutris.gui.dialogs import DontShowAgainDialog
+from lutris.util.tracing import traced
+
+# Results of the checks that passed, reused while the system stays the same
+CHECK_CACHE_PATH = os.path.join(settings.CACHE_DIR, "startup-checks.json")
+
+# Dialogs of the failed checks, shown once the main window is visible
+DEFERRED_DIALOGS = []
 
 
 def init_dirs():
@@ -39,24 +46,42 @@ def init_db():
     pga.syncdb()
 
 
+@traced
 def init_lutris():
     """Run full initialization of Lutris"""
     init_dirs()
     init_db()
 
 
+def defer_dialog(setting, message, secondary_message=None):
+    """Queue a DontShowAgainDialog to display once the main window is shown"""
+    if settings.read_setting(setting) != "True":
+        DEFERRED_DIALOGS.append({
+            "setting": setting,
+            "message": message,
+            "secondary_message": secondary_message,
+        })
+
+
+def pop_deferred_dialogs():
+    """Return the queued dialogs and clear the queue"""
+    dialogs = []
+    while DEFERRED_DIALOGS:
+        dialogs.append(DEFERRED_DIALOGS.pop(0))
+    return dialogs
+
+
+@traced
 def check_driver():
     """Report on the currently running driver"""
     driver_info = {}
-    if drivers.is_nvidia():
-        driver_info = drivers.get_nvidia_driver_info()
+    if GRAPHICS_INVENTORY.is_nvidia:
+        driver_info = GRAPHICS_INVENTORY.nvidia_driver_info
         # pylint: disable=logging-format-interpolation
         logger.info(
             "Using {vendor} drivers {version} for {arch}".format(**driver_info["nvrm"])
         )
-        gpus = drivers.get_nvidia_gpu_ids()
-        for gpu_id in gpus:
-            gpu_info = drivers.get_nvidia_gpu_info(gpu_id)
+        for gpu_info in GRAPHICS_INVENTORY.nvidia_gpus:
             logger.info("GPU: %s", gpu_info.get("Model"))
     elif LINUX_SYSTEM.glxinfo:
         logger.info("Using %s", LINUX_SYSTEM.glxinfo.opengl_vendor)
@@ -71,31 +96,30 @@ def check_driver():
             "glxinfo is not available on your system, unable to detect driver version"
         )
 
-    for card in drivers.get_gpus():
+    for card, gpu_info in GRAPHICS_INVENTORY.gpus.items():
         # pylint: disable=logging-format-interpolation
         try:
             logger.info(
-                "GPU: {PCI_ID} {PCI_SUBSYS_ID} using {DRIVER} drivers".format(
-                    **drivers.get_gpu_info(card)
-                )
+                "GPU: {PCI_ID} {PCI_SUBSYS_ID} using {DRIVER} drivers".format(**gpu_info)
             )
         except KeyError:
             logger.error("Unable to get GPU information from '%s'", card)
 
-    if drivers.is_outdated():
-        setting = "hide-outdated-nvidia-driver-warning"
-        if settings.read_setting(setting) != "True":
-            DontShowAgainDialog(
-                setting,
-                "Your Nvidia driver is outdated.",
-                secondary_message="You are currently running driver %s which does not "
-                "fully support all features for Vulkan and DXVK games.\n"
-                "Please upgrade your driver as described in our "
-                "<a href='https://github.com/lutris/lutris/wiki/Installing-drivers'>"
-                "installation guide</a>" % driver_info["nvrm"]["version"],
-            )
+    if GRAPHICS_INVENTORY.is_outdated():
+        defer_dialog(
+            "hide-outdated-nvidia-driver-warning",
+            "Your Nvidia driver is outdated.",
+            secondary_message="You are currently running driver %s which does not "
+            "fully support all features for Vulkan and DXVK games.\n"
+            "Please upgrade your driver as described in our "
+            "<a href='https://github.com/lutris/lutris/wiki/Installing-drivers'>"
+            "installation guide</a>" % driver_info["nvrm"]["version"],
+        )
+        return False
+    return True
 
 
+@traced
 def check_libs(all_components=False):
     """Checks that required libraries are installed on the system"""
     missing_libs = LINUX_SYSTEM.get_missing_libs()
@@ -104,55 +128,60 @@ def check_libs(all_components=False):
     else:
         components = LINUX_SYSTEM.critical_requirements
     missing_vulkan_libs = []
+    passed = True
     for req in components:
         for index, arch in enumerate(LINUX_SYSTEM.runtime_architectures):
             for lib in missing_libs[req][index]:
                 if req == "VULKAN":
                     missing_vulkan_libs.append(arch)
                 logger.error("%s %s missing (needed by %s)", arch, lib, req.lower())
+                passed = False
 
     if missing_vulkan_libs:
-        setting = "dismiss-missing-vulkan-library-warning"
-        if settings.read_setting(setting) != "True":
-            DontShowAgainDialog(
-                setting,
-                "Missing vulkan libraries",
-                secondary_message="Lutris was unable to detect Vulkan support for "
-                "the %s architecture.\n"
-                "This will prevent many games and programs from working.\n"
-                "To install it, please use the following guide: "
-                "<a href='https://github.com/lutris/lutris/wiki/Installing-drivers'>"
-                "Installing Graphics Drivers</a>" % " and ".join(missing_vulkan_libs),
-            )
+        defer_dialog(
+            "dismiss-missing-vulkan-library-warning",
+            "Missing vulkan libraries",
+            secondary_message="Lutris was unable to detect Vulkan support for "
+            "the %s architecture.\n"
+            "This will prevent many games and programs from working.\n"
+            "To install it, please use the following guide: "
+            "<a href='https://github.com/lutris/lutris/wiki/Installing-drivers'>"
+            "Installing Graphics Drivers</a>" % " and ".join(missing_vulkan_libs),
+        )
+    return passed
 
 
+@traced
 def check_vulkan():
     """Reports if Vulkan is enabled on the system"""
-    if vkquery.is_vulkan_supported():
+    if GRAPHICS_INVENTORY.vulkan_supported:
         logger.info("Vulkan is supported")
-    else:
-        logger.info("Vulkan is not available or your system isn't Vulkan capable")
+        return True
+    logger.info("Vulkan is not available or your system isn't Vulkan capable")
+    return False
 
 
+@traced
 def check_donate():
-    setting = "dont-support-lutris"
-    if settings.read_setting(setting) != "True":
-        DontShowAgainDialog(
-            setting,
-            "Please support Lutris!",
-            secondary_message="Lutris is entirely funded by its community and will "
-            "remain an independent gaming platform.\n"
-            "For Lutris to survive and grow, the project needs your help.\n"
-            "Please consider making a donation if you can. This will greatly help "
-            "cover the costs of hosting the project and fund new features "
-            "like cloud saves or a full-screen interface for the TV!\n"
-            "<a href='https://lutris.net/donate'>SUPPORT US! https://lutris.net/donate</a>",
-        )
-
-
+    defer_dialog(
+        "dont-support-lutris",
+        "Please support Lutris!",
+        secondary_message="Lutris is entirely funded by its community and will "
+        "remain an independent gaming platform.\n"
+        "For Lutris to survive and grow, the project needs your help.\n"
+        "Please consider making a donation if you can. This will greatly help "
+        "cover the costs of hosting the project and fund new features "
+        "like cloud saves or a full-screen interface for the TV!\n"
+        "<a href='https://lutris.net/donate'>SUPPORT US! https://lutris.net/donate</a>",
+    )
+    return True
+
+
+@traced
 def fill_missing_platforms():
     """Sets the platform on games where it's missing.
     This should never happen.
+    Games emit signals when saved, run this in the main thread.
     """
     pga_games = pga.get_games(filter_installed=True)
     for pga_game in pga_games:
@@ -165,10 +194,58 @@ def fill_missing_platforms():
             game.save(metadata_only=True)
 
 
+# Checks run in the background at startup. They return True when they pass.
+STARTUP_CHECKS = [check_driver, check_libs, check_vulkan, check_donate]
+# Checks whose success only depends on the drivers and libraries of the system
+CACHED_CHECKS = ["check_libs", "check_vulkan"]
+
+
+def get_checks_cache_key():
+    """Return the state of the system the cached checks depend on"""
+    return {
+        "system": LINUX_SYSTEM.get_cache_key(),
+        "libraries": LINUX_SYSTEM.library_index.get_cache_key(),
+        "graphics": GRAPHICS_INVENTORY.get_cache_key(),
+    }
+
+
+def read_passed_checks():
+    """Return the checks that passed on the current drivers and libraries"""
+    try:
+        with open(CHECK_CACHE_PATH) as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return []
+    if cache.get("key") != get_checks_cache_key():
+        return []
+    return cache.get("passed", [])
+
+
+def save_passed_checks(passed_checks):
+    try:
+        with open(CHECK_CACHE_PATH, "w") as cache_file:
+            json.dump({"key": get_checks_cache_key(), "passed": passed_checks}, cache_file)
+    except OSError as ex:
+        logger.warning("Failed to save the startup checks: %s", ex)
+
+
+@traced
 def run_all_checks():
-    """Run all startup checks"""
-    check_driver()
-    check_libs()
-    check_vulkan()
-    check_donate()
-    fill_missing_platforms()
+    """Run all startup checks concurrently, return the names of the checks
+    that passed. Checks that passed before on the same drivers and libraries
+    are skipped. Dialogs reporting failures are queued in DEFERRED_DIALOGS.
+    """
+    passed_checks = [name for name in read_passed_checks() if name in CACHED_CHECKS]
+    if passed_checks:
+        logger.debug("Skipping startup checks that passed before: %s", ", ".join(passed_checks))
+    checks = [check for check in STARTUP_CHECKS if check.__name__ not in passed_checks]
+    with ThreadPoolExecutor(max_workers=len(checks) or 1) as executor:
+        futures = {check.__name__: executor.submit(check) for check in checks}
+    for name, future in futures.items():
+        try:
+            if future.result():
+                passed_checks.append(name)
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.error("Startup check %s failed: %s", name, ex)
+    save_passed_checks([name for name in passed_checks if name in CACHED_CHECKS])
+    return passed_checks
@@ -2,6 +2,7 @@
 from lutris import api, pga
 from lutris.util import resources
 from lutris.util.log import logger
+from lutris.util.media_pipeline import MEDIA_PIPELINE
 
 
 def sync_missing_games(not_in_local, remote_library):
@@ -39,6 +40,7 @@ def sync_game_details(remote_library):
     if not remote_library:
         return set()
     updated = set()
+    downloads = []
 
     for remote_game in remote_library:
         slug = remote_game["slug"]
@@ -67,10 +69,12 @@ def sync_game_details(remote_library):
 
         if not local_game.get("has_custom_banner") and remote_game["banner_url"]:
             path = resources.get_banner_path(slug)
-            resources.download_media(remote_game["banner_url"], path, overwrite=True)
+            downloads.append((slug, "banner", remote_game["banner_url"], path))
         if not local_game.get("has_custom_icon") and remote_game["icon_url"]:
             path = resources.get_icon_path(slug)
-            resources.download_media(remote_game["icon_url"], path, overwrite=True)
+            downloads.append((slug, "icon", remote_game["icon_url"], path))
+
+    MEDIA_PIPELINE.fetch(downloads, overwrite=True)
 
     if updated:
         logger.debug("%d games updated", len(updated))
@@ -0,0 +1,160 @@
+"""Replace identical files of the runtime and runner folders with hard links"""
+import json
+import os
+import stat
+from collections import defaultdict
+
+from lutris import settings
+from lutris.util.delta_update import LOCAL_MANIFEST_NAME, PARTIAL_SUFFIX, get_file_hash
+from lutris.util.log import logger
+
+# Record of the hashed and linked files, reused by the next runs
+DEDUP_RECORD_PATH = os.path.join(settings.CACHE_DIR, "deduplicated_files.json")
+
+# Smaller files don't reclaim enough space to be worth hashing
+MIN_FILE_SIZE = 16 * 1024
+
+# Suffix of the links created before replacing a duplicate
+LINK_SUFFIX = ".lutris-link"
+
+
+def is_deduplication_enabled():
+    """Return True if the user opted in the deduplication of files"""
+    return settings.read_setting("deduplicate_files") == "True"
+
+
+class FileDeduplicator:
+    """Hard link the identical files of a set of folders.
+
+    Files are identical when they have the same content, mode and owner.
+    Duplicates are replaced by renaming a link over them, so programs having
+    them open keep their version, and the folders sharing a file share its
+    pages in memory. Folders are updated by renaming new files in place of
+    the old ones, which only breaks the links of the replaced files.
+
+    The size, modification time, inode and hash of the files are recorded in
+    `record_path`; files whose inode changed since, for example those
+    replaced by an update, are hashed again and linked to their duplicates.
+    """
+
+    def __init__(self, folders, record_path=None, min_size=MIN_FILE_SIZE):
+        self.folders = folders
+        self.record_path = record_path
+        self.min_size = min_size
+        self.record = {}
+
+    def load_record(self):
+        if not self.record_path:
+            return {}
+        try:
+            with open(self.record_path) as record_file:
+                return json.load(record_file).get("files", {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as ex:
+            logger.warning("Invalid deduplication record %s: %s", self.record_path, ex)
+            return {}
+
+    def save_record(self):
+        if not self.record_path:
+            return
+        tmp_path = self.record_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.record_path), exist_ok=True)
+            with open(tmp_path, "w") as record_file:
+                json.dump({"files": self.record}, record_file)
+            os.replace(tmp_path, self.record_path)
+        except OSError as ex:
+            logger.warning("Failed to save the deduplication record to %s: %s", self.record_path, ex)
+
+    def iter_files(self):
+        """Yield the path and stat result of the files worth linking"""
+        for folder in self.folders:
+            for dirpath, _dirnames, filenames in os.walk(folder):
+                for filename in filenames:
+                    if filename == LOCAL_MANIFEST_NAME or filename.endswith((PARTIAL_SUFFIX, LINK_SUFFIX)):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        file_stat = os.lstat(path)
+                    except OSError:
+                        continue
+                    if stat.S_ISREG(file_stat.st_mode) and file_stat.st_size >= self.min_size:
+                        yield path, file_stat
+
+    @staticmethod
+    def get_file_state(file_stat):
+        return [file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino]
+
+    def get_hash(self, path, file_stat, previous_record):
+        """Return the hash of a file, from the record if it didn't change"""
+        state = self.get_file_state(file_stat)
+        recorded = previous_record.get(path)
+        if recorded and recorded[:3] == state:
+            return recorded[3]
+        return get_file_hash(path)
+
+    def link_file(self, source, path, path_stat):
+        """Replace `path` with a hard link to `source`, return False if it
+        changed since it was hashed or can't be linked.
+        """
+        try:
+            if self.get_file_state(os.lstat(path)) != self.get_file_state(path_stat):
+                return False
+            link_path = path + LINK_SUFFIX
+            if os.path.lexists(link_path):
+                os.remove(link_path)
+            os.link(source, link_path)
+            os.replace(link_path, path)
+        except OSError as ex:
+            logger.warning("Unable to link %s to %s: %s", path, source, ex)
+            return False
+        return True
+
+    def run(self):
+        """Link the duplicated files, return the number of replaced files and
+        the number of bytes reclaimed.
+        """
+        previous_record = self.load_record()
+        self.record = {}
+        # Only files on the same device with the same attributes can be linked
+        candidates = defaultdict(lambda: defaultdict(list))
+        for path, file_stat in self.iter_files():
+            attributes = (
+                file_stat.st_dev, file_stat.st_size, file_stat.st_mode,
+                file_stat.st_uid, file_stat.st_gid
+            )
+            candidates[attributes][file_stat.st_ino].append((path, file_stat))
+
+        linked_files = 0
+        reclaimed_bytes = 0
+        for inodes in candidates.values():
+            if len(inodes) == 1:
+                continue
+            by_hash = defaultdict(list)
+            for paths in inodes.values():
+                path, file_stat = paths[0]
+                try:
+                    file_hash = self.get_hash(path, file_stat, previous_record)
+                except OSError as ex:
+                    logger.warning("Unable to hash %s: %s", path, ex)
+                    continue
+                by_hash[file_hash].append(paths)
+                for linked_path, linked_stat in paths:
+                    self.record[linked_path] = self.get_file_state(linked_stat) + [file_hash]
+            for file_hash, copies in by_hash.items():
+                if len(copies) == 1:
+                    continue
+                # Keep the inode with the most links so that fewer files move
+                copies.sort(key=len, reverse=True)
+                source, source_stat = copies[0][0]
+                for paths in copies[1:]:
+                    replaced = [path for path, file_stat in paths if self.link_file(source, path, file_stat)]
+                    for path in replaced:
+                        self.record[path] = self.get_file_state(source_stat) + [file_hash]
+                    linked_files += len(replaced)
+                    # The space is freed once no other link to the copy remains
+                    if len(replaced) == paths[0][1].st_nlink:
+                        reclaimed_bytes += paths[0][1].st_size
+        self.save_record()
+        return {"linked_files": linked_files, "reclaimed_bytes": reclaimed_bytes}
@@ -0,0 +1,244 @@
+"""Update a folder from a manifest of its files, downloading only the changed ones"""
+import concurrent.futures
+import hashlib
+import json
+import os
+import stat
+import threading
+import urllib.parse
+
+from lutris.util import http
+from lutris.util.log import logger
+
+# Record of the files of an updated folder, stored in the folder itself
+LOCAL_MANIFEST_NAME = ".lutris-manifest.json"
+
+# Files downloaded simultaneously
+MAX_DOWNLOAD_WORKERS = 4
+
+# Suffix of the files being downloaded, renamed once they are all verified
+PARTIAL_SUFFIX = ".lutris-part"
+
+
+class DeltaUpdateError(Exception):
+    """Exception raised when a folder can't be updated from its manifest"""
+
+
+def get_file_hash(path):
+    """Return the SHA-256 hash of a file"""
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as _file:
+        for chunk in iter(lambda: _file.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def create_manifest(path):
+    """Return the manifest of the files and links of a folder.
+
+    Files have a size, a SHA-256 hash and a mode, links have a target.
+    """
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        # Links to folders are listed with the folders
+        links = [dirname for dirname in dirnames if os.path.islink(os.path.join(dirpath, dirname))]
+        for name in filenames + links:
+            file_path = os.path.join(dirpath, name)
+            relpath = os.path.relpath(file_path, path)
+            if relpath == LOCAL_MANIFEST_NAME or name.endswith(PARTIAL_SUFFIX):
+                continue
+            if os.path.islink(file_path):
+                entries.append({"path": relpath, "link": os.readlink(file_path)})
+                continue
+            file_stat = os.stat(file_path)
+            entries.append({
+                "path": relpath,
+                "size": file_stat.st_size,
+                "sha256": get_file_hash(file_path),
+                "mode": file_stat.st_mode & 0o777,
+            })
+    return {"files": sorted(entries, key=lambda entry: entry["path"])}
+
+
+def get_entries(manifest):
+    """Return the entries of a manifest keyed by path, after checking that
+    none of them leave the folder.
+    """
+    entries = {}
+    for entry in manifest.get("files", []):
+        path = entry.get("path", "")
+        normalized_path = os.path.normpath(path)
+        if (
+                not path
+                or os.path.isabs(path)
+                or normalized_path != path
+                or normalized_path.startswith(os.pardir)
+                or ("link" not in entry and ("size" not in entry or "sha256" not in entry))
+        ):
+            raise DeltaUpdateError("Invalid manifest entry: %s" % entry)
+        entries[path] = entry
+    return entries
+
+
+class FolderUpdate:
+    """Bring a folder to the state described by a remote manifest.
+
+    The files whose size or hash differ from the manifest are downloaded from
+    `files_url`, joined with their path. They are verified before any file is
+    replaced, and the files not in the manifest anymore are then deleted.
+    The applied manifest is saved in the folder, so the next update compares
+    the manifests instead of hashing every file. Folders updated another way
+    have no manifest and are hashed once.
+    """
+
+    def __init__(self, path, manifest, files_url, max_workers=MAX_DOWNLOAD_WORKERS):
+        self.path = path
+        self.entries = get_entries(manifest)
+        self.files_url = files_url if files_url.endswith("/") else files_url + "/"
+        self.max_workers = max_workers
+        self.stop_request = threading.Event()
+        self.downloaded_files = 0
+        self.downloaded_bytes = 0
+        self.removed_files = 0
+        self._lock = threading.Lock()
+
+    @property
+    def local_manifest_path(self):
+        return os.path.join(self.path, LOCAL_MANIFEST_NAME)
+
+    def cancel(self):
+        self.stop_request.set()
+
+    def get_local_entries(self):
+        """Return the entries of the folder, from its saved manifest if it has one"""
+        try:
+            with open(self.local_manifest_path) as manifest_file:
+                return get_entries(json.load(manifest_file))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, DeltaUpdateError) as ex:
+            logger.warning("Invalid manifest %s: %s", self.local_manifest_path, ex)
+        logger.debug("Hashing the files of %s", self.path)
+        return get_entries(create_manifest(self.path))
+
+    def is_up_to_date(self, entry, local_entry):
+        """Return True if the file of an entry doesn't need to change"""
+        if not local_entry:
+            return False
+        if "link" in entry:
+            return local_entry.get("link") == entry["link"]
+        if local_entry.get("sha256") != entry["sha256"]:
+            return False
+        # Catch the files changed or deleted since the last update
+        try:
+            file_stat = os.lstat(os.path.join(self.path, entry["path"]))
+        except OSError:
+            return False
+        return stat.S_ISREG(file_stat.st_mode) and file_stat.st_size == entry["size"]
+
+    def get_changes(self):
+        """Return the entries to update and the paths to remove"""
+        local_entries = self.get_local_entries()
+        changed = [
+            entry for path, entry in sorted(self.entries.items())
+            if not self.is_up_to_date(entry, local_entries.get(path))
+        ]
+        removed = sorted(path for path in local_entries if path not in self.entries)
+        return changed, removed
+
+    def get_file_url(self, path):
+        return urllib.parse.urljoin(self.files_url, urllib.parse.quote(path))
+
+    def download_file(self, entry):
+        """Download the file of an entry next to its final location"""
+        if self.stop_request.is_set():
+            raise DeltaUpdateError("Update cancelled")
+        part_path = os.path.join(self.path, entry["path"] + PARTIAL_SUFFIX)
+        os.makedirs(os.path.dirname(part_path), exist_ok=True)
+        try:
+            request = http.Request(self.get_file_url(entry["path"]), stop_request=self.stop_request).get()
+        except http.HTTPError as ex:
+            raise DeltaUpdateError("Failed to download %s: %s" % (entry["path"], ex))
+        content = request.content
+        if len(content) != entry["size"] or hashlib.sha256(content).hexdigest() != entry["sha256"]:
+            raise DeltaUpdateError("Downloaded file %s doesn't match the manifest" % entry["path"])
+        with open(part_path, "wb") as part_file:
+            part_file.write(content)
+        os.chmod(part_path, entry.get("mode", 0o644))
+        with self._lock:
+            self.downloaded_files += 1
+            self.downloaded_bytes += len(content)
+        return part_path
+
+    def remove_partial_files(self, changed):
+        for entry in changed:
+            try:
+                os.remove(os.path.join(self.path, entry["path"] + PARTIAL_SUFFIX))
+            except OSError:
+                pass
+
+    def replace(self, entry):
+        """Move a downloaded file or create a link at the location of an entry"""
+        path = os.path.join(self.path, entry["path"])
+        if os.path.isdir(path) and not os.path.islink(path):
+            raise DeltaUpdateError("A folder is in the way of %s" % entry["path"])
+        if "link" in entry:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.lexists(path):
+                os.remove(path)
+            os.symlink(entry["link"], path)
+        else:
+            os.replace(path + PARTIAL_SUFFIX, path)
+
+    def remove(self, relpath):
+        """Delete a file and the folders it leaves empty"""
+        try:
+            os.remove(os.path.join(self.path, relpath))
+            self.removed_files += 1
+        except FileNotFoundError:
+            pass
+        folder = os.path.dirname(relpath)
+        while folder:
+            try:
+                os.rmdir(os.path.join(self.path, folder))
+            except OSError:
+                break
+            folder = os.path.dirname(folder)
+
+    def save_manifest(self):
+        tmp_path = self.local_manifest_path + ".tmp"
+        with open(tmp_path, "w") as manifest_file:
+            json.dump({"files": [self.entries[path] for path in sorted(self.entries)]}, manifest_file)
+        os.replace(tmp_path, self.local_manifest_path)
+
+    def run(self):
+        """Update the folder, return the number of files and bytes downloaded"""
+        changed, removed = self.get_changes()
+        downloads = [entry for entry in changed if "link" not in entry]
+        logger.info(
+            "Updating %s: %d files to download (%d bytes), %d to remove",
+            self.path, len(downloads), sum(entry["size"] for entry in downloads), len(removed)
+        )
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(self.download_file, entry) for entry in downloads]
+                try:
+                    for future in concurrent.futures.as_completed(futures):
+                        future.result()
+                except BaseException:
+                    self.cancel()
+                    raise
+        except BaseException:
+            self.remove_partial_files(downloads)
+            raise
+        # Folders removed from the manifest may be in the way of new files
+        for relpath in removed:
+            self.remove(relpath)
+        for entry in changed:
+            self.replace(entry)
+        self.save_manifest()
+        return {
+            "downloaded_files": self.downloaded_files,
+            "downloaded_bytes": self.downloaded_bytes,
+            "removed_files": self.removed_files,
+        }
@@ -0,0 +1,119 @@
+"""Disk space used by games, runners and the runtime"""
+import os
+import threading
+from collections import defaultdict
+
+from lutris import pga, settings
+from lutris.util import system
+from lutris.util.log import logger
+
+
+def get_folder_usage(path):
+    """Return the space used by the files directly in a folder and the list
+    of its subfolders.
+    """
+    size = 0
+    subfolders = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subfolders.append(entry.path)
+                    else:
+                        size += entry.stat(follow_symlinks=False).st_blocks * 512
+                except OSError:
+                    continue
+    except OSError as ex:
+        logger.warning("Can't read %s: %s", path, ex)
+    return size, subfolders
+
+
+class DiskUsageIndex:
+    """Measure the space used by folders, like du, and remember it in the PGA.
+
+    The space used by the files of each folder is saved along with the
+    folder's modification time. Since adding, removing or renaming a file
+    changes the time of its folder, only folders with a new time are listed
+    again when measuring a tree that was measured before. Files growing in
+    place are only picked up by a full scan.
+    Hard links are counted once per link.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def get_size(self, path, full=False):
+        """Return the space used by the folder at `path`, in bytes.
+
+        Params:
+            full (bool): List every folder, even if it didn't change
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            known_folders = pga.get_disk_usage(path)
+            known_subfolders = defaultdict(list)
+            for folder in known_folders:
+                if folder != path:
+                    known_subfolders[os.path.dirname(folder)].append(folder)
+            updated_folders = {}
+            visited_folders = set()
+            total_size = 0
+            folders = [path]
+            while folders:
+                folder = folders.pop()
+                try:
+                    folder_stat = os.stat(folder)
+                except OSError:
+                    continue
+                visited_folders.add(folder)
+                known_usage = known_folders.get(folder)
+                if not full and known_usage and known_usage[0] == folder_stat.st_mtime_ns:
+                    total_size += known_usage[1]
+                    folders += known_subfolders[folder]
+                    continue
+                size, subfolders = get_folder_usage(folder)
+                size += folder_stat.st_blocks * 512
+                updated_folders[folder] = (folder_stat.st_mtime_ns, size)
+                total_size += size
+                folders += subfolders
+            removed_folders = [folder for folder in known_folders if folder not in visited_folders]
+            if updated_folders:
+                pga.set_disk_usage(updated_folders)
+            if removed_folders:
+                pga.delete_disk_usage(removed_folders)
+        logger.debug(
+            "%s uses %d bytes, %d of %d folders listed",
+            path, total_size, len(updated_folders), len(visited_folders)
+        )
+        return total_size
+
+    def update_games(self, full=False):
+        """Measure the folders of installed games and save their sizes.
+
+        Returns the ids of the games whose size changed.
+        """
+        updated_ids = []
+        for game in pga.get_games(filter_installed=True):
+            directory = game["directory"]
+            if not directory or not system.is_removeable(directory, [os.path.expanduser("~")]):
+                # Don't measure system folders or home folders
+                continue
+            disk_size = self.get_size(directory, full=full)
+            if disk_size != game["disk_size"]:
+                pga.set_disk_size(game["id"], disk_size)
+                updated_ids.append(game["id"])
+        return updated_ids
+
+    def get_runner_sizes(self, full=False):
+        """Return a dict of the space used by each installed runner"""
+        if not os.path.isdir(settings.RUNNER_DIR):
+            return {}
+        return {
+            runner: self.get_size(os.path.join(settings.RUNNER_DIR, runner), full=full)
+            for runner in sorted(os.listdir(settings.RUNNER_DIR))
+            if os.path.isdir(os.path.join(settings.RUNNER_DIR, runner))
+        }
+
+
+DISK_USAGE = DiskUsageIndex()
@@ -1,8 +1,7 @@
 """Filesystem utilities"""
 import os
-import subprocess
-from gi.repository import Gio
 from lutris.util.log import logger
+from lutris.util.mountinfo import MOUNT_TABLE
 
 
 def get_mounted_discs():
@@ -10,6 +9,9 @@ def get_mounted_discs():
 
     :rtype: list of Gio.Mount
     """
+    # Imported here to keep this module usable without GI
+    from gi.repository import Gio
+
     volumes = Gio.VolumeMonitor.get()
     drives = []
 
@@ -28,6 +30,9 @@ def get_mounted_discs():
 
 def find_mount_point(path):
     """Return the mount point a file is located on"""
+    mount = MOUNT_TABLE.get_mount(path)
+    if mount:
+        return mount.mount_point
     path = os.path.abspath(path)
     while not os.path.ismount(path):
         path = os.path.dirname(path)
@@ -36,16 +41,11 @@ def find_mount_point(path):
 
 def get_mountpoint_drives():
     """Return a mapping of mount points with their corresponding drives"""
-    mounts = subprocess.check_output(["mount", "-v"]).decode("utf-8").split("\n")
-    mount_map = []
-    for mount in mounts:
-        mount_parts = mount.split()
-        if len(mount_parts) < 3:
-            continue
-        mount_map.append((mount_parts[2], mount_parts[0]))
-    return dict(mount_map)
+    return {mount.mount_point: mount.source for mount in MOUNT_TABLE.mounts}
 
 
 def get_drive_for_path(path):
     """Return the physical drive a file is located on"""
-    return get_mountpoint_drives().get(find_mount_point(path))
+    mount = MOUNT_TABLE.get_mount(path)
+    if mount:
+        return mount.source
@@ -9,6 +9,7 @@ from lutris.util import system
 from lutris.util.log import logger
 from lutris.util.graphics.xrandr import LegacyDisplayManager, change_resolution, get_outputs
 from lutris.util.graphics.displayconfig import MutterDisplayManager
+from lutris.util.graphics.inventory import GRAPHICS_INVENTORY
 
 
 class NoScreenDetected(Exception):
@@ -30,21 +31,9 @@ def _get_graphics_adapters():
     """Return the list of graphics cards available on a system
 
     Returns:
-        list: list of tuples containing PCI ID and description of the display controller
+        list: list of tuples containing PCI slot and vendor:device ID of the display controller
     """
-    lspci_path = system.find_executable("lspci")
-    dev_subclasses = ["VGA", "XGA", "3D controller", "Display controller"]
-    if not lspci_path:
-        logger.warning("lspci is not available. List of graphics cards not available")
-        return []
-    return [
-        (pci_id, device_desc.split(": ")[1])
-        for pci_id, device_desc in [
-            line.split(maxsplit=1)
-            for line in system.execute(lspci_path).split("\n")
-            if any(subclass in line for subclass in dev_subclasses)
-        ]
-    ]
+    return GRAPHICS_INVENTORY.graphics_adapters
 
 
 class DisplayManager:
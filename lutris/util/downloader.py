@@ -1,4 +1,5 @@
 import os
+import threading
 import time
 import requests
 
@@ -12,31 +13,46 @@ from lutris.util.log import logger
 # download speeds.
 get_time = time.monotonic
 
+# Highest progress reported while the downloaded file isn't in place yet
+MAX_PARTIAL_PROGRESS = 0.99
+
 
 class Downloader:
     """Non-blocking downloader.
 
     Do start() then check_progress() at regular intervals.
-    Download is done when check_progress() returns 1.0.
+    Download is done when the state is COMPLETED; check_progress() only
+    returns 1.0 once the file is at its destination.
     Stop with cancel().
+
+    Data is written to a temporary file next to the destination, which is
+    preallocated when the size is known and only renamed to the destination
+    once the download is complete and flushed to disk.
+
+    When a `stream` is given, such as an ArchiveStream, the data is written
+    to it instead of a file and the stream is closed when the download
+    completes, or aborted if it fails.
     """
 
     (INIT, DOWNLOADING, CANCELLED, ERROR, COMPLETED) = list(range(5))
 
-    def __init__(self, url, dest, overwrite=False, referer=None, callback=None):
+    def __init__(self, url, dest, overwrite=False, referer=None, callback=None, stream=None):
         self.url = url
         self.dest = dest
+        self.tmp_dest = dest + ".part"
         self.overwrite = overwrite
         self.referer = referer
         self.stop_request = None
         self.thread = None
         self.callback = callback
+        self.stream = stream
 
         # Read these after a check_progress()
         self.state = self.INIT
         self.error = None
         self.downloaded_size = 0  # Bytes
         self.full_size = 0  # Bytes
+        self.content_encoding = None
         self.progress_fraction = 0
         self.progress_percentage = 0
         self.speed = 0
@@ -49,15 +65,21 @@ class Downloader:
         self.speed_check_time = 0
         self.time_left_check_time = 0
         self.file_pointer = None
+        # Set once the file is at its destination, or the stream closed
+        self.finalized = False
+        # Held while the download thread writes or moves the file
+        self._lock = threading.Lock()
 
     def start(self):
         """Start download job."""
         logger.debug("Starting download of:\n %s", self.url)
         self.state = self.DOWNLOADING
         self.last_check_time = get_time()
-        if self.overwrite and os.path.isfile(self.dest):
-            os.remove(self.dest)
-        self.file_pointer = open(self.dest, "wb")
+        if self.stream:
+            self.stream.start()
+            self.file_pointer = self.stream
+        else:
+            self.file_pointer = open(self.tmp_dest, "wb")
         self.thread = jobs.AsyncCall(self.async_download, self.on_done)
         self.stop_request = self.thread.stop_request
 
@@ -70,25 +92,37 @@ class Downloader:
         return self.progress_fraction
 
     def cancel(self):
-        """Request download stop and remove destination file."""
-        logger.debug("Download of %s cancelled", self.url)
-        self.state = self.CANCELLED
-        if self.stop_request:
-            self.stop_request.set()
+        """Request download stop and remove the partially downloaded file."""
+        with self._lock:
+            if self.finalized:
+                logger.debug("Download of %s already completed", self.url)
+                return
+            logger.debug("Download of %s cancelled", self.url)
+            self.state = self.CANCELLED
+            if self.stop_request:
+                self.stop_request.set()
+            if self.stream:
+                # The stream is aborted by the download thread
+                return
+            self.remove_partial_file()
+
+    def remove_partial_file(self):
+        if self.stream:
+            self.stream.abort()
+            self.file_pointer = None
+            return
         if self.file_pointer:
             self.file_pointer.close()
             self.file_pointer = None
-        if os.path.isfile(self.dest):
-            os.remove(self.dest)
+        if os.path.isfile(self.tmp_dest):
+            os.remove(self.tmp_dest)
 
     def on_done(self, _result, error):
         if error:
             logger.error("Download failed: %s", error)
             self.state = self.ERROR
             self.error = error
-            if self.file_pointer:
-                self.file_pointer.close()
-                self.file_pointer = None
+            self.remove_partial_file()
             return
 
         if self.state == self.CANCELLED:
@@ -102,8 +136,6 @@ class Downloader:
             self.progress_fraction = 1.0
             self.progress_percentage = 100
         self.state = self.COMPLETED
-        self.file_pointer.close()
-        self.file_pointer = None
         if self.callback:
             self.callback()
 
@@ -117,12 +149,59 @@ class Downloader:
             logger.info("%s returned a %s error" % (self.url, response.status_code))
         response.raise_for_status()
         self.full_size = int(response.headers.get("Content-Length", "").strip() or 0)
+        self.content_encoding = response.headers.get("Content-Encoding")
+        # Content-Length is the size of the encoded data when there is a
+        # Content-Encoding, and the chunks are already decoded
+        if self.full_size and not self.content_encoding:
+            self.preallocate()
         for chunk in response.iter_content(chunk_size=1024 * 1024):
-            if not self.file_pointer:
-                break
-            if chunk:
-                self.downloaded_size += len(chunk)
-                self.file_pointer.write(chunk)
+            with self._lock:
+                if not self.file_pointer:
+                    break
+                if self.stream and self.state == self.CANCELLED:
+                    self.remove_partial_file()
+                    return
+                if chunk:
+                    self.downloaded_size += len(chunk)
+                    self.file_pointer.write(chunk)
+        self.finalize()
+
+    def preallocate(self):
+        """Reserve the space for the whole file to limit its fragmentation"""
+        if self.stream:
+            return
+        try:
+            os.posix_fallocate(self.file_pointer.fileno(), 0, self.full_size)
+        except (AttributeError, OSError) as ex:
+            logger.debug("Unable to preallocate %s: %s", self.tmp_dest, ex)
+
+    def finalize(self):
+        """Flush the downloaded file to disk and move it to its destination"""
+        if not self.file_pointer:
+            # The download was cancelled
+            return
+        if self.full_size and not self.content_encoding and self.downloaded_size != self.full_size:
+            raise IOError(
+                "Download of %s interrupted after %s of %s bytes"
+                % (self.url, self.downloaded_size, self.full_size)
+            )
+        if self.stream:
+            self.stream.close()
+            self.file_pointer = None
+            self.finalized = True
+            return
+        # cancel() waits for the file to be in place instead of removing it
+        with self._lock:
+            file_pointer = self.file_pointer
+            if not file_pointer:
+                # The download was cancelled
+                return
+            file_pointer.flush()
+            os.fsync(file_pointer.fileno())
+            file_pointer.close()
+            self.file_pointer = None
+            os.replace(self.tmp_dest, self.dest)
+            self.finalized = True
 
     def get_stats(self):
         """Calculate and store download stats."""
@@ -133,6 +212,8 @@ class Downloader:
 
         if self.full_size:
             self.progress_fraction = float(self.downloaded_size) / float(self.full_size)
+            if not self.finalized:
+                self.progress_fraction = min(self.progress_fraction, MAX_PARTIAL_PROGRESS)
             self.progress_percentage = self.progress_fraction * 100
 
     def get_speed(self):
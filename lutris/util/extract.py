@@ -1,20 +1,78 @@
 import os
+import re
 import errno
 import uuid
+import select
 import shutil
 import tarfile
 import subprocess
 import gzip
+import bz2
+import lzma
+import queue
+import threading
+import time
 import zlib
 from lutris.util import system
+from lutris.util.filecopy import FolderCopy, copy_file
 from lutris.util.log import logger
 from lutris import settings
 
+# Extraction strategies, see get_extract_strategy
+EXTRACT_DIRECT = "direct"
+EXTRACT_MOVE = "move"
+
+# Modules used to decompress single files, by extractor
+DECOMPRESSORS = {"gzip": gzip, "bzip2": bz2, "xz": lzma}
+
+# Size of the chunks of decompressed data, and number of chunks waiting to
+# be written when writing from a separate thread.
+DECOMPRESS_CHUNK_SIZE = 1024 * 1024
+DECOMPRESS_QUEUE_SIZE = 4
+
+# Percentages in the progress output of 7z and innoextract
+PROGRESS_REGEX = re.compile(rb"(\d+(?:\.\d+)?)%")
+
 
 class ExtractFailure(Exception):
     """Exception raised when and archive fails to extract"""
 
 
+class ExtractCancelled(ExtractFailure):
+    """Exception raised when an extraction is cancelled"""
+
+
+class ExtractProgress:
+    """Progress of an extraction, with a throughput based on the archive size"""
+
+    def __init__(self, archive_size):
+        self.archive_size = archive_size
+        self.fraction = 0
+        self.start_time = time.monotonic()
+
+    @property
+    def percent(self):
+        return int(self.fraction * 100)
+
+    @property
+    def speed(self):
+        """Bytes of the archive processed per second"""
+        elapsed_time = time.monotonic() - self.start_time
+        if not elapsed_time:
+            return 0
+        return self.archive_size * self.fraction / elapsed_time
+
+    @property
+    def time_left(self):
+        """Estimated time until the end of the extraction, as a string"""
+        if not self.fraction:
+            return "???"
+        elapsed_time = time.monotonic() - self.start_time
+        minutes, seconds = divmod(elapsed_time * (1 - self.fraction) / self.fraction, 60)
+        hours, minutes = divmod(minutes, 60)
+        return "%d:%02d:%02d" % (hours, minutes, seconds)
+
+
 def random_id():
     """Return a random ID"""
     return str(uuid.uuid4())[:8]
@@ -68,11 +126,9 @@ def is_7zip_supported(path, extractor):
         return ext in supported_extractors
 
 
-def extract_archive(path, to_directory=".", merge_single=True, extractor=None):
-    path = os.path.abspath(path)
+def get_opener(path, extractor=None):
+    """Return the (opener, mode) tuple used to extract an archive"""
     mode = None
-    logger.debug("Extracting %s to %s", path, to_directory)
-
     if extractor is None:
         if path.endswith(".tar.gz") or path.endswith(".tgz"):
             extractor = "tgz"
@@ -84,6 +140,10 @@ def extract_archive(path, to_directory=".", merge_single=True, extractor=None):
             extractor = "bz2"
         elif path.endswith(".gz"):
             extractor = "gzip"
+        elif path.endswith(".bz2"):
+            extractor = "bzip2"
+        elif path.endswith(".xz"):
+            extractor = "xz"
         elif path.endswith(".exe"):
             extractor = "exe"
         elif is_7zip_supported(path, None):
@@ -101,9 +161,8 @@ def extract_archive(path, to_directory=".", merge_single=True, extractor=None):
         opener, mode = tarfile.open, "r:"
     elif extractor == "bz2":
         opener, mode = tarfile.open, "r:bz2"
-    elif extractor == "gzip":
-        decompress_gz(path, to_directory)
-        return
+    elif extractor in DECOMPRESSORS:
+        opener, mode = "decompress", extractor
     elif extractor == "gog":
         opener = "innoextract"
     elif extractor == "exe":
@@ -112,73 +171,377 @@ def extract_archive(path, to_directory=".", merge_single=True, extractor=None):
         opener = "7zip"
     else:
         raise RuntimeError("Could not extract `%s` - unknown format specified" % path)
+    return opener, mode
+
+
+def extract_archive(path, to_directory=".", merge_single=True, extractor=None,
+                    callback=None, cancel_event=None, manifest=None):
+    """Extract an archive to `to_directory`
+
+    Params:
+        callback (callable): Called with an ExtractProgress as the
+            extraction progresses
+        cancel_event (threading.Event): Stops the extraction when set
+        manifest (InstallManifest): Records the extracted files
+    """
+    path = os.path.abspath(path)
+    logger.debug("Extracting %s to %s", path, to_directory)
+    opener, mode = get_opener(path, extractor)
+    if opener == "decompress":
+        os.makedirs(to_directory, exist_ok=True)
+        try:
+            decompressed_path = decompress(path, to_directory, mode, callback, cancel_event, threaded=True)
+        except (OSError, zlib.error, lzma.LZMAError, EOFError) as ex:
+            logger.error("Decompression failed: %s", ex)
+            raise ExtractFailure(str(ex))
+        if manifest:
+            manifest.add_file(decompressed_path)
+        return
+
+    strategy = get_extract_strategy(to_directory)
+    if strategy == EXTRACT_DIRECT:
+        created = not os.path.exists(to_directory)
+        try:
+            _do_extract(path, to_directory, opener, mode, extractor, callback, cancel_event)
+        except ExtractFailure:
+            discard_extracted(to_directory, created)
+            raise
+        except (OSError, zlib.error, tarfile.ReadError, EOFError) as ex:
+            logger.error("Extraction failed: %s", ex)
+            discard_extracted(to_directory, created)
+            raise ExtractFailure(str(ex))
+        if merge_single:
+            lift_single_folder(to_directory)
+        if manifest:
+            manifest.add_tree(to_directory)
+    else:
+        temp_name = ".extract-" + random_id()
+        temp_dir = os.path.join(to_directory, temp_name)
+        try:
+            _do_extract(path, temp_dir, opener, mode, extractor, callback, cancel_event)
+        except ExtractFailure:
+            system.remove_folder(temp_dir)
+            raise
+        except (OSError, zlib.error, tarfile.ReadError, EOFError) as ex:
+            logger.error("Extraction failed: %s", ex)
+            raise ExtractFailure(str(ex))
+        move_extracted(temp_dir, to_directory, merge_single=merge_single, manifest=manifest)
+    logger.debug("Finished extracting %s to %s", path, to_directory)
+    return path, to_directory
 
-    temp_name = ".extract-" + random_id()
-    temp_path = temp_dir = os.path.join(to_directory, temp_name)
+
+def get_extract_strategy(to_directory):
+    """Return how an archive should be extracted to `to_directory`.
+
+    Archives are extracted in place when there is nothing to merge them with,
+    otherwise they go to a temporary folder inside the destination, on the
+    same filesystem, from which files are moved with renames.
+    """
     try:
-        _do_extract(path, temp_path, opener, mode, extractor)
-    except (OSError, zlib.error, tarfile.ReadError, EOFError) as ex:
-        logger.error("Extraction failed: %s", ex)
-        raise ExtractFailure(str(ex))
+        if os.listdir(to_directory):
+            return EXTRACT_MOVE
+    except FileNotFoundError:
+        pass
+    except NotADirectoryError:
+        return EXTRACT_MOVE
+    return EXTRACT_DIRECT
+
+
+def _is_folder(path):
+    return os.path.isdir(path) and not os.path.islink(path)
+
+
+def discard_extracted(to_directory, created):
+    """Delete the files of a failed extraction made in place"""
+    if not os.path.isdir(to_directory):
+        return
+    if created:
+        system.remove_folder(to_directory)
+        return
+    for name in os.listdir(to_directory):
+        path = os.path.join(to_directory, name)
+        if _is_folder(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+def lift_single_folder(directory):
+    """Replace a single folder in `directory` with its contents"""
+    extracted = os.listdir(directory)
+    if len(extracted) != 1:
+        return
+    single_path = os.path.join(directory, extracted[0])
+    if not _is_folder(single_path):
+        return
+    # Rename the folder first in case it contains an entry of the same name
+    temp_path = os.path.join(directory, ".extract-" + random_id())
+    os.rename(single_path, temp_path)
+    for name in os.listdir(temp_path):
+        os.rename(os.path.join(temp_path, name), os.path.join(directory, name))
+    os.rmdir(temp_path)
+
+
+def replace_folder(source_path, destination_path):
+    """Put the folder `source_path` in place of `destination_path`.
+
+    The existing folder is only deleted once the new one is in place so
+    that the destination never appears partially populated.
+    """
+    directory, name = os.path.split(destination_path)
+    old_path = os.path.join(directory, ".%s-%s" % (name, random_id()))
+    os.rename(destination_path, old_path)
+    os.rename(source_path, destination_path)
+    system.remove_folder(old_path)
+
+
+def move_entry(source_path, destination_path):
+    """Move a file or folder, merging folders with existing ones.
+
+    Entries are renamed whenever possible and only copied when the
+    destination is on another filesystem.
+    Returns the number of bytes copied.
+    """
+    if _is_folder(source_path) and os.path.isdir(destination_path):
+        copied = 0
+        for name in os.listdir(source_path):
+            copied += move_entry(
+                os.path.join(source_path, name),
+                os.path.join(destination_path, name)
+            )
+        os.rmdir(source_path)
+        return copied
+    if os.path.isdir(destination_path):
+        logger.warning("Renaming existing folder %s", destination_path)
+        os.rename(destination_path, destination_path + random_id())
+    elif os.path.lexists(destination_path) and _is_folder(source_path):
+        os.remove(destination_path)
+    try:
+        os.replace(source_path, destination_path)
+        return 0
+    except OSError as ex:
+        if ex.errno != errno.EXDEV:
+            raise
+    if _is_folder(source_path):
+        folder_copy = FolderCopy(source_path, destination_path)
+        folder_copy.copy()
+        system.remove_folder(source_path)
+        return folder_copy.copied_bytes
+    copy_file(source_path, destination_path)
+    os.remove(source_path)
+    return os.path.getsize(destination_path)
+
+
+def move_extracted(temp_dir, to_directory, merge_single=True, replace=False, manifest=None):
+    """Move the files extracted in `temp_dir` to `to_directory`
+
+    Params:
+        merge_single (bool): If the archive has a single top level folder,
+            move its contents instead of the folder itself
+        replace (bool): Replace existing folders instead of merging them
+        manifest (InstallManifest): Records the moved files
+
+    Returns:
+        int: Number of bytes that had to be copied instead of moved
+    """
+    temp_path = temp_dir
     if merge_single:
         extracted = os.listdir(temp_path)
         if len(extracted) == 1:
             temp_path = os.path.join(temp_path, extracted[0])
 
+    copied = 0
     if os.path.isfile(temp_path):
         destination_path = os.path.join(to_directory, extracted[0])
         if os.path.isfile(destination_path):
             logger.warning("Overwrite existing file %s", destination_path)
-            os.remove(destination_path)
-        if os.path.isdir(destination_path):
-            os.rename(destination_path, destination_path + random_id())
-
-        shutil.move(temp_path, to_directory)
+        if manifest:
+            manifest.add_file(destination_path, source_path=temp_path)
+        copied += move_entry(temp_path, destination_path)
         os.removedirs(temp_dir)
     else:
         for archive_file in os.listdir(temp_path):
             source_path = os.path.join(temp_path, archive_file)
             destination_path = os.path.join(to_directory, archive_file)
-            # logger.debug("Moving extracted files from %s to %s", source_path, destination_path)
-
+            if manifest:
+                manifest.add_tree(source_path, destination_path)
             if system.path_exists(destination_path):
                 logger.warning("Overwrite existing path %s", destination_path)
-                if os.path.isfile(destination_path):
-                    os.remove(destination_path)
-                    shutil.move(source_path, destination_path)
-                elif os.path.isdir(destination_path):
-                    try:
-                        system.merge_folders(source_path, destination_path)
-                    except OSError as ex:
-                        logger.error(
-                            "Failed to merge to destination %s: %s",
-                            destination_path,
-                            ex,
-                        )
-                        raise ExtractFailure(str(ex))
-            else:
-                shutil.move(source_path, destination_path)
+                if _is_folder(destination_path) and _is_folder(source_path) and replace:
+                    replace_folder(source_path, destination_path)
+                    continue
+            try:
+                copied += move_entry(source_path, destination_path)
+            except OSError as ex:
+                logger.error("Failed to move to destination %s: %s", destination_path, ex)
+                raise ExtractFailure(str(ex))
         system.remove_folder(temp_dir)
-    logger.debug("Finished extracting %s to %s", path, to_directory)
-    return path, to_directory
+    if copied:
+        logger.debug("%d bytes copied to %s", copied, to_directory)
+    return copied
+
+
+def get_stream_mode(path):
+    """Return the tarfile stream mode for an archive, or None if the archive
+    can't be extracted while it is being downloaded.
+    """
+    if path.endswith((".tar.gz", ".tgz")):
+        return "r|gz"
+    if path.endswith((".tar.xz", ".txz")):
+        return "r|xz"
+    if path.endswith((".tar.bz2", ".tbz")):
+        return "r|bz2"
+    if path.endswith(".tar"):
+        return "r|"
+    return None
+
+
+class ArchiveStream:
+    """Extract a tar archive from data written to it as it gets downloaded.
+
+    Data is fed through a pipe to a thread reading the archive with tarfile.
+    Files are extracted in place if the destination is empty, otherwise to a
+    temporary folder and moved to their destination once the whole archive
+    has been written and closed.
+    """
+
+    def __init__(self, path, to_directory, merge_single=True, replace=False):
+        self.mode = get_stream_mode(path)
+        if not self.mode:
+            raise ValueError("Can't extract %s while downloading it" % path)
+        self.path = path
+        self.to_directory = to_directory
+        self.merge_single = merge_single
+        self.replace = replace
+        self.temp_dir = os.path.join(to_directory, ".extract-" + random_id())
+        self.strategy = None
+        self.created = False
+        self.error = None
+        self.reader = None
+        self.writer = None
+        self.thread = None
+
+    @property
+    def extract_dir(self):
+        """Folder the archive is extracted to"""
+        if self.strategy == EXTRACT_DIRECT:
+            return self.to_directory
+        return self.temp_dir
+
+    def start(self):
+        """Start the extraction thread, waiting for data"""
+        self.strategy = get_extract_strategy(self.to_directory)
+        if self.strategy == EXTRACT_DIRECT:
+            self.created = not os.path.exists(self.to_directory)
+            os.makedirs(self.to_directory, exist_ok=True)
+        else:
+            os.makedirs(self.temp_dir)
+        read_fd, write_fd = os.pipe()
+        self.reader = os.fdopen(read_fd, "rb")
+        self.writer = os.fdopen(write_fd, "wb")
+        self.thread = threading.Thread(target=self._extract, daemon=True)
+        self.thread.start()
+
+    def _extract(self):
+        try:
+            with tarfile.open(fileobj=self.reader, mode=self.mode) as archive:
+                archive.extractall(self.extract_dir)
+            # Consume any padding after the end of the archive
+            while self.reader.read(1024 * 1024):
+                pass
+        except Exception as ex:  # pylint: disable=broad-except
+            # Stored to be raised by the thread writing to the stream
+            self.error = ex
+        finally:
+            self.reader.close()
+
+    @property
+    def error_message(self):
+        return str(self.error) or type(self.error).__name__
+
+    def write(self, data):
+        """Feed a chunk of the archive to the extractor"""
+        try:
+            self.writer.write(data)
+        except BrokenPipeError:
+            # The extraction thread stopped reading because of an error
+            self.thread.join()
+            raise ExtractFailure(self.error_message)
+
+    def close(self):
+        """Wait for the extraction to finish and move files to the destination"""
+        try:
+            self.writer.close()
+        except BrokenPipeError:
+            pass
+        self.thread.join()
+        if self.error:
+            logger.error("Extraction of %s failed: %s", self.path, self.error_message)
+            self.discard()
+            raise ExtractFailure(self.error_message)
+        if self.strategy == EXTRACT_DIRECT:
+            if self.merge_single:
+                lift_single_folder(self.to_directory)
+        else:
+            move_extracted(
+                self.temp_dir,
+                self.to_directory,
+                merge_single=self.merge_single,
+                replace=self.replace
+            )
+        logger.debug("Finished extracting %s to %s", self.path, self.to_directory)
 
+    def abort(self):
+        """Stop the extraction and discard extracted files"""
+        if not self.thread:
+            return
+        try:
+            self.writer.close()
+        except BrokenPipeError:
+            pass
+        self.thread.join()
+        self.discard()
 
-def _do_extract(archive, dest, opener, mode=None, extractor=None):
+    def discard(self):
+        if self.strategy == EXTRACT_DIRECT:
+            discard_extracted(self.to_directory, self.created)
+        else:
+            system.remove_folder(self.temp_dir)
+
+
+def _do_extract(archive, dest, opener, mode=None, extractor=None, callback=None, cancel_event=None):
     if opener == "7zip":
-        extract_7zip(archive, dest, archive_type=extractor)
+        extract_7zip(archive, dest, archive_type=extractor, callback=callback, cancel_event=cancel_event)
     elif opener == "exe":
-        extract_exe(archive, dest)
+        extract_exe(archive, dest, callback=callback, cancel_event=cancel_event)
     elif opener == "innoextract":
-        extract_gog(archive, dest)
+        extract_gog(archive, dest, callback=callback, cancel_event=cancel_event)
     else:
-        handler = opener(archive, mode)
-        handler.extractall(dest)
-        handler.close()
+        extract_tar(archive, dest, mode, callback, cancel_event)
+
+
+def extract_tar(path, dest, mode, callback=None, cancel_event=None):
+    """Extract a tar archive, reporting progress on the archive data read"""
+    progress = ExtractProgress(os.path.getsize(path))
+
+    def iter_members(archive, archive_file):
+        for member in archive:
+            if cancel_event and cancel_event.is_set():
+                raise ExtractCancelled("Extraction of %s cancelled" % path)
+            yield member
+            if progress.archive_size:
+                progress.fraction = min(archive_file.tell() / progress.archive_size, 1)
+            if callback:
+                callback(progress)
 
+    with open(path, "rb") as archive_file:
+        with tarfile.open(fileobj=archive_file, mode=mode) as archive:
+            archive.extractall(dest, members=iter_members(archive, archive_file))
 
-def extract_exe(path, dest):
+
+def extract_exe(path, dest, callback=None, cancel_event=None):
     if check_inno_exe(path):
-        decompress_gog(path, dest)
+        decompress_gog(path, dest, callback=callback, cancel_event=cancel_event)
     else:
         # use 7za to check if exe is an archive
         _7zip_path = os.path.join(settings.RUNTIME_DIR, "p7zip/7za")
@@ -189,14 +552,14 @@ def extract_exe(path, dest):
         command = [_7zip_path, "t", path]
         return_code = subprocess.call(command)
         if return_code == 0:
-            extract_7zip(path, dest)
+            extract_7zip(path, dest, callback=callback, cancel_event=cancel_event)
         else:
             raise RuntimeError("specified exe is not an archive or GOG setup file")
 
 
-def extract_gog(path, dest):
+def extract_gog(path, dest, callback=None, cancel_event=None):
     if check_inno_exe(path):
-        decompress_gog(path, dest)
+        decompress_gog(path, dest, callback=callback, cancel_event=cancel_event)
     else:
         raise RuntimeError("specified exe is not a GOG setup file")
 
@@ -215,7 +578,7 @@ def check_inno_exe(path):
     return True
 
 
-def decompress_gog(file_path, destination_path):
+def decompress_gog(file_path, destination_path, callback=None, cancel_event=None):
     _innoextract_path = os.path.join(settings.RUNTIME_DIR, "innoextract/innoextract")
     if not system.path_exists(_innoextract_path):
         _innoextract_path = system.find_executable("innoextract")
@@ -227,37 +590,171 @@ def decompress_gog(file_path, destination_path):
     except OSError as e:
         if e.errno != errno.EEXIST:
             raise OSError("cannot make output directory for extracting setup file")
-    command = [_innoextract_path, "-g", "-d", destination_path, "-e", file_path]
-    return_code = subprocess.call(command)
-    if return_code != 0:
-        raise RuntimeError("innoextract failed to extract GOG setup file")
+    command = [_innoextract_path, "-g", "--progress=1", "-d", destination_path, "-e", file_path]
+    run_extractor(command, file_path, callback, cancel_event)
 
 
 def decompress_gz(file_path, dest_path=None):
     """Decompress a gzip file."""
-    if dest_path:
-        dest_filename = os.path.join(dest_path, os.path.basename(file_path[:-3]))
-    else:
-        dest_filename = file_path[:-3]
+    decompress(file_path, dest_path)
+    return dest_path
 
-    gzipped_file = gzip.open(file_path, "rb")
-    file_content = gzipped_file.read()
-    gzipped_file.close()
 
-    dest_file = open(dest_filename, "wb")
-    dest_file.write(file_content)
-    dest_file.close()
+def decompress(file_path, dest_path=None, compression="gzip", callback=None,
+               cancel_event=None, threaded=False):
+    """Decompress a single compressed file and return the decompressed file path.
 
-    return dest_path
+    Data goes through fixed size chunks, so memory use doesn't depend on the
+    size of the file.
+
+    Params:
+        dest_path (str): Folder of the decompressed file, defaults to the
+            folder of the compressed file
+        compression (str): gzip, bzip2 or xz
+        callback (callable): Called with an ExtractProgress
+        cancel_event (threading.Event): Stops the decompression when set
+        threaded (bool): Write decompressed data from a separate thread
+    """
+    dest_filename, _ext = os.path.splitext(os.path.basename(file_path))
+    if dest_filename == os.path.basename(file_path):
+        dest_filename += ".out"
+    dest_filename = os.path.join(dest_path or os.path.dirname(file_path), dest_filename)
+    progress = ExtractProgress(os.path.getsize(file_path))
+    try:
+        with open(file_path, "rb") as compressed_file, \
+                DECOMPRESSORS[compression].open(compressed_file, "rb") as payload, \
+                open(dest_filename, "wb") as dest_file:
+            chunks = _read_chunks(payload, compressed_file, progress, callback, cancel_event)
+            if threaded:
+                _write_chunks_threaded(chunks, dest_file)
+            else:
+                for chunk in chunks:
+                    dest_file.write(chunk)
+    except BaseException:
+        if os.path.exists(dest_filename):
+            os.remove(dest_filename)
+        raise
+    return dest_filename
+
+
+def _read_chunks(payload, compressed_file, progress, callback=None, cancel_event=None):
+    """Yield the decompressed data of `payload` and report progress on the
+    compressed data consumed.
+    """
+    while True:
+        if cancel_event and cancel_event.is_set():
+            raise ExtractCancelled("Decompression of %s cancelled" % compressed_file.name)
+        chunk = payload.read(DECOMPRESS_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+        if progress.archive_size:
+            progress.fraction = min(compressed_file.tell() / progress.archive_size, 1)
+        if callback:
+            callback(progress)
+
+
+def _write_chunks_threaded(chunks, dest_file):
+    """Write chunks from another thread while the next ones get decompressed"""
+    chunk_queue = queue.Queue(maxsize=DECOMPRESS_QUEUE_SIZE)
+    errors = []
+
+    def write_chunks():
+        while True:
+            chunk = chunk_queue.get()
+            if chunk is None:
+                return
+            if errors:
+                continue
+            try:
+                dest_file.write(chunk)
+            except Exception as ex:  # pylint: disable=broad-except
+                errors.append(ex)
+
+    writer = threading.Thread(target=write_chunks, daemon=True)
+    writer.start()
+    try:
+        for chunk in chunks:
+            if errors:
+                break
+            chunk_queue.put(chunk)
+    finally:
+        chunk_queue.put(None)
+        writer.join()
+    if errors:
+        raise errors[0]
+
+
+def run_extractor(command, archive_path, callback=None, cancel_event=None):
+    """Run an external extractor, raising ExtractFailure if it fails.
+
+    Percentages printed by the extractor are reported to `callback` as an
+    ExtractProgress. The extractor is terminated if `cancel_event` gets set.
+    """
+    progress = ExtractProgress(os.path.getsize(archive_path))
+    logger.debug("Running %s", " ".join(command))
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT
+    )
+    output_fd = process.stdout.fileno()
+    output = b""
+    try:
+        while True:
+            if cancel_event and cancel_event.is_set():
+                raise ExtractCancelled("Extraction of %s cancelled" % archive_path)
+            readable, _writable, _exceptional = select.select([output_fd], [], [], 0.5)
+            if not readable:
+                continue
+            chunk = os.read(output_fd, 4096)
+            if not chunk:
+                break
+            # Progress is updated with carriage returns or backspaces
+            lines = re.split(rb"[\r\n\x08]", output + chunk)
+            output = lines.pop()
+            for line in lines:
+                _parse_extractor_output(line, progress, callback)
+        _parse_extractor_output(output, progress, callback)
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    return_code = process.wait()
+    if return_code:
+        raise ExtractFailure(
+            "%s exited with code %s while extracting %s"
+            % (os.path.basename(command[0]), return_code, archive_path)
+        )
+
+
+def _parse_extractor_output(line, progress, callback):
+    line = line.strip()
+    if not line:
+        return
+    percent_match = PROGRESS_REGEX.search(line)
+    if not percent_match:
+        logger.debug(line.decode(errors="replace"))
+        return
+    fraction = min(float(percent_match.group(1)) / 100, 1)
+    if fraction > progress.fraction:
+        progress.fraction = fraction
+        if callback:
+            callback(progress)
 
 
-def extract_7zip(path, dest, archive_type=None):
+def extract_7zip(path, dest, archive_type=None, callback=None, cancel_event=None):
     _7zip_path = os.path.join(settings.RUNTIME_DIR, "p7zip/7z")
     if not system.path_exists(_7zip_path):
         _7zip_path = system.find_executable("7z")
     if not system.path_exists(_7zip_path):
         raise OSError("7zip is not found in the lutris runtime or on the system")
-    command = [_7zip_path, "x", path, "-o{}".format(dest), "-aoa"]
+    command = [_7zip_path, "x", path, "-o{}".format(dest), "-aoa", "-bso0", "-bsp1", "-mmt=on"]
     if archive_type:
         command.append("-t{}".format(archive_type))
-    subprocess.call(command)
+    run_extractor(command, path, callback, cancel_event)
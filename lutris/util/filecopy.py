@@ -0,0 +1,205 @@
+"""Fast copy of files and folder trees"""
+import concurrent.futures
+import errno
+import fcntl
+import os
+import shutil
+import threading
+
+from lutris.util.log import logger
+
+# ioctl request sharing the extents of a file with another one (_IOW(0x94, 9, int))
+FICLONE = 0x40049409
+
+# Maximum number of bytes copied by each system call, to report progress and
+# react to cancellation when copying large files.
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Files copied simultaneously when copying folders
+MAX_COPY_WORKERS = 8
+
+# Suffix of the files being copied, renamed over their destination when done
+COPY_SUFFIX = ".lutris-copy"
+
+# Errors meaning that a copy method isn't available for a pair of files
+UNSUPPORTED_ERRORS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTTY)
+
+
+class CopyCancelled(Exception):
+    """Exception raised when a copy is cancelled"""
+
+
+def clone_file(src_fd, dst_fd):
+    """Make the destination share the data of the source (reflink).
+
+    Returns False if the filesystem doesn't support it.
+    """
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError as ex:
+        if ex.errno in UNSUPPORTED_ERRORS or ex.errno == errno.EBADF:
+            return False
+        raise
+    return True
+
+
+def _copy_range(copy_func, src_fd, dst_fd, size, on_progress=None, cancel_event=None):
+    """Copy `size` bytes in chunks with `copy_func` returning the bytes copied.
+
+    Returns False if `copy_func` isn't supported for these files, which can
+    only be detected before anything is copied.
+    """
+    offset = 0
+    while offset < size:
+        if cancel_event and cancel_event.is_set():
+            raise CopyCancelled()
+        try:
+            copied = copy_func(src_fd, dst_fd, offset, min(COPY_CHUNK_SIZE, size - offset))
+        except OSError as ex:
+            if not offset and ex.errno in UNSUPPORTED_ERRORS:
+                return False
+            raise
+        if not copied:
+            break
+        offset += copied
+        if on_progress:
+            on_progress(copied)
+    return True
+
+
+def _copy_file_range(src_fd, dst_fd, offset, count):
+    return os.copy_file_range(src_fd, dst_fd, count, offset, offset)  # pylint: disable=no-member
+
+
+def _sendfile(src_fd, dst_fd, offset, count):
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+
+def copy_file(src, dst, on_progress=None, cancel_event=None):
+    """Copy a file with its metadata, using the fastest method available.
+
+    Tries in order to reflink the file, to copy it in the kernel with
+    copy_file_range or sendfile and then falls back to a regular copy.
+    The copy is written next to the destination and renamed over it, so
+    other hard links to an existing destination keep their content.
+
+    Params:
+        on_progress (callable): Called with the number of bytes copied
+        cancel_event (threading.Event): Interrupts the copy when set
+    """
+    tmp_path = "%s.%d%s" % (dst, threading.get_ident(), COPY_SUFFIX)
+    try:
+        with open(src, "rb") as src_file, open(tmp_path, "wb") as dst_file:
+            _copy_data(src_file, dst_file, on_progress, cancel_event)
+        shutil.copystat(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _copy_data(src_file, dst_file, on_progress=None, cancel_event=None):
+    src_fd = src_file.fileno()
+    dst_fd = dst_file.fileno()
+    size = os.fstat(src_fd).st_size
+    if clone_file(src_fd, dst_fd):
+        if on_progress:
+            on_progress(size)
+        return
+    copy_funcs = [_sendfile]
+    if hasattr(os, "copy_file_range"):
+        copy_funcs.insert(0, _copy_file_range)
+    for copy_func in copy_funcs:
+        if _copy_range(copy_func, src_fd, dst_fd, size, on_progress, cancel_event):
+            return
+    while True:
+        if cancel_event and cancel_event.is_set():
+            raise CopyCancelled()
+        chunk = src_file.read(1024 * 1024)
+        if not chunk:
+            break
+        dst_file.write(chunk)
+        if on_progress:
+            on_progress(len(chunk))
+
+
+class FolderCopy:
+    """Copy the contents of a folder into another one with a pool of workers.
+
+    Existing files in the destination are overwritten, other files are kept.
+    Progress is reported as (copied files, total files, copied bytes,
+    total bytes) and the copy can be interrupted with `cancel()`.
+    """
+
+    def __init__(self, source, destination, max_workers=MAX_COPY_WORKERS, callback=None):
+        self.source = os.path.abspath(source)
+        self.destination = destination
+        self.max_workers = max_workers
+        self.callback = callback
+        self.cancel_event = threading.Event()
+        self.total_files = 0
+        self.total_bytes = 0
+        self.copied_files = 0
+        self.copied_bytes = 0
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def report_progress(self, copied_bytes=0, copied_files=0):
+        with self._lock:
+            self.copied_bytes += copied_bytes
+            self.copied_files += copied_files
+            progress = (self.copied_files, self.total_files, self.copied_bytes, self.total_bytes)
+        if self.callback:
+            self.callback(*progress)
+
+    def get_file_list(self):
+        """Create the destination folders and return the files to copy"""
+        files = []
+        for dirpath, dirnames, filenames in os.walk(self.source):
+            source_relpath = dirpath[len(self.source):].strip("/")
+            dst_abspath = os.path.join(self.destination, source_relpath)
+            os.makedirs(dst_abspath, exist_ok=True)
+            for dirname in dirnames:
+                try:
+                    os.mkdir(os.path.join(dst_abspath, dirname))
+                except OSError:
+                    pass
+            for filename in filenames:
+                src_path = os.path.join(dirpath, filename)
+                try:
+                    size = os.stat(src_path).st_size
+                except OSError:
+                    size = 0
+                files.append((src_path, os.path.join(dst_abspath, filename), size))
+        return files
+
+    def copy(self):
+        """Run the copy, blocking until all files are copied"""
+        files = self.get_file_list()
+        self.total_files = len(files)
+        self.total_bytes = sum(size for _src, _dst, size in files)
+        logger.debug(
+            "Copying %d files (%d bytes) from %s to %s",
+            self.total_files, self.total_bytes, self.source, self.destination
+        )
+        # Copy the largest files first so they don't end up running alone
+        files.sort(key=lambda file_info: file_info[2], reverse=True)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.copy_file, src, dst) for src, dst, _size in files]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    future.result()
+            except BaseException:
+                self.cancel()
+                raise
+
+    def copy_file(self, src, dst):
+        if self.cancel_event.is_set():
+            raise CopyCancelled()
+        copy_file(src, dst, self.report_progress, self.cancel_event)
+        self.report_progress(copied_files=1)
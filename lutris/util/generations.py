@@ -0,0 +1,125 @@
+"""Folders replaced atomically by newer generations of their content"""
+import ctypes
+import errno
+import os
+import shutil
+
+from lutris.util.log import logger
+
+# Folder holding the generations, next to the published folders
+GENERATIONS_DIR = ".generations"
+STAGING_PREFIX = "staging-"
+
+# renameat2 arguments swapping two paths
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+
+def exchange_paths(path1, path2):
+    """Swap two paths in a single step, return False if the system can't"""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        renameat2 = libc.renameat2
+    except (OSError, AttributeError):
+        return False
+    if renameat2(AT_FDCWD, os.fsencode(path1), AT_FDCWD, os.fsencode(path2), RENAME_EXCHANGE):
+        error = ctypes.get_errno()
+        if error in (errno.ENOSYS, errno.EINVAL):
+            return False
+        raise OSError(error, os.strerror(error), path1)
+    return True
+
+
+class FolderGenerations:
+    """A folder published as a link to its current generation.
+
+    New content is prepared in a staging folder then published by replacing
+    the link with a rename, so the folder is always complete for the
+    programs using it. The previous generation is kept until the next one is
+    staged, for the programs that started before it was replaced.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.generations_dir = os.path.join(os.path.dirname(path), GENERATIONS_DIR, os.path.basename(path))
+
+    def get_generation_path(self, generation):
+        return os.path.join(self.generations_dir, str(generation))
+
+    @property
+    def current_generation(self):
+        """Return the number of the published generation, None if the folder
+        isn't a link to a generation.
+        """
+        try:
+            target = os.readlink(self.path)
+        except OSError:
+            return None
+        if os.path.dirname(os.path.join(os.path.dirname(self.path), target)) != self.generations_dir:
+            return None
+        try:
+            return int(os.path.basename(target))
+        except ValueError:
+            return None
+
+    def get_generations(self):
+        """Return the numbers of the generations on disk"""
+        try:
+            names = os.listdir(self.generations_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(int(name) for name in names if name.isdigit())
+
+    def remove_old_generations(self):
+        """Delete the staging folders and the generations other than the
+        current one.
+        """
+        current_generation = self.current_generation
+        try:
+            names = os.listdir(self.generations_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name == str(current_generation):
+                continue
+            logger.debug("Removing generation %s of %s", name, self.path)
+            shutil.rmtree(os.path.join(self.generations_dir, name), ignore_errors=True)
+
+    def create_staging(self):
+        """Return a new empty folder to prepare the next generation in"""
+        self.remove_old_generations()
+        generations = self.get_generations()
+        next_generation = (generations[-1] if generations else 0) + 1
+        staging_path = os.path.join(self.generations_dir, STAGING_PREFIX + str(next_generation))
+        os.makedirs(staging_path)
+        return staging_path
+
+    def clone_current(self, destination):
+        """Fill `destination` with hard links to the files of the current
+        content. Files are replaced by renames when updated, which leaves the
+        linked files of the current generation unchanged.
+        """
+        shutil.copytree(self.path, destination, symlinks=True, copy_function=os.link)
+
+    def publish(self, content_path):
+        """Make `content_path` the new generation of the folder"""
+        generations = self.get_generations()
+        generation = (generations[-1] if generations else 0) + 1
+        generation_path = self.get_generation_path(generation)
+        os.rename(content_path, generation_path)
+        link_path = self.path + ".lutris-new"
+        if os.path.lexists(link_path):
+            os.remove(link_path)
+        os.symlink(os.path.relpath(generation_path, os.path.dirname(self.path)), link_path)
+        if os.path.isdir(self.path) and not os.path.islink(self.path):
+            # Folders created before generations become the generation 0
+            if not exchange_paths(link_path, self.path):
+                logger.debug("Unable to exchange %s atomically", self.path)
+                os.rename(self.path, link_path + "-old")
+                os.rename(link_path, self.path)
+                link_path += "-old"
+            os.rename(link_path, self.get_generation_path(0))
+        else:
+            os.replace(link_path, self.path)
+        logger.debug("Published generation %s of %s", generation, self.path)
+        return generation
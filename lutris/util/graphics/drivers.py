@@ -1,6 +1,8 @@
 """Hardware driver related utilities
 
-Everything in this module should rely on /proc or /sys only, no executable calls
+Everything in this module should rely on /proc or /sys only, no executable calls.
+Functions take the `root` of the filesystem to read, to test them with fake
+/proc and /sys trees.
 """
 import os
 import re
@@ -9,9 +11,9 @@ from lutris.util.log import logger
 MIN_RECOMMENDED_NVIDIA_DRIVER = 415
 
 
-def get_nvidia_driver_info():
+def get_nvidia_driver_info(root="/"):
     """Return information about NVidia drivers"""
-    version_file_path = "/proc/driver/nvidia/version"
+    version_file_path = os.path.join(root, "proc/driver/nvidia/version")
     if not os.path.exists(version_file_path):
         return
     with open(version_file_path) as version_file:
@@ -28,14 +30,14 @@ def get_nvidia_driver_info():
     }
 
 
-def get_nvidia_gpu_ids():
+def get_nvidia_gpu_ids(root="/"):
     """Return the list of Nvidia GPUs"""
-    return os.listdir("/proc/driver/nvidia/gpus")
+    return os.listdir(os.path.join(root, "proc/driver/nvidia/gpus"))
 
 
-def get_nvidia_gpu_info(gpu_id):
+def get_nvidia_gpu_info(gpu_id, root="/"):
     """Return details about a GPU"""
-    with open("/proc/driver/nvidia/gpus/%s/information" % gpu_id) as info_file:
+    with open(os.path.join(root, "proc/driver/nvidia/gpus/%s/information" % gpu_id)) as info_file:
         content = info_file.readlines()
     infos = {}
     for line in content:
@@ -44,22 +46,23 @@ def get_nvidia_gpu_info(gpu_id):
     return infos
 
 
-def is_nvidia():
+def is_nvidia(root="/"):
     """Return true if the Nvidia drivers are currently in use"""
-    return os.path.exists("/proc/driver/nvidia")
+    return os.path.exists(os.path.join(root, "proc/driver/nvidia"))
 
 
-def get_gpus():
+def get_gpus(root="/"):
     """Return GPUs connected to the system"""
-    if not os.path.exists("/sys/class/drm"):
+    drm_path = os.path.join(root, "sys/class/drm")
+    if not os.path.exists(drm_path):
         logger.error("No GPU available on this system!")
         return
-    for cardname in os.listdir("/sys/class/drm/"):
+    for cardname in sorted(os.listdir(drm_path)):
         if re.match(r"^card\d$", cardname):
             yield cardname
 
 
-def get_gpu_info(card):
+def get_gpu_info(card, root="/"):
     """Return information about a GPU"""
     infos = {
         "DRIVER": "",
@@ -67,7 +70,7 @@ def get_gpu_info(card):
         "PCI_SUBSYS_ID": ""
     }
     try:
-        with open("/sys/class/drm/%s/device/uevent" % card) as card_uevent:
+        with open(os.path.join(root, "sys/class/drm/%s/device/uevent" % card)) as card_uevent:
             content = card_uevent.readlines()
     except FileNotFoundError:
         logger.error("Unable to read driver information for card %s", card)
@@ -78,10 +81,10 @@ def get_gpu_info(card):
     return infos
 
 
-def is_amd():
+def is_amd(root="/"):
     """Return true if the system uses the AMD driver"""
-    for card in get_gpus():
-        if get_gpu_info(card)["DRIVER"] == "amdgpu":
+    for card in get_gpus(root):
+        if get_gpu_info(card, root)["DRIVER"] == "amdgpu":
             return True
 
 
@@ -102,13 +105,38 @@ def check_driver():
         )
 
 
-def is_outdated():
-    if not is_nvidia():
+def is_outdated(root="/"):
+    if not is_nvidia(root):
         return False
-    driver_info = get_nvidia_driver_info()
+    driver_info = get_nvidia_driver_info(root)
     driver_version = driver_info["nvrm"]["version"]
     if not driver_version:
         logger.error("Failed to get Nvidia version")
         return True
     major_version = int(driver_version.split(".")[0])
     return major_version < MIN_RECOMMENDED_NVIDIA_DRIVER
+
+
+def get_graphics_adapters(root="/"):
+    """Return the PCI slot and the vendor:device ID of the display controllers
+    of the system, the same devices lspci shows as VGA, XGA, 3D or display
+    controllers.
+    """
+    devices_path = os.path.join(root, "sys/bus/pci/devices")
+    adapters = []
+    try:
+        slots = sorted(os.listdir(devices_path))
+    except OSError:
+        return adapters
+    for slot in slots:
+        ids = {}
+        for key in ("class", "vendor", "device"):
+            try:
+                with open(os.path.join(devices_path, slot, key)) as id_file:
+                    ids[key] = id_file.read().strip()
+            except OSError:
+                ids[key] = ""
+        # Display controllers have the PCI base class 0x03
+        if ids["class"].startswith("0x03"):
+            adapters.append((slot, "%s:%s" % (ids["vendor"][2:], ids["device"][2:])))
+    return adapters
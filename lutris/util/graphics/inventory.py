@@ -0,0 +1,138 @@
+"""GPUs, graphics drivers and Vulkan support of the system"""
+import glob
+import os
+
+from lutris.util.graphics import drivers, glxinfo, vkquery
+from lutris.util.probe_cache import ProbeCache, get_mtime, read_file
+from lutris.util.xdg_dirs import get_user_cache_dir
+
+GRAPHICS_CACHE_PATH = os.path.join(get_user_cache_dir(), "lutris", "graphics.json")
+
+
+class GraphicsInventory(ProbeCache):
+    """Probe the graphics hardware and drivers once.
+
+    Reading /proc and /sys is cheap and done once per run. Loading libvulkan
+    and running glxinfo are not, their results are saved and reused until
+    the GPUs, their kernel drivers or the Mesa, Nvidia and Vulkan libraries
+    change.
+    All paths are read relative to `root`, to test with fake /proc and /sys
+    trees.
+    """
+
+    library_folders = [
+        "lib",
+        "lib32",
+        "lib64",
+        "usr/lib",
+        "usr/lib32",
+        "usr/lib64",
+        "usr/lib/i386-linux-gnu",
+        "usr/lib/x86_64-linux-gnu",
+    ]
+    library_names = [
+        "libGLX_mesa.so.0",
+        "libGLX_nvidia.so.0",
+        "libvulkan.so.1",
+    ]
+    icd_folders = ["usr/share/vulkan/icd.d", "etc/vulkan/icd.d"]
+    # Variables changing the driver used by glxinfo and Vulkan
+    environment_variables = ["DRI_PRIME", "__GLX_VENDOR_LIBRARY_NAME", "VK_ICD_FILENAMES"]
+
+    def __init__(self, cache_path=None, root="/"):
+        super().__init__(cache_path)
+        self.root = root
+
+    def _get_path(self, path):
+        return os.path.join(self.root, path)
+
+    def get_cache_key(self):
+        """Return the state of the GPUs, drivers and libraries"""
+        cards = []
+        modules = set()
+        for uevent_path in sorted(glob.glob(self._get_path("sys/class/drm/card*/device/uevent"))):
+            uevent = read_file(uevent_path)
+            cards.append(uevent)
+            for line in uevent.split("\n"):
+                if line.startswith("DRIVER="):
+                    modules.add(line.split("=", 1)[1])
+        library_paths = [
+            os.path.join(self._get_path(folder), name)
+            for folder in self.library_folders
+            for name in self.library_names
+        ] + [
+            icd_path
+            for folder in self.icd_folders
+            for icd_path in sorted(glob.glob(os.path.join(self._get_path(folder), "*.json")))
+        ]
+        return {
+            "cards": cards,
+            "modules": [
+                [
+                    module,
+                    read_file(self._get_path("sys/module/%s/version" % module)),
+                    read_file(self._get_path("sys/module/%s/srcversion" % module)),
+                ]
+                for module in sorted(modules)
+            ],
+            "nvidia": read_file(self._get_path("proc/driver/nvidia/version")),
+            "ld_cache": get_mtime(self._get_path("etc/ld.so.cache")),
+            "libraries": [[path, get_mtime(path)] for path in library_paths if os.path.exists(path)],
+            "env": [os.environ.get(name, "") for name in self.environment_variables],
+        }
+
+    @property
+    def gpus(self):
+        """Return a dict of the uevent information of each DRM card"""
+        return self._get_cached("GPUS", lambda: {
+            card: drivers.get_gpu_info(card, self.root)
+            for card in drivers.get_gpus(self.root) or []
+        })
+
+    @property
+    def is_nvidia(self):
+        return self._get_cached("IS_NVIDIA", lambda: drivers.is_nvidia(self.root))
+
+    @property
+    def is_amd(self):
+        return any(gpu["DRIVER"] == "amdgpu" for gpu in self.gpus.values())
+
+    @property
+    def nvidia_driver_info(self):
+        if not self.is_nvidia:
+            return None
+        return self._get_cached("NVIDIA_DRIVER", lambda: drivers.get_nvidia_driver_info(self.root))
+
+    @property
+    def nvidia_gpus(self):
+        """Return the information of each Nvidia GPU"""
+        if not self.is_nvidia:
+            return []
+        return self._get_cached("NVIDIA_GPUS", lambda: [
+            drivers.get_nvidia_gpu_info(gpu_id, self.root)
+            for gpu_id in drivers.get_nvidia_gpu_ids(self.root)
+        ])
+
+    def is_outdated(self):
+        """Return True if the Nvidia driver is older than the recommended one"""
+        return self._get_cached("OUTDATED", lambda: drivers.is_outdated(self.root))
+
+    @property
+    def graphics_adapters(self):
+        """Return the PCI slot and ID of each display controller"""
+        return self._get_cached("ADAPTERS", lambda: drivers.get_graphics_adapters(self.root))
+
+    @property
+    def vulkan_supported(self):
+        """Return True if libvulkan can be loaded and reports a device"""
+        return self.probe("VULKAN", vkquery.is_vulkan_supported)
+
+    @property
+    def glxinfo_output(self):
+        """Return the output of glxinfo -B. Failed calls, which return an
+        empty output, aren't saved.
+        """
+        return self.probe("GLXINFO", lambda: glxinfo.GlxInfo.get_glxinfo_output() or None)
+
+
+GRAPHICS_INVENTORY = GraphicsInventory(GRAPHICS_CACHE_PATH)
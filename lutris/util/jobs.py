@@ -4,6 +4,7 @@ import threading
 from gi.repository import GLib
 
 from lutris.util.log import logger
+from lutris.util.tracing import TRACER, get_function_name
 
 
 class AsyncCall(threading.Thread):
@@ -27,7 +28,8 @@ class AsyncCall(threading.Thread):
         error = None
 
         try:
-            result = self.function(*args, **kwargs)
+            with TRACER.span(get_function_name(self.function), category="async"):
+                result = self.function(*args, **kwargs)
         except Exception as ex:  # pylint: disable=broad-except
             logger.error("Error while completing task %s: %s", self.function, ex)
             error = ex
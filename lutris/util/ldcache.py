@@ -0,0 +1,207 @@
+"""Index of the shared libraries known to the dynamic linker"""
+import os
+import re
+import shutil
+import struct
+import subprocess
+from collections import Counter
+
+from lutris.util.log import logger
+from lutris.util.probe_cache import ProbeCache, get_mtime
+from lutris.util.xdg_dirs import get_user_cache_dir
+
+LD_CACHE_PATH = "/etc/ld.so.cache"
+LIBRARY_CACHE_PATH = os.path.join(get_user_cache_dir(), "lutris", "shared_libraries.json")
+
+OLD_CACHE_MAGIC = b"ld.so-1.7.0"
+NEW_CACHE_MAGIC = b"glibc-ld.so.cache1.1"
+# Header of the new format: magic, library count, string table size, byte
+# order, extension offset and 3 unused fields
+NEW_HEADER_SIZE = 48
+# Entry of the new format: flags, name offset, path offset, OS version, hwcap
+NEW_ENTRY_FORMAT = "iIIIQ"
+NEW_ENTRY_SIZE = 24
+
+# Library types and architectures, as printed by ldconfig -p
+LIBRARY_TYPES = {0x00: "libc4", 0x01: "ELF", 0x02: "libc5", 0x03: "libc6"}
+LIBRARY_ARCHS = {
+    0x0000: "",
+    0x0100: "64bit",
+    0x0200: "IA-64",
+    0x0300: "x86-64",
+    0x0400: "64bit",
+    0x0500: "64bit",
+    0x0800: "x32",
+    0x0900: "hard-float",
+    0x0a00: "AArch64",
+    0x0b00: "soft-float",
+}
+
+DEFAULT_ARCH = "i386"
+
+
+def get_library_arch(flags):
+    """Return the architecture of a library from its ldconfig flags"""
+    if isinstance(flags, str):
+        flags = [flag.strip() for flag in flags.split(",")]
+    for arch in ("x86-64", "x32"):
+        if arch in flags:
+            return arch.replace("-", "_")
+    return DEFAULT_ARCH
+
+
+def get_flags_description(flags, hwcap):
+    """Return the flags of a cache entry the way ldconfig -p prints them"""
+    description = LIBRARY_TYPES.get(flags & 0xff, "unknown")
+    arch = LIBRARY_ARCHS.get(flags & 0xff00, "unknown")
+    if arch:
+        description += "," + arch
+    if hwcap:
+        description += ", hwcap: 0x%016x" % hwcap
+    return description
+
+
+def _read_string(data, offset):
+    end = data.index(b"\0", offset)
+    return os.fsdecode(data[offset:end])
+
+
+def parse_ld_so_cache(data):
+    """Return the name, flags and path of the libraries of a ld.so.cache file.
+
+    Old caches start with a table in the libc5 format, followed by the
+    table in the glibc format, which is the only one read here.
+    """
+    offset = 0
+    if data.startswith(OLD_CACHE_MAGIC):
+        old_count = struct.unpack_from("=I", data, 12)[0]
+        # The new table is aligned on 8 bytes after the 12 bytes old entries
+        offset = (16 + old_count * 12 + 7) & ~7
+    if data[offset:offset + len(NEW_CACHE_MAGIC)] != NEW_CACHE_MAGIC:
+        raise ValueError("Unsupported ld.so.cache format")
+    byte_order = {2: "<", 3: ">"}.get(data[offset + 28], "=")
+    count = struct.unpack_from(byte_order + "I", data, offset + 20)[0]
+    libraries = []
+    for index in range(count):
+        flags, name_offset, path_offset, _osversion, hwcap = struct.unpack_from(
+            byte_order + NEW_ENTRY_FORMAT, data, offset + NEW_HEADER_SIZE + index * NEW_ENTRY_SIZE
+        )
+        # String offsets are relative to the start of the new table
+        libraries.append([
+            _read_string(data, offset + name_offset),
+            get_flags_description(flags, hwcap),
+            _read_string(data, offset + path_offset),
+        ])
+    return libraries
+
+
+def parse_ldconfig_output(output):
+    """Return the name, flags and path of the libraries listed by `ldconfig -p`"""
+    libraries = []
+    for line in output.split("\n"):
+        if not line.startswith("\t"):
+            continue
+        lib_match = re.match(r"^(.*) \((.*)\) => (.*)$", line.strip("\t"))
+        if not lib_match:
+            logger.error("Invalid ldconfig line: %s", line)
+            continue
+        libraries.append(list(lib_match.groups()))
+    return libraries
+
+
+def find_ldconfig():
+    """Return the path of ldconfig, which often isn't in the PATH"""
+    return shutil.which("ldconfig") or next(
+        (path for path in ("/sbin/ldconfig", "/usr/sbin/ldconfig") if os.path.exists(path)),
+        None
+    )
+
+
+class SharedLibraryIndex(ProbeCache):
+    """The libraries of the dynamic linker cache, indexed by name and architecture.
+
+    The cache is read directly, or through `ldconfig -p` if its format isn't
+    supported. The list of libraries is saved and reused until the cache
+    file changes.
+    """
+
+    def __init__(self, cache_path=None, ld_cache_path=LD_CACHE_PATH):
+        super().__init__(cache_path)
+        self.ld_cache_path = ld_cache_path
+
+    def get_cache_key(self):
+        return {"ld_cache": [self.ld_cache_path, get_mtime(self.ld_cache_path)]}
+
+    def read_ld_cache(self):
+        """Return the name, flags and path of the libraries in the linker cache"""
+        try:
+            with open(self.ld_cache_path, "rb") as ld_cache_file:
+                return parse_ld_so_cache(ld_cache_file.read())
+        except (OSError, ValueError, struct.error) as ex:
+            logger.warning("Unable to read %s (%s), using ldconfig", self.ld_cache_path, ex)
+        ldconfig = find_ldconfig()
+        if not ldconfig:
+            logger.error("Could not detect ldconfig on this system")
+            return []
+        try:
+            output = subprocess.check_output([ldconfig, "-p"]).decode("utf-8", errors="ignore")
+        except (OSError, subprocess.CalledProcessError) as ex:
+            logger.error("Failed to get libraries from ldconfig: %s", ex)
+            return []
+        return parse_ldconfig_output(output)
+
+    @property
+    def entries(self):
+        """List of the name, flags and path of each library, in the cache order"""
+        return self.probe("LIBRARIES", self.read_ld_cache)
+
+    @property
+    def paths(self):
+        """Paths of the libraries, keyed by name and architecture"""
+        return self._get_cached("PATHS", self.build_paths)
+
+    def build_paths(self):
+        paths = {}
+        for name, flags, path in self.entries:
+            paths.setdefault((name, get_library_arch(flags)), []).append(path)
+        return paths
+
+    @property
+    def folder_counts(self):
+        """Number of libraries in each folder, by architecture, in the cache order"""
+        return self._get_cached("FOLDER_COUNTS", self.count_folders)
+
+    def count_folders(self):
+        folder_counts = {}
+        for _name, flags, path in self.entries:
+            folder_counts.setdefault(get_library_arch(flags), Counter())[os.path.dirname(path)] += 1
+        return folder_counts
+
+    def has_library(self, name, arch):
+        return (name, arch) in self.paths
+
+    def get_paths(self, name, arch):
+        """Return the paths of a library for an architecture"""
+        return self.paths.get((name, arch), [])
+
+    def get_names(self, architectures):
+        """Return the names of the libraries available for the architectures"""
+        return {name for name, arch in self.paths if arch in architectures}
+
+    def get_lib_folders(self, architectures):
+        """Return the folders holding libraries of the architectures, from the
+        one with the fewest libraries to the one with the most.
+        """
+        return self._get_cached(
+            ("LIB_FOLDERS", tuple(architectures)),
+            lambda: self.sort_lib_folders(architectures)
+        )
+
+    def sort_lib_folders(self, architectures):
+        folder_counter = Counter()
+        for arch in architectures:
+            folder_counter.update(self.folder_counts.get(arch, {}))
+        return [folder for folder, _count in reversed(folder_counter.most_common())]
+
+
+SHARED_LIBRARY_INDEX = SharedLibraryIndex(LIBRARY_CACHE_PATH)
@@ -3,11 +3,9 @@ import os
 import re
 import shutil
 import sys
-import json
 import platform
 import resource
-import subprocess
-from collections import defaultdict, Counter
+from collections import defaultdict
 
 from lutris.util.log import logger
 
@@ -16,10 +14,12 @@ try:
 except ImportError:
     logger.warning("Package 'distro' unavailable. Unable to read Linux distribution")
     linux_distribution = None
-from lutris.util.graphics import drivers
 from lutris.util.graphics import glxinfo
-from lutris.util.graphics import vkquery
-from lutris.util.disks import get_drive_for_path
+from lutris.util.graphics.inventory import GRAPHICS_INVENTORY
+from lutris.util.ldcache import SHARED_LIBRARY_INDEX, get_library_arch
+from lutris.util.mountinfo import MOUNT_TABLE
+from lutris.util.probe_cache import ProbeCache, get_mtime
+from lutris.util.xdg_dirs import get_user_cache_dir
 
 # Linux components used by lutris
 SYSTEM_COMPONENTS = {
@@ -83,10 +83,18 @@ SYSTEM_COMPONENTS = {
 }
 
 
-class LinuxSystem:
-    """Global cache for system commands"""
+# Results of the system probes saved between runs
+SYSTEM_CACHE_PATH = os.path.join(get_user_cache_dir(), "lutris", "linux_system.json")
 
-    _cache = {}
+
+class LinuxSystem(ProbeCache):
+    """Global cache for system commands
+
+    Each probe of the system is run the first time its result is needed.
+    The results are saved to `cache_path` and reused by the next runs until
+    the folders of the PATH or the shared library cache change. Graphics
+    are probed by GRAPHICS_INVENTORY.
+    """
 
     multiarch_lib_folders = [
         ("/lib", "/lib64"),
@@ -108,24 +116,59 @@ class LinuxSystem:
 
     flatpak_info_path = "/.flatpak-info"
 
-    def __init__(self):
-        for key in ("COMMANDS", "TERMINALS"):
-            self._cache[key] = {}
-            for command in SYSTEM_COMPONENTS[key]:
-                command_path = shutil.which(command)
-                if not command_path:
-                    command_path = self.get_sbin_path(command)
-                if command_path:
-                    self._cache[key][command] = command_path
+    def __init__(self, cache_path=None, library_index=SHARED_LIBRARY_INDEX):
+        super().__init__(cache_path)
+        self.library_index = library_index
 
         # Detect if system is 64bit capable
         self.is_64_bit = sys.maxsize > 2 ** 32
         self.arch = self.get_arch()
-        self.shared_libraries = self.get_shared_libraries()
-        self.populate_libraries()
-        self.populate_sound_fonts()
         self.soft_limit, self.hard_limit = self.get_file_limits()
-        self.glxinfo = self.get_glxinfo()
+
+    def get_cache_key(self):
+        """Return the state of the system the saved probes depend on"""
+        path_folders = os.environ.get("PATH", "").split(os.pathsep) + ["/sbin", "/usr/sbin"]
+        return {"path": [[folder, get_mtime(folder)] for folder in path_folders]}
+
+    def find_commands(self, key):
+        """Return the paths of the commands of a SYSTEM_COMPONENTS group"""
+        commands = {}
+        for command in SYSTEM_COMPONENTS[key]:
+            command_path = shutil.which(command)
+            if not command_path:
+                command_path = self.get_sbin_path(command)
+            if command_path:
+                commands[command] = command_path
+        return commands
+
+    @property
+    def commands(self):
+        return self.probe("COMMANDS", lambda: self.find_commands("COMMANDS"))
+
+    @property
+    def terminals(self):
+        return self.probe("TERMINALS", lambda: self.find_commands("TERMINALS"))
+
+    @property
+    def shared_libraries(self):
+        """Available libraries on the system as SharedLibrary instances,
+        stored in a defaultdict keyed by library name.
+        """
+        return self._get_cached("SHARED_LIBRARIES", self.get_shared_libraries)
+
+    @property
+    def libraries(self):
+        """Libraries of the SYSTEM_COMPONENTS found on the system"""
+        return self._get_cached("LIBRARIES", self.get_component_libraries)
+
+    @property
+    def soundfonts(self):
+        return self._get_cached("SOUNDFONTS", self.find_sound_fonts)
+
+    @property
+    def glxinfo(self):
+        """GlxInfo instance, None if the glxinfo tool isn't available"""
+        return self._get_cached("GLXINFO", self.get_glxinfo)
 
     @staticmethod
     def get_sbin_path(command):
@@ -160,17 +203,20 @@ class LinuxSystem:
 
     @staticmethod
     def get_drives():
-        """Return a list of drives with their filesystems"""
-        try:
-            output = subprocess.check_output(["lsblk", "-f", "--json"]).decode()
-        except subprocess.CalledProcessError as ex:
-            logger.error("Failed to get drive information: %s", ex)
-            return None
-        return [
-            drive
-            for drive in json.loads(output)["blockdevices"]
-            if drive["fstype"] != "squashfs"
-        ]
+        """Return a list of mounted drives with their filesystems"""
+        drives = []
+        for mount in MOUNT_TABLE.mounts:
+            if not mount.source.startswith("/dev/"):
+                continue
+            fstype = MOUNT_TABLE.get_fstype(mount)
+            if fstype == "squashfs":
+                continue
+            drives.append({
+                "name": os.path.basename(mount.source),
+                "fstype": fstype,
+                "mountpoint": mount.mount_point,
+            })
+        return drives
 
     @staticmethod
     def get_ram_info():
@@ -233,17 +279,18 @@ class LinuxSystem:
 
     def get_fs_type_for_path(self, path):
         """Return the filesystem type a given path uses"""
-        path_drive = get_drive_for_path(path)
-        for drive in self.get_drives():
-            for partition in drive.get("children", []):
-                if "/dev/%s" % partition["name"] == path_drive:
-                    return partition["fstype"]
+        mount = MOUNT_TABLE.get_mount(path)
+        if mount:
+            return MOUNT_TABLE.get_fstype(mount)
 
     def get_glxinfo(self):
         """Return a GlxInfo instance if the gfxinfo tool is available"""
         if not self.get("glxinfo"):
             return
-        _glxinfo = glxinfo.GlxInfo()
+        output = GRAPHICS_INVENTORY.glxinfo_output
+        if not output:
+            return
+        _glxinfo = glxinfo.GlxInfo(output)
         if not hasattr(_glxinfo, "display"):
             logger.warning("Invalid glxinfo received")
             return
@@ -254,33 +301,37 @@ class LinuxSystem:
         _requirements = self.required_components.copy()
         if include_optional:
             _requirements += self.optional_components
-            if drivers.is_amd():
+            if GRAPHICS_INVENTORY.is_amd:
                 _requirements.append("RADEON")
         return _requirements
 
     def get(self, command):
         """Return a system command path if available"""
-        return self._cache["COMMANDS"].get(command)
+        return self.commands.get(command)
 
     def get_terminals(self):
         """Return list of installed terminals"""
-        return list(self._cache["TERMINALS"].values())
+        return list(self.terminals.values())
 
     def get_soundfonts(self):
         """Return path of available soundfonts"""
-        return self._cache["SOUNDFONTS"]
+        return self.soundfonts
 
     def get_lib_folders(self):
         """Return shared library folders, sorted by most used to least used"""
-        lib_folder_counter = Counter(
-            lib.dirname
-            for lib_list in self.shared_libraries.values()
-            for lib in lib_list
-        )
-        return [path[0] for path in reversed(lib_folder_counter.most_common())]
+        return self.library_index.get_lib_folders(self.runtime_architectures)
 
     def iter_lib_folders(self):
         """Loop over existing 32/64 bit library folders"""
+        return iter(self._get_cached(
+            ("LIB_FOLDERS", self.library_index.generation),
+            lambda: list(self.find_lib_folders())
+        ))
+
+    def find_lib_folders(self):
+        """Yield the folders of the linker cache, then the existing multiarch
+        library folders
+        """
         exported_lib_folders = set()
         for lib_folder in self.get_lib_folders():
             exported_lib_folders.add(lib_folder)
@@ -300,63 +351,45 @@ class LinuxSystem:
                     if lib_paths[1] not in exported_lib_folders:
                         yield lib_paths[1]
 
-    def get_ldconfig_libs(self):
-        """Return a list of available libraries, as returned by `ldconfig -p`."""
-        ldconfig = self.get("ldconfig")
-        if not ldconfig:
-            logger.error("Could not detect ldconfig on this system")
-            return []
-        try:
-            output = (
-                subprocess.check_output([ldconfig, "-p"])
-                .decode("utf-8", errors="ignore")
-                .split("\n")
-            )
-        except subprocess.CalledProcessError as ex:
-            logger.error("Failed to get libraries from ldconfig: %s", ex)
-            return []
-        return [line.strip("\t") for line in output if line.startswith("\t")]
-
     def get_shared_libraries(self):
         """Loads all available libraries on the system as SharedLibrary instances
         The libraries are stored in a defaultdict keyed by library name.
         """
         shared_libraries = defaultdict(list)
-        for lib_line in self.get_ldconfig_libs():
-            try:
-                lib = SharedLibrary.new_from_ldconfig(lib_line)
-            except ValueError:
-                logger.error("Invalid ldconfig line: %s", lib_line)
-                continue
+        for name, flags, path in self.library_index.entries:
+            lib = SharedLibrary(name, flags, path)
             if lib.arch not in self.runtime_architectures:
                 continue
             shared_libraries[lib.name].append(lib)
         return shared_libraries
 
-    def populate_libraries(self):
-        """Populates the LIBRARIES cache with what is found on the system"""
-        self._cache["LIBRARIES"] = {}
+    def get_component_libraries(self):
+        """Return the libraries of each component found on the system, by architecture"""
+        libraries = {}
         for arch in self.runtime_architectures:
-            self._cache["LIBRARIES"][arch] = defaultdict(list)
+            libraries[arch] = defaultdict(list)
         for req in self.requirements:
             for lib in SYSTEM_COMPONENTS["LIBRARIES"][req]:
-                for shared_lib in self.shared_libraries[lib]:
-                    self._cache["LIBRARIES"][shared_lib.arch][req].append(lib)
-
-    def populate_sound_fonts(self):
-        """Populates the soundfont cache"""
-        self._cache["SOUNDFONTS"] = []
+                for arch in self.runtime_architectures:
+                    if self.library_index.has_library(lib, arch):
+                        libraries[arch][req].append(lib)
+        return libraries
+
+    def find_sound_fonts(self):
+        """Return the soundfonts installed in the system folders"""
+        soundfonts = []
         for folder in self.soundfont_folders:
             if not os.path.exists(folder):
                 continue
             for soundfont in os.listdir(folder):
-                self._cache["SOUNDFONTS"].append(soundfont)
+                soundfonts.append(soundfont)
+        return soundfonts
 
     def get_missing_requirement_libs(self, req):
         """Return a list of sets of missing libraries for each supported architecture"""
         required_libs = set(SYSTEM_COMPONENTS["LIBRARIES"][req])
         return [
-            list(required_libs - set(self._cache["LIBRARIES"][arch][req]))
+            list(required_libs - set(self.libraries[arch][req]))
             for arch in self.runtime_architectures
         ]
 
@@ -400,11 +433,7 @@ class SharedLibrary:
     @property
     def arch(self):
         """Return the architecture for a shared library"""
-        detected_arch = ["x86-64", "x32"]
-        for arch in detected_arch:
-            if arch in self.flags:
-                return arch.replace("-", "_")
-        return self.default_arch
+        return get_library_arch(self.flags)
 
     @property
     def basename(self):
@@ -420,19 +449,16 @@ class SharedLibrary:
         return "%s (%s)" % (self.name, self.arch)
 
 
-LINUX_SYSTEM = LinuxSystem()
+LINUX_SYSTEM = LinuxSystem(SYSTEM_CACHE_PATH)
 
 
 def gather_system_info():
     """Get all system information in a single data structure"""
     system_info = {}
-    if drivers.is_nvidia():
-        system_info["nvidia_driver"] = drivers.get_nvidia_driver_info()
-        system_info["nvidia_gpus"] = [
-            drivers.get_nvidia_gpu_info(gpu_id)
-            for gpu_id in drivers.get_nvidia_gpu_ids()
-        ]
-    system_info["gpus"] = [drivers.get_gpu_info(gpu) for gpu in drivers.get_gpus()]
+    if GRAPHICS_INVENTORY.is_nvidia:
+        system_info["nvidia_driver"] = GRAPHICS_INVENTORY.nvidia_driver_info
+        system_info["nvidia_gpus"] = GRAPHICS_INVENTORY.nvidia_gpus
+    system_info["gpus"] = list(GRAPHICS_INVENTORY.gpus.values())
     system_info["env"] = dict(os.environ)
     system_info["missing_libs"] = LINUX_SYSTEM.get_missing_libs()
     system_info["cpus"] = LINUX_SYSTEM.get_cpus()
@@ -441,7 +467,7 @@ def gather_system_info():
     system_info["dist"] = LINUX_SYSTEM.get_dist_info()
     system_info["arch"] = LINUX_SYSTEM.get_arch()
     system_info["kernel"] = LINUX_SYSTEM.get_kernel_version()
-    system_info["glxinfo"] = glxinfo.GlxInfo().as_dict()
+    system_info["glxinfo"] = LINUX_SYSTEM.glxinfo.as_dict() if LINUX_SYSTEM.glxinfo else {}
     return system_info
 
 
@@ -482,7 +508,7 @@ def gather_system_info_str():
     else:
         graphics_dict["Vendor"] = "Unable to obtain glxinfo"
     # check Vulkan support
-    if vkquery.is_vulkan_supported():
+    if GRAPHICS_INVENTORY.vulkan_supported:
         graphics_dict["Vulkan"] = "Supported"
     else:
         graphics_dict["Vulkan"] = "Not Supported"
@@ -3,10 +3,10 @@ import os
 import sys
 import logging
 import logging.handlers
-from gi.repository import GLib
+from lutris.util.xdg_dirs import get_user_cache_dir
 
 
-CACHE_DIR = os.path.realpath(os.path.join(GLib.get_user_cache_dir(), "lutris"))
+CACHE_DIR = os.path.realpath(os.path.join(get_user_cache_dir(), "lutris"))
 if not os.path.isdir(CACHE_DIR):
     os.makedirs(CACHE_DIR)
 
@@ -0,0 +1,192 @@
+"""Record of the files installed for each game"""
+import os
+
+from lutris import settings
+from lutris.util.log import logger
+from lutris.util.system import get_md5_hash
+
+# Statuses returned when verifying a manifest
+FILE_MISSING = "missing"
+FILE_MODIFIED = "modified"
+
+
+def get_manifest_path(game_id):
+    """Return the path of the manifest of a game"""
+    return os.path.join(settings.MANIFEST_DIR, "%s.manifest" % game_id)
+
+
+def remove_manifest(game_id):
+    """Delete the manifest of a game, if it has one"""
+    try:
+        os.remove(get_manifest_path(game_id))
+    except FileNotFoundError:
+        pass
+
+
+def remove_game_files(game_id, game_path):
+    """Delete the files recorded in the manifest of a game and the folders
+    left empty, without walking the game folder. Files created after the
+    install, such as saves, are left for the caller to remove.
+    Return False if the game has no manifest to remove its files from.
+    """
+    manifest = InstallManifest.for_game(game_id, game_path)
+    if not manifest.entries:
+        return False
+    removed = manifest.remove_files()
+    try:
+        os.rmdir(game_path)
+    except OSError:
+        pass
+    logger.debug("Removed %d files of %s recorded in its manifest", removed, game_path)
+    return True
+
+
+class InstallManifest:
+    """Files owned by a game installation.
+
+    The manifest file has one `path<TAB>size<TAB>mtime<TAB>hash` line per
+    file, sorted by path, with paths relative to the game folder and the
+    modification time in nanoseconds. Hashes are optional and left empty
+    unless requested when recording files.
+    Checking or removing the files of a game only needs the manifest, the
+    game folder is never walked.
+    """
+
+    def __init__(self, root, path=None):
+        self.root = os.path.abspath(root)
+        self.path = path
+        self.entries = {}
+
+    @classmethod
+    def for_game(cls, game_id, root):
+        """Return the manifest of a game, empty if it doesn't have one"""
+        manifest = cls(root, get_manifest_path(game_id))
+        manifest.load()
+        return manifest
+
+    def get_relpath(self, path):
+        """Return the path of a file relative to the game folder, or None if
+        the file isn't in the game folder.
+        """
+        relpath = os.path.relpath(os.path.abspath(path), self.root)
+        if relpath in (os.curdir, os.pardir) or relpath.startswith(os.pardir + os.sep):
+            return None
+        if "\t" in relpath or "\n" in relpath:
+            logger.warning("Not recording %s in the install manifest", path)
+            return None
+        return relpath
+
+    def add_file(self, path, source_path=None, with_hash=False):
+        """Record the file at `path`.
+
+        If the file is about to be moved to `path`, give its current location
+        with `source_path`; renames keep the size and modification time.
+        """
+        relpath = self.get_relpath(path)
+        if not relpath:
+            return
+        source_path = source_path or path
+        file_stat = os.stat(source_path)
+        file_hash = get_md5_hash(source_path) if with_hash else ""
+        self.entries[relpath] = (file_stat.st_size, file_stat.st_mtime_ns, file_hash or "")
+
+    def add_tree(self, path, destination=None, with_hash=False):
+        """Record every file in the folder `path`, or the file itself.
+
+        If the files are about to be moved, `destination` is the folder they
+        will end up in.
+        """
+        destination = destination or path
+        if not os.path.isdir(path):
+            self.add_file(destination, source_path=path, with_hash=with_hash)
+            return
+        for dirpath, _dirnames, filenames in os.walk(path):
+            dest_dirpath = os.path.join(destination, os.path.relpath(dirpath, path))
+            for filename in filenames:
+                try:
+                    self.add_file(
+                        os.path.join(dest_dirpath, filename),
+                        source_path=os.path.join(dirpath, filename),
+                        with_hash=with_hash
+                    )
+                except OSError as ex:
+                    logger.warning("Can't record %s: %s", filename, ex)
+
+    def update(self, manifest):
+        """Add the entries of another manifest of the same folder"""
+        self.entries.update(manifest.entries)
+
+    def load(self):
+        self.entries = {}
+        try:
+            with open(self.path, "r") as manifest_file:
+                for line in manifest_file:
+                    try:
+                        relpath, size, mtime, file_hash = line.rstrip("\n").split("\t")
+                        self.entries[relpath] = (int(size), int(mtime), file_hash)
+                    except ValueError:
+                        logger.warning("Invalid entry in %s: %s", self.path, line.strip())
+        except FileNotFoundError:
+            pass
+
+    def save(self, path=None):
+        """Write the manifest to `path` or to the file it was loaded from"""
+        self.path = path or self.path
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as manifest_file:
+            for relpath in sorted(self.entries):
+                size, mtime, file_hash = self.entries[relpath]
+                manifest_file.write("%s\t%d\t%d\t%s\n" % (relpath, size, mtime, file_hash))
+        os.replace(tmp_path, self.path)
+        logger.debug("Saved manifest of %d files to %s", len(self.entries), self.path)
+
+    def verify(self, check_hashes=False):
+        """Return a dict of damaged files with their status.
+
+        Files are compared by size and modification time, and by content if
+        `check_hashes` is set and the manifest has hashes.
+        """
+        damaged = {}
+        for relpath, (size, mtime, file_hash) in sorted(self.entries.items()):
+            path = os.path.join(self.root, relpath)
+            try:
+                file_stat = os.stat(path)
+            except OSError:
+                damaged[relpath] = FILE_MISSING
+                continue
+            if file_stat.st_size != size:
+                damaged[relpath] = FILE_MODIFIED
+            elif check_hashes and file_hash:
+                if get_md5_hash(path) != file_hash:
+                    damaged[relpath] = FILE_MODIFIED
+            elif file_stat.st_mtime_ns != mtime:
+                damaged[relpath] = FILE_MODIFIED
+        return damaged
+
+    def remove_files(self):
+        """Delete the recorded files and the folders left empty, return the
+        number of files deleted.
+        """
+        removed = 0
+        folders = set()
+        for relpath in self.entries:
+            try:
+                os.remove(os.path.join(self.root, relpath))
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as ex:
+                logger.warning("Failed to remove %s: %s", relpath, ex)
+            folder = os.path.dirname(relpath)
+            while folder:
+                folders.add(folder)
+                folder = os.path.dirname(folder)
+        # Deepest folders first
+        for folder in sorted(folders, key=lambda f: f.count(os.sep), reverse=True):
+            try:
+                os.rmdir(os.path.join(self.root, folder))
+            except OSError:
+                pass
+        self.entries = {}
+        return removed
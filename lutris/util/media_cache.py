@@ -0,0 +1,83 @@
+"""Persistent record of game media known to be unavailable"""
+import threading
+import time
+
+from lutris import pga
+from lutris.util.log import logger
+from lutris.util.resources import get_media_key
+
+# Number of seconds before media missing from the API is queried again
+MISS_TTL = 7 * 24 * 3600
+
+
+class MediaMissCache:
+    """Negative cache for banner and icon lookups, stored in the PGA.
+
+    Games without any media on Lutris.net are remembered so that neither the
+    media folders nor the API are queried for them until the entry expires.
+    """
+
+    def __init__(self, ttl=MISS_TTL):
+        self.ttl = ttl
+        self.lookups = 0
+        self.avoided_lookups = 0
+        self._misses = None
+        self._lock = threading.Lock()
+
+    @property
+    def misses(self):
+        """Mapping of media keys to the time they were found missing"""
+        with self._lock:
+            if self._misses is None:
+                self._misses = pga.get_media_misses()
+            return self._misses
+
+    def is_missing(self, slug, media_type):
+        """Return True if the media was recently found to be unavailable"""
+        self.lookups += 1
+        checked_at = self.misses.get(get_media_key(slug, media_type))
+        if checked_at and time.time() - checked_at < self.ttl:
+            self.avoided_lookups += 1
+            return True
+        return False
+
+    def filter(self, slugs, media_type):
+        """Return the set of `slugs` worth looking up media for"""
+        return {slug for slug in slugs if not self.is_missing(slug, media_type)}
+
+    def add(self, slugs, media_type):
+        """Remember that games in `slugs` have no media of `media_type`"""
+        if not slugs:
+            return
+        checked_at = int(time.time())
+        keys = [get_media_key(slug, media_type) for slug in slugs]
+        pga.add_media_misses(keys, checked_at)
+        with self._lock:
+            if self._misses is not None:
+                self._misses.update({key: checked_at for key in keys})
+
+    def remove(self, slug, media_type):
+        """Forget the unavailable media of a game so it gets looked up again"""
+        key = get_media_key(slug, media_type)
+        if key not in self.misses:
+            return
+        pga.delete_media_misses([key])
+        with self._lock:
+            self._misses.pop(key, None)
+
+    def invalidate(self):
+        """Forget every unavailable media"""
+        pga.delete_media_misses()
+        with self._lock:
+            self._misses = {}
+        logger.info("Media cache cleared")
+
+    def log_stats(self):
+        logger.debug(
+            "%d of %d media lookups avoided by the media cache",
+            self.avoided_lookups,
+            self.lookups
+        )
+
+
+MEDIA_MISSES = MediaMissCache()
@@ -0,0 +1,251 @@
+"""Append-only pack file storing many small media files"""
+import mmap
+import os
+import shutil
+import threading
+
+from lutris.util.log import logger
+
+# Size recorded in the index for deleted entries
+TOMBSTONE = -1
+
+
+class MediaPack:
+    """Store media files as entries of a single pack file.
+
+    The pack is a directory holding a `data` file, to which entries are
+    appended, and an `index` file with one `key<TAB>offset<TAB>size` line per
+    change. The index is replayed when the pack is opened so lookups never
+    touch the filesystem, and data is read through a memory map.
+    Replaced and removed entries leave unused space behind until the pack is
+    compacted. Other files of the directory are kept by the compaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.wasted_size = 0
+        self._lock = threading.RLock()
+        self._map = None
+        self.recover()
+        os.makedirs(self.path, exist_ok=True)
+        self.load_index()
+
+    @property
+    def data_path(self):
+        return os.path.join(self.path, "data")
+
+    @property
+    def index_path(self):
+        return os.path.join(self.path, "index")
+
+    def recover(self):
+        """Finish or roll back a compaction interrupted by a crash"""
+        compact_path = self.path + ".compact"
+        if os.path.isdir(self.path + ".old"):
+            if not os.path.isdir(self.path):
+                os.rename(compact_path, self.path)
+            shutil.rmtree(self.path + ".old")
+        if os.path.isdir(compact_path):
+            shutil.rmtree(compact_path)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def keys(self):
+        return list(self.entries)
+
+    @property
+    def size(self):
+        """Size of the pack file on disk"""
+        try:
+            return os.path.getsize(self.data_path)
+        except OSError:
+            return 0
+
+    @property
+    def needs_compaction(self):
+        """Return True if more than half of the pack is unused"""
+        return self.wasted_size > 1024 * 1024 and self.wasted_size * 2 > self.size
+
+    def load_index(self):
+        """Read the index, ignoring entries pointing past the end of the pack.
+
+        Those can be left behind if Lutris is interrupted while adding media.
+        """
+        self.entries = {}
+        self.wasted_size = 0
+        pack_size = self.size
+        try:
+            with open(self.index_path, "r") as index_file:
+                lines = index_file.readlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            if not line.endswith("\n"):
+                continue
+            try:
+                key, offset, size = line[:-1].split("\t")
+                offset = int(offset)
+                size = int(size)
+            except ValueError:
+                logger.warning("Invalid entry in media index: %s", line.strip())
+                continue
+            if key in self.entries:
+                self.wasted_size += self.entries[key][1]
+            if size == TOMBSTONE:
+                self.entries.pop(key, None)
+                continue
+            if offset + size > pack_size:
+                continue
+            self.entries[key] = (offset, size)
+
+    def _get_map(self, end):
+        """Return a memory map of the pack covering at least `end` bytes"""
+        if self._map is None or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+            with open(self.data_path, "rb") as pack_file:
+                self._map = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def get(self, key):
+        """Return the content of an entry or None if it isn't in the pack"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if not entry:
+                return None
+            offset, size = entry
+            if not size:
+                return b""
+            return self._get_map(offset + size)[offset:offset + size]
+
+    def _append_index(self, key, offset, size):
+        with open(self.index_path, "a") as index_file:
+            index_file.write("%s\t%d\t%d\n" % (key, offset, size))
+
+    @staticmethod
+    def check_key(key):
+        if "\t" in key or "\n" in key:
+            raise ValueError("Invalid media key %r" % key)
+
+    def _add_entries(self, entries):
+        """Append the (key, data) pairs of `entries` to the pack.
+
+        The data is flushed to disk once for all entries, before they are
+        written to the index.
+        """
+        added = []
+        with self._lock:
+            with open(self.data_path, "ab") as pack_file:
+                for key, data in entries:
+                    added.append((key, pack_file.tell(), len(data)))
+                    pack_file.write(data)
+                pack_file.flush()
+                os.fsync(pack_file.fileno())
+            with open(self.index_path, "a") as index_file:
+                for key, offset, size in added:
+                    index_file.write("%s\t%d\t%d\n" % (key, offset, size))
+            for key, offset, size in added:
+                if key in self.entries:
+                    self.wasted_size += self.entries[key][1]
+                self.entries[key] = (offset, size)
+        return [key for key, _offset, _size in added]
+
+    def add(self, key, data):
+        """Append `data` to the pack as the new content of `key`"""
+        self.check_key(key)
+        self._add_entries([(key, data)])
+
+    def add_file(self, key, path):
+        """Add the content of the file at `path` to the pack"""
+        with open(path, "rb") as media_file:
+            self.add(key, media_file.read())
+
+    def add_files(self, files):
+        """Add a batch of files, given as (key, path) pairs, to the pack.
+
+        Unreadable files are skipped, the keys of the added ones are returned.
+        """
+        for key, _path in files:
+            self.check_key(key)
+
+        def read_files():
+            for key, path in files:
+                try:
+                    with open(path, "rb") as media_file:
+                        yield key, media_file.read()
+                except OSError as ex:
+                    logger.warning("Unable to add %s to the media pack: %s", path, ex)
+
+        return self._add_entries(read_files())
+
+    def remove(self, key):
+        """Remove an entry from the pack, its space is reclaimed on compaction"""
+        with self._lock:
+            if key not in self.entries:
+                return
+            self._append_index(key, 0, TOMBSTONE)
+            self.wasted_size += self.entries.pop(key)[1]
+
+    def export(self, key, dest, overwrite=False):
+        """Write an entry as a loose file at `dest` and return its path.
+
+        Used for media needed outside of Lutris, such as desktop icons.
+        """
+        if os.path.exists(dest) and not overwrite:
+            return dest
+        data = self.get(key)
+        if data is None:
+            return None
+        tmp_path = "%s.%d.tmp" % (dest, threading.get_ident())
+        with open(tmp_path, "wb") as dest_file:
+            dest_file.write(data)
+        os.replace(tmp_path, dest)
+        return dest
+
+    def compact(self):
+        """Rewrite the pack without unused space and return the bytes reclaimed"""
+        with self._lock:
+            if not self.wasted_size:
+                return 0
+            initial_size = self.size
+            compact_path = self.path + ".compact"
+            os.makedirs(compact_path)
+            entries = {}
+            with open(os.path.join(compact_path, "data"), "wb") as pack_file:
+                for key in sorted(self.entries):
+                    data = self.get(key)
+                    entries[key] = (pack_file.tell(), len(data))
+                    pack_file.write(data)
+                pack_file.flush()
+                os.fsync(pack_file.fileno())
+            with open(os.path.join(compact_path, "index"), "w") as index_file:
+                for key, (offset, size) in entries.items():
+                    index_file.write("%s\t%d\t%d\n" % (key, offset, size))
+                index_file.flush()
+                os.fsync(index_file.fileno())
+            for name in os.listdir(self.path):
+                if name not in ("data", "index"):
+                    shutil.copy2(os.path.join(self.path, name), compact_path)
+            self.close()
+            # Once the previous pack is moved aside, the new one is complete
+            # and recover() will put it in place if the swap is interrupted.
+            os.rename(self.path, self.path + ".old")
+            os.rename(compact_path, self.path)
+            shutil.rmtree(self.path + ".old")
+            self.entries = entries
+            self.wasted_size = 0
+            reclaimed = initial_size - self.size
+            logger.info("Compacted media pack %s, %d bytes reclaimed", self.path, reclaimed)
+            return reclaimed
+
+    def close(self):
+        """Release the memory map of the pack"""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
@@ -0,0 +1,164 @@
+"""Shared download pipeline for game banners and icons"""
+import concurrent.futures
+import os
+import threading
+
+import requests
+
+from lutris import __version__
+from lutris.util import resources, system
+from lutris.util.log import logger
+
+# Number of simultaneous downloads, also used as the size of the HTTP
+# connection pool so that every worker can keep its connection alive.
+MAX_WORKERS = 8
+
+# Number of completed downloads reported together to the consumers
+BATCH_SIZE = 24
+
+# Delay, in seconds, to wait for more icons before refreshing the icon cache
+ICON_CACHE_DELAY = 2
+
+
+class MediaPipeline:
+    """Download media files with a persistent pool of workers and connections.
+
+    Completed downloads are reported in batches so views can update many rows
+    in a single main loop iteration, and the desktop icon cache is refreshed
+    once downloads settle down instead of after every pass.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, batch_size=BATCH_SIZE):
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._executor = None
+        self._session = None
+        self._icon_cache_timer = None
+
+    @property
+    def executor(self):
+        """Thread pool shared by every download, created on first use"""
+        with self._lock:
+            if not self._executor:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="media"
+                )
+            return self._executor
+
+    @property
+    def session(self):
+        """HTTP session keeping connections to the media servers alive"""
+        with self._lock:
+            if not self._session:
+                self._session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=self.max_workers,
+                    pool_maxsize=self.max_workers
+                )
+                self._session.mount("https://", adapter)
+                self._session.mount("http://", adapter)
+                self._session.headers["User-Agent"] = "Lutris/%s" % __version__
+            return self._session
+
+    def get_content(self, url):
+        """Return the content at `url` using the pooled connections"""
+        if url.startswith("//"):
+            url = "https:" + url
+        response = self.session.get(url, timeout=30)
+        response.raise_for_status()
+        return response.content
+
+    def download_media(self, url, dest, overwrite=False):
+        """Save a remote media locally using the pooled connections"""
+        if system.path_exists(dest) and not overwrite:
+            return dest
+        content = self.get_content(url)
+        if not content:
+            return
+        # Write to a temporary file first so readers never see partial images,
+        # named after the thread as the same media can be fetched concurrently
+        tmp_path = "%s.%d.tmp" % (dest, threading.get_ident())
+        try:
+            with open(tmp_path, "wb") as dest_file:
+                dest_file.write(content)
+            os.replace(tmp_path, dest)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return dest
+
+    def store_media(self, slug, media_type, url, dest, overwrite=False):
+        """Save a game media in the media pack if enabled, at `dest` otherwise"""
+        pack = resources.get_media_pack()
+        if not pack:
+            return self.download_media(url, dest, overwrite)
+        key = resources.get_media_key(slug, media_type)
+        if key in pack and not overwrite:
+            return dest
+        content = self.get_content(url)
+        if not content:
+            return
+        pack.add(key, content)
+        if system.path_exists(dest):
+            # Keep exported files in sync with the pack
+            pack.export(key, dest, overwrite=True)
+        return dest
+
+    def fetch(self, downloads, callback=None, overwrite=False):
+        """Download media files and report them in batches.
+
+        Blocks until every download is finished, so this should be called
+        from a worker thread.
+
+        Params:
+            downloads (list): (slug, media_type, url, dest) tuples
+            callback (callable): Called with lists of (slug, media_type)
+                tuples as downloads complete
+            overwrite (bool): Download the files even if they already exist
+        """
+        if not downloads:
+            return
+        future_downloads = {
+            self.executor.submit(self.store_media, slug, media_type, url, dest, overwrite): (
+                slug, media_type
+            )
+            for slug, media_type, url, dest in downloads
+        }
+        dest_paths = {(slug, media_type): dest for slug, media_type, _url, dest in downloads}
+        batch = []
+        icons_updated = False
+        for future in concurrent.futures.as_completed(future_downloads):
+            slug, media_type = future_downloads[future]
+            try:
+                if not future.result():
+                    continue
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.exception("Failed to download %s for %s: %s", media_type, slug, ex)
+                continue
+            if media_type == "icon" and system.path_exists(dest_paths[slug, media_type]):
+                icons_updated = True
+            batch.append((slug, media_type))
+            if callback and len(batch) >= self.batch_size:
+                callback(batch)
+                batch = []
+        if callback and batch:
+            callback(batch)
+        if icons_updated:
+            self.schedule_icon_cache_update()
+
+    def schedule_icon_cache_update(self):
+        """Refresh the desktop icon cache once no new icons arrived for a while"""
+        with self._lock:
+            if self._icon_cache_timer:
+                self._icon_cache_timer.cancel()
+            self._icon_cache_timer = threading.Timer(
+                ICON_CACHE_DELAY, resources.update_desktop_icons
+            )
+            self._icon_cache_timer.daemon = True
+            self._icon_cache_timer.start()
+
+
+MEDIA_PIPELINE = MediaPipeline()
@@ -0,0 +1,167 @@
+"""Mounted filesystems, read from /proc/self/mountinfo"""
+import os
+import re
+import select
+import threading
+from collections import namedtuple
+
+from lutris.util.log import logger
+
+MOUNTINFO_PATH = "/proc/self/mountinfo"
+# Properties of the block devices, as found by blkid when udev added them
+UDEV_DATA_PATH = "/run/udev/data"
+
+Mount = namedtuple(
+    "Mount",
+    (
+        "mount_id",
+        "parent_id",
+        "device",  # major:minor
+        "root",
+        "mount_point",
+        "options",
+        "fstype",
+        "source",
+        "super_options",
+    ),
+)
+
+
+def unescape(field):
+    """Decode the octal escapes used for spaces, tabs, newlines and backslashes"""
+    return re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), field)
+
+
+def parse_mountinfo(content):
+    """Return the list of mounts described in the content of a mountinfo file.
+
+    Each line has the format:
+    36 35 98:0 /mnt1 /mnt/parent rw,noatime master:1 - ext3 /dev/root rw,errors=continue
+    where a variable number of optional fields ends with a single dash.
+    """
+    mounts = []
+    for line in content.split("\n"):
+        fields = line.split()
+        try:
+            separator = fields.index("-", 6)
+            mounts.append(Mount(
+                mount_id=int(fields[0]),
+                parent_id=int(fields[1]),
+                device=fields[2],
+                root=unescape(fields[3]),
+                mount_point=unescape(fields[4]),
+                options=fields[5],
+                fstype=fields[separator + 1],
+                source=unescape(fields[separator + 2]),
+                super_options=fields[separator + 3] if len(fields) > separator + 3 else "",
+            ))
+        except (ValueError, IndexError):
+            if line:
+                logger.warning("Invalid mountinfo line: %s", line)
+    return mounts
+
+
+class MountTable:
+    """The mounts of the system, read again only when they change.
+
+    The kernel flags the mountinfo file as having priority data when a
+    filesystem gets mounted or unmounted, so checking for a change is a single
+    poll of the open file. Files that aren't in /proc, like test fixtures,
+    are read again when their size or modification time change.
+    """
+
+    def __init__(self, path=MOUNTINFO_PATH, udev_data_path=UDEV_DATA_PATH):
+        self.path = path
+        self.udev_data_path = udev_data_path
+        self._file = None
+        self._unavailable = False
+        self._poller = None
+        self._stat = None
+        self._mounts = []
+        self._mount_points = {}
+        self._device_fstypes = {}
+        self._lock = threading.Lock()
+
+    def _open(self):
+        try:
+            self._file = open(self.path, encoding="utf-8", errors="surrogateescape")
+        except OSError as ex:
+            logger.error("Unable to read the mounted filesystems from %s: %s", self.path, ex)
+            self._unavailable = True
+            return False
+        self._poller = select.poll()
+        self._poller.register(self._file, select.POLLPRI | select.POLLERR)
+        return True
+
+    def _has_changed(self):
+        """Return True if the mounts may have changed since they were read"""
+        if not self._file:
+            return not self._unavailable and self._open()
+        events = self._poller.poll(0)
+        if any(event & (select.POLLPRI | select.POLLERR) for _fd, event in events):
+            return True
+        return self._get_stat() != self._stat
+
+    def _get_stat(self):
+        file_stat = os.fstat(self._file.fileno())
+        return file_stat.st_mtime_ns, file_stat.st_size
+
+    def _read(self):
+        self._stat = self._get_stat()
+        self._file.seek(0)
+        self._mounts = parse_mountinfo(self._file.read())
+        # Later mounts hide the earlier ones on the same mount point
+        self._mount_points = {mount.mount_point: mount for mount in self._mounts}
+        self._device_fstypes = {}
+
+    def refresh(self):
+        """Read the mounts again if they changed"""
+        with self._lock:
+            if self._has_changed() and self._file:
+                self._read()
+
+    @property
+    def mounts(self):
+        """Return the list of mounts, in the order they were mounted"""
+        self.refresh()
+        return self._mounts
+
+    def get_mount(self, path):
+        """Return the mount a file is located on"""
+        self.refresh()
+        mount_points = self._mount_points
+        if not mount_points:
+            return None
+        path = os.path.realpath(path)
+        while path not in mount_points:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+        return mount_points[path]
+
+    def get_fstype(self, mount):
+        """Return the type of filesystem of a mount.
+
+        FUSE mounts, like the ones of ntfs-3g, only report 'fuseblk'. For
+        block devices, the type detected by udev is used when it is known.
+        """
+        if not mount.source.startswith("/dev/"):
+            return mount.fstype
+        with self._lock:
+            if mount.device not in self._device_fstypes:
+                self._device_fstypes[mount.device] = self._read_udev_fstype(mount.device)
+            return self._device_fstypes[mount.device] or mount.fstype
+
+    def _read_udev_fstype(self, device):
+        try:
+            with open(os.path.join(self.udev_data_path, "b" + device)) as udev_file:
+                for line in udev_file:
+                    if line.startswith("E:ID_FS_TYPE="):
+                        return line.strip().split("=", 1)[1]
+        except OSError:
+            pass
+        return None
+
+
+MOUNT_TABLE = MountTable()
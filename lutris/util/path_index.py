@@ -0,0 +1,90 @@
+"""Case insensitive lookup of paths"""
+import os
+import threading
+from collections import OrderedDict
+
+from lutris.util.log import logger
+
+# Number of folder listings kept in memory
+MAX_INDEXED_FOLDERS = 512
+
+
+class CaseInsensitiveIndex:
+    """Find files regardless of the case of their names, as Windows does.
+
+    The names in each folder are listed once and indexed by their lowercase
+    form, along with the modification time of the folder. The listing is
+    reused as long as the folder keeps the same time, so resolving many
+    paths inside the same tree (a Wine prefix, a Steam library...) only
+    costs one stat per path component.
+    A name missing from an indexed folder triggers a new listing of the
+    folder, in case it was added within the precision of the folder's time.
+    """
+
+    def __init__(self, max_folders=MAX_INDEXED_FOLDERS):
+        self.max_folders = max_folders
+        self._folders = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._folders.clear()
+
+    def _list_folder(self, folder, mtime):
+        names = set()
+        folded_names = {}
+        try:
+            for name in sorted(os.listdir(folder)):
+                names.add(name)
+                folded_names.setdefault(name.lower(), name)
+        except OSError:
+            logger.error("Can't read contents of %s", folder)
+        listing = (mtime, names, folded_names)
+        with self._lock:
+            self._folders[folder] = listing
+            self._folders.move_to_end(folder)
+            while len(self._folders) > self.max_folders:
+                self._folders.popitem(last=False)
+        return listing
+
+    def get_name(self, folder, name):
+        """Return the name of the entry of `folder` matching `name`, ignoring
+        case, or None if there is none. An entry with the exact same name is
+        preferred over other matches.
+        """
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            listing = self._folders.get(folder)
+            if listing:
+                self._folders.move_to_end(folder)
+        fresh = not listing or listing[0] != mtime
+        if fresh:
+            listing = self._list_folder(folder, mtime)
+        _mtime, names, folded_names = listing
+        if name in names:
+            return name
+        if name.lower() not in folded_names and not fresh:
+            _mtime, names, folded_names = self._list_folder(folder, mtime)
+            if name in names:
+                return name
+        return folded_names.get(name.lower())
+
+    def resolve(self, path):
+        """Return the path with the case of its components fixed to match the
+        existing files, or None if no such file exists.
+        """
+        current_path = "/"
+        for part in os.path.abspath(path).strip("/").split("/"):
+            if not part:
+                continue
+            name = self.get_name(current_path, part)
+            if not name:
+                return None
+            current_path = os.path.join(current_path, name)
+        return current_path
+
+
+PATH_INDEX = CaseInsensitiveIndex()
@@ -0,0 +1,105 @@
+"""Results of system probes saved between runs"""
+import json
+import os
+import threading
+
+from lutris.util.log import logger
+
+
+def get_mtime(path):
+    """Return the modification time of a file in nanoseconds, or 0 if it doesn't exist"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def read_file(path):
+    """Return the content of a file or an empty string if it can't be read"""
+    try:
+        with open(path) as _file:
+            return _file.read()
+    except OSError:
+        return ""
+
+
+class ProbeCache:
+    """Base class for objects probing the system lazily.
+
+    Each probe is run the first time its result is needed. The results are
+    saved to `cache_path` along with the key returned by `get_cache_key`,
+    and reused by the next runs as long as the key stays the same.
+    """
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self._cache = {}
+        self._probes = None
+        self._lock = threading.RLock()
+        # Incremented each time the results are forgotten
+        self.generation = 0
+
+    def get_cache_key(self):
+        """Return the state of the system the saved probes depend on"""
+        raise NotImplementedError
+
+    def load_probes(self):
+        """Return the probe results saved for the current state of the system"""
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path) as cache_file:
+                cache = json.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as ex:
+            logger.warning("Invalid system cache %s: %s", self.cache_path, ex)
+            return {}
+        if cache.get("key") != self.get_cache_key():
+            logger.debug("System changed, probing %s again", self.cache_path)
+            return {}
+        return cache.get("probes", {})
+
+    def save_probes(self):
+        """Save the probe results to the cache file"""
+        if not self.cache_path:
+            return
+        tmp_path = self.cache_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(tmp_path, "w") as cache_file:
+                json.dump({"key": self.get_cache_key(), "probes": self._probes}, cache_file)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as ex:
+            logger.warning("Failed to save the system cache to %s: %s", self.cache_path, ex)
+
+    def probe(self, name, probe_func):
+        """Return the result of `probe_func`, reading it from the cache file
+        if it is there. Results of None aren't saved.
+        """
+        with self._lock:
+            if self._probes is None:
+                self._probes = self.load_probes()
+            if name in self._probes:
+                return self._probes[name]
+            result = probe_func()
+            if result is not None:
+                self._probes[name] = result
+                self.save_probes()
+            return result
+
+    def refresh(self):
+        """Forget the results of the probes, they are read from the cache file
+        again, or probed again if the system changed.
+        """
+        with self._lock:
+            self._cache = {}
+            self._probes = None
+            self.generation += 1
+
+    def _get_cached(self, key, func):
+        """Return the value of `func`, computed the first time it is needed"""
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = func()
+            return self._cache[key]
@@ -1,12 +1,23 @@
 """Utility module to handle media resources"""
 import os
+import threading
 from gi.repository import GLib
 
 from lutris import settings
 from lutris.util.http import Request, HTTPError
+from lutris.util.jobs import AsyncCall
+from lutris.util.log import logger
+from lutris.util.media_pack import MediaPack
 
 from lutris.util import system
 
+MEDIA_PACK = None
+MEDIA_PACK_LOCK = threading.Lock()
+# Background import of the loose media files in the media pack
+MEDIA_IMPORT = None
+# File created in the media pack once the loose media files are imported
+MEDIA_IMPORT_MARKER = "imported"
+
 
 def get_icon_path(game_slug, icon_type="icon"):
     """Return the absolute path for a game_slug icon"""
@@ -22,15 +33,149 @@ def get_banner_path(game_slug):
     return get_icon_path(game_slug, "banner")
 
 
+def get_coverart_path(game_slug):
+    """Return the absolute path for a game_slug cover art"""
+    return os.path.join(settings.COVERART_PATH, "%s.jpg" % game_slug)
+
+
+def get_media_key(game_slug, media_type):
+    """Return the key of a media in the media pack"""
+    for prefix in ("banner", "icon", "coverart"):
+        if media_type.startswith(prefix):
+            return "%s/%s" % (prefix, game_slug)
+    raise ValueError("Invalid media type %s" % media_type)
+
+
+def import_loose_media(pack):
+    """Add the media files stored in the media folders to `pack` and return
+    the paths of the imported files.
+
+    The import is marked as complete in the pack once the files are added.
+    """
+    folders = (
+        ("banner", settings.BANNER_PATH, "", ".jpg"),
+        ("icon", settings.ICON_PATH, "lutris_", ".png"),
+        ("coverart", settings.COVERART_PATH, "", ".jpg"),
+    )
+    files = {}
+    for media_type, folder, prefix, extension in folders:
+        if not os.path.isdir(folder):
+            continue
+        for entry in os.scandir(folder):
+            if not (entry.name.startswith(prefix) and entry.name.endswith(extension)):
+                continue
+            game_slug = entry.name[len(prefix):-len(extension)]
+            files[get_media_key(game_slug, media_type)] = entry.path
+    imported_keys = pack.add_files(list(files.items()))
+    with open(os.path.join(pack.path, MEDIA_IMPORT_MARKER), "w"):
+        pass
+    logger.info("Imported %d media files in %s", len(imported_keys), pack.path)
+    return [files[key] for key in imported_keys]
+
+
+def load_media_pack(pack):
+    """Import the loose media files in `pack`, then use it as the media pack.
+
+    Imported banners and cover art are deleted, icons stay in the icon theme
+    where desktop launchers look for them.
+    """
+    global MEDIA_PACK  # pylint: disable=global-statement
+    imported_paths = import_loose_media(pack)
+    with MEDIA_PACK_LOCK:
+        MEDIA_PACK = pack
+    for path in imported_paths:
+        if os.path.dirname(path) == settings.ICON_PATH:
+            continue
+        try:
+            os.remove(path)
+        except OSError as ex:
+            logger.warning("Unable to remove imported media %s: %s", path, ex)
+
+
+def get_media_pack():
+    """Return the media pack if packed media is enabled, None otherwise.
+
+    Loose media files are imported in the background the first time the
+    pack is opened, or if that import was interrupted. Media are read from
+    the media folders until it completes.
+    """
+    global MEDIA_PACK, MEDIA_IMPORT  # pylint: disable=global-statement
+    if settings.read_setting("packed_media") != "True":
+        return None
+    with MEDIA_PACK_LOCK:
+        if MEDIA_PACK or MEDIA_IMPORT:
+            return MEDIA_PACK
+        pack = MediaPack(settings.MEDIA_PACK_PATH)
+        if not os.path.exists(os.path.join(pack.path, MEDIA_IMPORT_MARKER)):
+            MEDIA_IMPORT = AsyncCall(load_media_pack, None, pack)
+            return None
+        if pack.needs_compaction:
+            pack.compact()
+        MEDIA_PACK = pack
+    return MEDIA_PACK
+
+
+def has_media(game_slug, media_type):
+    """Return True if the media of `media_type` is available for a game"""
+    pack = get_media_pack()
+    if pack:
+        return get_media_key(game_slug, media_type) in pack
+    if media_type.startswith("coverart"):
+        return system.path_exists(get_coverart_path(game_slug))
+    return system.path_exists(get_icon_path(game_slug, media_type))
+
+
+def get_media_data(game_slug, media_type):
+    """Return the content of a media from the media pack, if enabled"""
+    pack = get_media_pack()
+    if not pack:
+        return None
+    return pack.get(get_media_key(game_slug, media_type))
+
+
+def store_media(game_slug, media_type, path):
+    """Add a media file written at `path` to the media pack, if enabled"""
+    pack = get_media_pack()
+    if pack:
+        pack.add_file(get_media_key(game_slug, media_type), path)
+
+
+def remove_media(game_slug, media_type):
+    """Delete a media from the media pack and from the media folders"""
+    pack = get_media_pack()
+    if pack:
+        pack.remove(get_media_key(game_slug, media_type))
+    path = get_icon_path(game_slug, media_type)
+    if system.path_exists(path):
+        os.remove(path)
+
+
+def export_media(game_slug, media_type="icon"):
+    """Write a packed media as a loose file, for use by the desktop.
+
+    Returns the path of the loose file, or None if the media isn't packed.
+    When the media pack is disabled, media are already stored as loose files.
+    """
+    path = get_icon_path(game_slug, media_type)
+    pack = get_media_pack()
+    if pack:
+        return pack.export(get_media_key(game_slug, media_type), path)
+    return path
+
+
 def update_desktop_icons():
     """Update Icon for GTK+ desktop manager
     Other desktop manager icon cache commands must be added here if needed
     """
     gtk_update_icon_cache = system.find_executable("gtk-update-icon-cache")
     if gtk_update_icon_cache:
-        os.system(
-            "gtk-update-icon-cache -tf %s"
-            % os.path.join(GLib.get_user_data_dir(), "icons", "hicolor")
+        system.execute(
+            [
+                gtk_update_icon_cache,
+                "-tf",
+                os.path.join(GLib.get_user_data_dir(), "icons", "hicolor"),
+            ],
+            quiet=True,
         )
 
 
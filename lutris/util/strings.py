@@ -111,6 +111,19 @@ def escape_gtk_label(string):
     return re.sub("&(?!amp;)", "&amp;", string)
 
 
+def get_formatted_size(size):
+    """Return a human readable size from a number of bytes"""
+    for unit in ("bytes", "KB", "MB", "GB"):
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = "TB"
+    if unit == "bytes":
+        return "%d %s" % (size, unit)
+    return "%0.1f %s" % (size, unit)
+
+
 def get_formatted_playtime(playtime):
     """Return a human readable value of the play time"""
     if not playtime:
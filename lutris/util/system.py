@@ -7,8 +7,10 @@ import shutil
 import string
 import subprocess
 
+from lutris.util.filecopy import FolderCopy
 from lutris.util.linux import LINUX_SYSTEM
 from lutris.util.log import logger
+from lutris.util.path_index import PATH_INDEX
 
 
 def execute(command, env=None, cwd=None, log_errors=False, quiet=False, shell=False):
@@ -166,27 +168,19 @@ def substitute(string_template, variables):
     return template.safe_substitute(variables)
 
 
-def merge_folders(source, destination):
-    """Merges the content of source to destination"""
+def merge_folders(source, destination, callback=None, manifest=None):
+    """Merges the content of source to destination
+
+    Params:
+        callback (callable): Called with the number of files copied, the
+            total number of files, the number of bytes copied and the total
+            number of bytes as the copy progresses
+        manifest (InstallManifest): Records the copied files
+    """
     logger.debug("Merging %s into %s", source, destination)
-    source = os.path.abspath(source)
-    for (dirpath, dirnames, filenames) in os.walk(source):
-        source_relpath = dirpath[len(source):].strip("/")
-        dst_abspath = os.path.join(destination, source_relpath)
-        for dirname in dirnames:
-            new_dir = os.path.join(dst_abspath, dirname)
-            logger.debug("creating dir: %s", new_dir)
-            try:
-                os.mkdir(new_dir)
-            except OSError:
-                pass
-        for filename in filenames:
-            # logger.debug("Copying %s", filename)
-            if not os.path.exists(dst_abspath):
-                os.makedirs(dst_abspath)
-            shutil.copy(
-                os.path.join(dirpath, filename), os.path.join(dst_abspath, filename)
-            )
+    FolderCopy(source, destination, callback=callback).copy()
+    if manifest:
+        manifest.add_tree(source, destination)
 
 
 def remove_folder(path):
@@ -239,33 +233,17 @@ def is_removeable(path, excludes=None):
     return True
 
 
-def fix_path_case(path):
-    """Do a case insensitive check, return the real path with correct case."""
+def fix_path_case(path, index=None):
+    """Do a case insensitive check, return the real path with correct case.
+
+    Params:
+        index (CaseInsensitiveIndex): Index of folder listings to use,
+            defaults to the one shared by all lookups
+    """
     if not path or os.path.exists(path):
         # If a path isn't provided or it exists as is, return it.
         return path
-    parts = path.strip("/").split("/")
-    current_path = "/"
-    for part in parts:
-        if not os.path.exists(current_path):
-            return
-        tested_path = os.path.join(current_path, part)
-        if os.path.exists(tested_path):
-            current_path = tested_path
-            continue
-        try:
-            path_contents = os.listdir(current_path)
-        except OSError:
-            logger.error("Can't read contents of %s", current_path)
-            path_contents = []
-        for filename in path_contents:
-            if filename.lower() == part.lower():
-                current_path = os.path.join(current_path, filename)
-                continue
-
-    # Only return the path if we got the same number of elements
-    if len(parts) == len(current_path.strip("/").split("/")):
-        return current_path
+    return (index or PATH_INDEX).resolve(path)
 
 
 def get_pids_using_file(path):
@@ -0,0 +1,148 @@
+"""Record the time spent in parts of Lutris, in the Chrome trace format.
+
+Tracing is enabled by setting LUTRIS_TRACE to the path of the trace file or by
+running lutris with --trace FILE. Open the file in chrome://tracing or
+https://ui.perfetto.dev to see the recorded spans of each thread.
+This module must not import GLib, it is loaded before anything else.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+TRACE_ENV = "LUTRIS_TRACE"
+TRACE_OPTION = "--trace"
+
+# Events kept in memory, later ones are dropped
+MAX_TRACE_EVENTS = 100000
+
+
+def get_trace_path(argv):
+    """Return the trace file requested in the command line or the environment"""
+    for index, arg in enumerate(argv):
+        if arg == TRACE_OPTION and index + 1 < len(argv):
+            return argv[index + 1]
+        if arg.startswith(TRACE_OPTION + "="):
+            return arg.split("=", 1)[1]
+    return os.environ.get(TRACE_ENV)
+
+
+class Tracer:
+    """Collect spans of time as Chrome trace events.
+
+    When no trace is started, spans are not recorded and only cost a check
+    of the `enabled` attribute.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.events = []
+        self._start_time = 0
+        self._thread_ids = set()
+        self._lock = threading.Lock()
+
+    def start(self, path):
+        """Start recording events, to be written to `path` when Lutris exits"""
+        if not path or self.enabled:
+            return
+        self.path = os.path.abspath(path)
+        self._start_time = time.perf_counter()
+        self.enabled = True
+        atexit.register(self.save)
+
+    def _get_timestamp(self):
+        """Return the time since the start of the trace in microseconds"""
+        return (time.perf_counter() - self._start_time) * 1000000
+
+    def add_event(self, event):
+        thread = threading.current_thread()
+        event["pid"] = os.getpid()
+        event["tid"] = thread.ident
+        with self._lock:
+            if len(self.events) >= MAX_TRACE_EVENTS:
+                return
+            if thread.ident not in self._thread_ids:
+                self._thread_ids.add(thread.ident)
+                self.events.append({
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": event["pid"],
+                    "tid": thread.ident,
+                    "args": {"name": thread.name},
+                })
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, category="lutris", **args):
+        """Record the time spent in a `with` block"""
+        if not self.enabled:
+            yield
+            return
+        start_time = self._get_timestamp()
+        try:
+            yield
+        finally:
+            self.add_event({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": start_time,
+                "dur": self._get_timestamp() - start_time,
+                "args": args,
+            })
+
+    def instant(self, name, category="lutris", **args):
+        """Record a point in time"""
+        if not self.enabled:
+            return
+        self.add_event({
+            "name": name,
+            "cat": category,
+            "ph": "i",
+            "s": "t",
+            "ts": self._get_timestamp(),
+            "args": args,
+        })
+
+    def save(self):
+        """Write the trace file"""
+        if not self.enabled:
+            return
+        with self._lock:
+            trace = {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+        try:
+            with open(self.path, "w") as trace_file:
+                json.dump(trace, trace_file)
+        except OSError as ex:
+            sys.stderr.write("Failed to write trace to %s: %s\n" % (self.path, ex))
+
+
+TRACER = Tracer()
+
+
+def get_function_name(func):
+    """Return a readable name for a function or another callable"""
+    if isinstance(func, functools.partial):
+        return get_function_name(func.func)
+    name = getattr(func, "__qualname__", None) or getattr(func, "__name__", None)
+    if not name:
+        return repr(func)
+    return "%s.%s" % (getattr(func, "__module__", None) or "", name)
+
+
+def traced(func):
+    """Decorator recording the calls of a function in the trace"""
+    name = get_function_name(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not TRACER.enabled:
+            return func(*args, **kwargs)
+        with TRACER.span(name):
+            return func(*args, **kwargs)
+    return wrapper
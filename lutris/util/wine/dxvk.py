@@ -11,11 +11,13 @@ from lutris.util.log import logger
 from lutris.util.extract import extract_archive
 from lutris.util.downloader import Downloader
 from lutris.util import system
+from lutris.util.tracing import traced
 
 CACHE_MAX_AGE = 86400  # Re-download DXVK versions every day
 
 
 @system.run_once
+@traced
 def init_dxvk_versions():
     def get_dxvk_versions(base_name, tags_url):
         """Get DXVK versions from GitHub"""
@@ -155,7 +157,7 @@ class DXVKManager:
 
         downloader = Downloader(dxvk_url, dxvk_archive_path)
         downloader.start()
-        while downloader.check_progress() < 1 and downloader.state != downloader.ERROR:
+        while downloader.check_progress() < 1 and downloader.thread.is_alive():
             time.sleep(0.3)
         if not system.path_exists(dxvk_archive_path):
             raise UnavailableDXVKVersion(
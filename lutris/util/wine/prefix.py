@@ -1,5 +1,6 @@
 """Wine prefix management"""
 import os
+from contextlib import contextmanager
 from lutris.util.wine.registry import WineRegistry
 from lutris.util.log import logger
 from lutris.util import joypad, system
@@ -20,17 +21,52 @@ class WinePrefixManager:
         if not path:
             logger.warning("No path specified for Wine prefix")
         self.path = path
+        # Registries loaded by the current transaction, by file path
+        self._registries = None
 
     def setup_defaults(self):
         """Sets the defaults for newly created prefixes"""
-        self.override_dll("winemenubuilder.exe", "")
+        with self.registry_transaction():
+            self.override_dll("winemenubuilder.exe", "")
+            try:
+                self.desktop_integration()
+            except OSError as ex:
+                logger.error(
+                    "Failed to setup desktop integration, the prefix may not be valid."
+                )
+                logger.exception(ex)
+
+    @contextmanager
+    def registry_transaction(self):
+        """Load each registry file once for all the registry reads and writes
+        made in the block, and save the changed ones when it ends. Nothing is
+        saved if the block raises an exception.
+        """
+        if self._registries is not None:
+            # Nested transactions are part of the outer one
+            yield
+            return
+        self._registries = {}
         try:
-            self.desktop_integration()
-        except OSError as ex:
-            logger.error(
-                "Failed to setup desktop integration, the prefix may not be valid."
-            )
-            logger.exception(ex)
+            yield
+            for registry in self._registries.values():
+                registry.save_changes()
+        finally:
+            self._registries = None
+
+    def get_registry(self, key):
+        """Return the registry holding a key, shared by the current transaction"""
+        registry_path = self.get_registry_path(key)
+        if self._registries is None:
+            return WineRegistry(registry_path)
+        if registry_path not in self._registries:
+            self._registries[registry_path] = WineRegistry(registry_path)
+        return self._registries[registry_path]
+
+    def save_registry(self, registry):
+        """Save a changed registry, unless a transaction saves it later"""
+        if self._registries is None:
+            registry.save_changes()
 
     def get_registry_path(self, key):
         """Matches registry keys to a registry file
@@ -49,23 +85,23 @@ class WinePrefixManager:
         )
 
     def get_registry_key(self, key, subkey):
-        registry = WineRegistry(self.get_registry_path(key))
+        registry = self.get_registry(key)
         return registry.query(self.get_key_path(key), subkey)
 
     def set_registry_key(self, key, subkey, value):
-        registry = WineRegistry(self.get_registry_path(key))
+        registry = self.get_registry(key)
         registry.set_value(self.get_key_path(key), subkey, value)
-        registry.save()
+        self.save_registry(registry)
 
     def clear_registry_key(self, key):
-        registry = WineRegistry(self.get_registry_path(key))
+        registry = self.get_registry(key)
         registry.clear_key(self.get_key_path(key))
-        registry.save()
+        self.save_registry(registry)
 
     def clear_registry_subkeys(self, key, subkeys):
-        registry = WineRegistry(self.get_registry_path(key))
+        registry = self.get_registry(key)
         registry.clear_subkeys(self.get_key_path(key), subkeys)
-        registry.save()
+        self.save_registry(registry)
 
     def override_dll(self, dll, mode):
         key = self.hkcu_prefix + "/Software/Wine/DllOverrides"
@@ -175,20 +211,21 @@ class WinePrefixManager:
         virtual desktop name is 'default'.
         """
         path = self.hkcu_prefix + "/Software/Wine/Explorer"
-        if enabled:
+        if not enabled:
+            self.clear_registry_key(path)
+            return
+        default_resolution = "x".join(DISPLAY_MANAGER.get_current_resolution())
+        logger.debug(
+            "Enabling wine virtual desktop with default resolution of %s",
+            default_resolution,
+        )
+        with self.registry_transaction():
             self.set_registry_key(path, "Desktop", "WineDesktop")
-            default_resolution = "x".join(DISPLAY_MANAGER.get_current_resolution())
-            logger.debug(
-                "Enabling wine virtual desktop with default resolution of %s",
-                default_resolution,
-            )
             self.set_registry_key(
                 self.hkcu_prefix + "/Software/Wine/Explorer/Desktops",
                 "WineDesktop",
                 default_resolution,
             )
-        else:
-            self.clear_registry_key(path)
 
     def set_desktop_size(self, desktop_size):
         """Sets the desktop size if one is given but do not reset the key if
@@ -209,10 +246,11 @@ class WinePrefixManager:
     def configure_joypads(self):
         joypads = joypad.get_joypads()
         key = self.hkcu_prefix + "/Software/Wine/DirectInput/Joysticks"
-        self.clear_registry_key(key)
-        for device, joypad_name in joypads:
-            if "event" in device:
-                disabled_joypad = "{} (js)".format(joypad_name)
-            else:
-                disabled_joypad = "{} (event)".format(joypad_name)
-            self.set_registry_key(key, disabled_joypad, "disabled")
+        with self.registry_transaction():
+            self.clear_registry_key(key)
+            for device, joypad_name in joypads:
+                if "event" in device:
+                    disabled_joypad = "{} (js)".format(joypad_name)
+                else:
+                    disabled_joypad = "{} (event)".format(joypad_name)
+                self.set_registry_key(key, disabled_joypad, "disabled")
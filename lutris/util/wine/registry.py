@@ -2,6 +2,7 @@
 import os
 import re
 from collections import OrderedDict
+from collections.abc import MutableMapping
 from datetime import datetime
 from lutris.util.log import logger
 from lutris.util import system
@@ -68,6 +69,127 @@ class WindowsFileTime:
         return datetime.fromtimestamp(self.to_unix_timestamp())
 
 
+# Key header at the start of a line: its name in brackets, then a timestamp
+KEY_HEADER_RE = re.compile(r"\n(\[[^\n]*?[^\\\n]\]) ")
+
+
+class WineRegistryKeys(MutableMapping):
+    """Keys of a registry file, by name and in the order of the file.
+
+    The file is scanned once for the position of the key headers; the
+    content of a key is parsed the first time it is accessed. The file is
+    rendered by copying its original text, except for the keys that were
+    accessed, added or deleted.
+    """
+
+    def __init__(self, content=""):
+        self.content = content
+        # Positions of the key headers in the content
+        self.starts = []
+        # Index of the first definition of each key in self.starts
+        self.positions = OrderedDict()
+        # Later definitions of the keys defined more than once
+        self.redefinitions = {}
+        for match in KEY_HEADER_RE.finditer(content):
+            index = len(self.starts)
+            self.starts.append(match.start() + 1)
+            name = match.group(1).replace("\\\\", "/").strip("[]")
+            if name in self.positions:
+                self.redefinitions.setdefault(name, []).append(index)
+            else:
+                self.positions[name] = index
+        self._keys = OrderedDict()
+        self._deleted = set()
+        # Keys defined twice keep their first position and their last content
+        for name in self.redefinitions:
+            self._keys[name] = self._parse(self.redefinitions[name][-1])
+
+    @property
+    def header_end(self):
+        """Return the position of the first key in the content"""
+        return self.starts[0] if self.starts else len(self.content)
+
+    def get_text(self, index):
+        """Return the original text of a key, without the blank lines following it"""
+        start = self.starts[index]
+        end = self.starts[index + 1] if index + 1 < len(self.starts) else len(self.content)
+        return self.content[start:end].rstrip("\n")
+
+    def _parse(self, index):
+        return WineRegistryKey.from_content(self.get_text(index))
+
+    def __getitem__(self, name):
+        if name in self._keys:
+            return self._keys[name]
+        if name in self._deleted or name not in self.positions:
+            raise KeyError(name)
+        key = self._parse(self.positions[name])
+        self._keys[name] = key
+        return key
+
+    def __setitem__(self, name, key):
+        self._deleted.discard(name)
+        self._keys[name] = key
+
+    def __delitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        self._keys.pop(name, None)
+        if name in self.positions:
+            self._deleted.add(name)
+
+    def __iter__(self):
+        for name in self.positions:
+            if name not in self._deleted:
+                yield name
+        for name in self._keys:
+            if name not in self.positions:
+                yield name
+
+    def __len__(self):
+        added = sum(1 for name in self._keys if name not in self.positions)
+        return len(self.positions) - len(self._deleted) + added
+
+    def __contains__(self, name):
+        return name in self._keys or (name in self.positions and name not in self._deleted)
+
+    def render(self):
+        """Return the content of the keys in the wine .reg format"""
+        # Text replacing the original keys, None for the removed ones
+        replacements = {}
+        added_keys = []
+        for name, key in self._keys.items():
+            if name in self.positions:
+                replacements[self.positions[name]] = key.render()
+            else:
+                added_keys.append(key)
+        for name in self._deleted:
+            replacements[self.positions[name]] = None
+        for indexes in self.redefinitions.values():
+            for index in indexes:
+                replacements[index] = None
+
+        parts = ["\n"] if self.starts else []
+        position = self.header_end
+        for index in sorted(replacements):
+            start = self.starts[index]
+            parts.append(self.content[position:start])
+            text = replacements[index]
+            if text is None:
+                position = self.starts[index + 1] if index + 1 < len(self.starts) else len(self.content)
+            else:
+                parts.append(text)
+                # The rendered key ends with the line break following the original one
+                position = min(start + len(self.get_text(index)) + 1, len(self.content))
+        parts.append(self.content[position:])
+        if added_keys and parts[-1] and not parts[-1].endswith("\n"):
+            parts.append("\n")
+        for key in added_keys:
+            parts.append("\n")
+            parts.append(key.render())
+        return "".join(parts)
+
+
 class WineRegistry:
     version_header = "WINE REGISTRY Version "
     relative_to_header = ";; All keys relative to "
@@ -76,8 +198,12 @@ class WineRegistry:
         self.arch = WINE_DEFAULT_ARCH
         self.version = 2
         self.relative_to = "\\\\User\\\\S-1-5-21-0-0-0-1000"
-        self.keys = OrderedDict()
+        self.keys = WineRegistryKeys()
         self.reg_filename = reg_filename
+        # Set when the registry is changed after it was read or saved
+        self.changed = False
+        # Content of the file when it was read or saved
+        self.saved_content = None
         if reg_filename:
             if not system.path_exists(reg_filename):
                 logger.error("Unexisting registry %s", reg_filename)
@@ -91,43 +217,28 @@ class WineRegistry:
 
     @staticmethod
     def get_raw_registry(reg_filename):
-        """Return an array of the unprocessed contents of a registry file"""
+        """Return the unprocessed contents of a registry file"""
         if not system.path_exists(reg_filename):
-            return []
+            return ""
         with open(reg_filename, "r") as reg_file:
 
             try:
-                registry_content = reg_file.readlines()
+                registry_content = reg_file.read()
             except Exception:  # pylint: disable=broad-except
                 logger.exception(
                     "Failed to registry read %s, please send attach this file in a bug report",
                     reg_filename,
                 )
-                registry_content = []
+                registry_content = ""
         return registry_content
 
     def parse_reg_file(self, reg_filename):
-        registry_lines = self.get_raw_registry(reg_filename)
-        current_key = None
-        add_next_to_value = False
-        additional_values = []
-        for line in registry_lines:
-            line = line.rstrip("\n")
-
-            if line.startswith("["):
-                current_key = WineRegistryKey(key_def=line)
-                self.keys[current_key.name] = current_key
-            elif current_key:
-                if add_next_to_value:
-                    additional_values.append(line)
-                elif not add_next_to_value:
-                    if additional_values:
-                        additional_values = "\n".join(additional_values)
-                        current_key.add_to_last(additional_values)
-                        additional_values = []
-                    current_key.parse(line)
-                add_next_to_value = line.endswith("\\")
-            elif line.startswith(self.version_header):
+        """Read the header of a registry file and index its keys"""
+        content = self.get_raw_registry(reg_filename)
+        self.keys = WineRegistryKeys(content)
+        self.saved_content = content
+        for line in content[:self.keys.header_end].split("\n"):
+            if line.startswith(self.version_header):
                 self.version = int(line[len(self.version_header):])
             elif line.startswith(self.relative_to_header):
                 self.relative_to = line[len(self.relative_to_header):]
@@ -138,12 +249,9 @@ class WineRegistry:
         content = "{}{}\n".format(self.version_header, self.version)
         content += "{}{}\n\n".format(self.relative_to_header, self.relative_to)
         content += "#arch={}\n".format(self.arch)
-        for key in self.keys:
-            content += "\n"
-            content += self.keys[key].render()
-        return content
+        return content + self.keys.render()
 
-    def save(self, path=None):
+    def save(self, path=None, content=None):
         """Write the registry to a file"""
         if not path:
             path = self.reg_filename
@@ -155,8 +263,29 @@ class WineRegistry:
                 "Invalid Wine prefix path %s, make sure to "
                 "create the prefix before saving to a registry" % prefix_path
             )
-        with open(path, "w") as registry_file:
-            registry_file.write(self.render())
+        if content is None:
+            content = self.render()
+        # Replace the file at once, Wine never reads a partially written registry
+        tmp_path = path + ".lutris-tmp"
+        with open(tmp_path, "w") as registry_file:
+            registry_file.write(content)
+        os.replace(tmp_path, path)
+        if path == self.reg_filename:
+            self.saved_content = content
+            self.changed = False
+
+    def save_changes(self):
+        """Save the registry to its file if its content changed, return
+        whether it was saved.
+        """
+        if not self.changed:
+            return False
+        content = self.render()
+        if content == self.saved_content:
+            self.changed = False
+            return False
+        self.save(content=content)
+        return True
 
     def query(self, path, subkey):
         key = self.keys.get(path)
@@ -168,14 +297,19 @@ class WineRegistry:
         if not key:
             key = WineRegistryKey(path=path)
             self.keys[key.name] = key
+        elif key.subkeys.get(subkey) == key.render_value(value):
+            return
         key.set_subkey(subkey, value)
+        self.changed = True
 
     def clear_key(self, path):
         """Removes all subkeys from a key"""
         key = self.keys.get(path)
-        if not key:
+        if not key or not key.subkeys:
             return
         key.subkeys.clear()
+        key.raw_content = None
+        self.changed = True
 
     def clear_subkeys(self, path, keys):
         """Remove some subkeys from a key"""
@@ -186,6 +320,8 @@ class WineRegistry:
             if subkey not in keys:
                 continue
             key.subkeys.pop(subkey)
+            key.raw_content = None
+            self.changed = True
 
     def get_unix_path(self, windows_path):
         windows_path = windows_path.replace("\\", "/")
@@ -205,7 +341,8 @@ class WineRegistry:
 
         if not os.path.isabs(drive_path):
             drive_path = os.path.join(drives_path, drive_path)
-        return os.path.join(drive_path, relpath)
+        unix_path = os.path.join(drive_path, relpath)
+        return system.fix_path_case(unix_path) or unix_path
 
 
 class WineRegistryKey:
@@ -213,6 +350,8 @@ class WineRegistryKey:
 
         self.subkeys = OrderedDict()
         self.metas = OrderedDict()
+        # Text the key was parsed from, rendered as is until the key changes
+        self.raw_content = None
 
         if path:
             # Key is created by path, it's a new key
@@ -240,6 +379,31 @@ class WineRegistryKey:
     def __str__(self):
         return "{0} {1}".format(self.raw_name, self.raw_timestamp)
 
+    @classmethod
+    def from_content(cls, content):
+        """Return a key parsed from its text in a registry file"""
+        lines = content.split("\n")
+        key = cls(key_def=lines[0])
+        key.parse_lines(lines[1:])
+        key.raw_content = content
+        return key
+
+    def parse_lines(self, lines):
+        """Parse the lines of the key, joining the values split on several lines"""
+        add_next_to_value = False
+        additional_values = []
+        for line in lines:
+            if add_next_to_value:
+                additional_values.append(line)
+            else:
+                if additional_values:
+                    self.add_to_last("\n".join(additional_values))
+                    additional_values = []
+                self.parse(line)
+            add_next_to_value = line.endswith("\\")
+        if additional_values:
+            self.add_to_last("\n".join(additional_values))
+
     def parse(self, line):
         """Parse a registry line, populating meta and subkeys"""
         if len(line) < 4:
@@ -271,6 +435,8 @@ class WineRegistryKey:
 
     def render(self):
         """Return the content of the key in the wine .reg format"""
+        if self.raw_content is not None:
+            return self.raw_content + "\n"
         content = self.raw_name + " " + self.raw_timestamp + "\n"
         for key, value in self.metas.items():
             if value is None:
@@ -333,6 +499,7 @@ class WineRegistryKey:
 
     def set_subkey(self, name, value):
         self.subkeys[name] = self.render_value(value)
+        self.raw_content = None
 
     def get_subkey(self, name):
         if name not in self.subkeys:
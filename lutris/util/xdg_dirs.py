@@ -0,0 +1,18 @@
+"""XDG base directories, found the same way GLib does, without importing it"""
+import os
+
+
+def _get_dir(env_var, default):
+    return os.environ.get(env_var) or os.path.join(os.path.expanduser("~"), default)
+
+
+def get_user_config_dir():
+    return _get_dir("XDG_CONFIG_HOME", ".config")
+
+
+def get_user_data_dir():
+    return _get_dir("XDG_DATA_HOME", ".local/share")
+
+
+def get_user_cache_dir():
+    return _get_dir("XDG_CACHE_HOME", ".cache")
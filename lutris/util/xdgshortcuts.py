@@ -7,7 +7,7 @@ from textwrap import dedent
 
 from gi.repository import GLib
 
-from lutris.util import system
+from lutris.util import resources, system
 from lutris.settings import CACHE_DIR
 
 
@@ -45,6 +45,10 @@ def get_xdg_basename(game_slug, game_id, base_dir=None):
 
 def create_launcher(game_slug, game_id, game_name, desktop=False, menu=False):
     """Create a .desktop file."""
+    if resources.get_media_pack():
+        # Packed icons are only written to the icon theme when needed
+        resources.export_media(game_slug, "icon")
+        resources.update_desktop_icons()
     desktop_dir = GLib.get_user_special_dir(GLib.UserDirectory.DIRECTORY_DESKTOP)
     launcher_content = dedent(
         """
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Compare fix_path_case with the lookup it used before folder listings were
+indexed, on paths with the wrong case inside a synthetic Wine prefix.
+
+Usage: benchmark_fix_path_case.py [path count] [files per folder]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lutris.util import system  # noqa: E402
+
+PATH_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+FILES_PER_FOLDER = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+FOLDERS = (
+    "drive_c/windows/system32",
+    "drive_c/windows/syswow64",
+    "drive_c/Program Files/Game/Data/Textures",
+    "drive_c/users/Public/Documents/Game/Saves",
+)
+
+
+def create_prefix(path):
+    """Create the prefix, return the paths of its files"""
+    file_paths = []
+    for folder in FOLDERS:
+        folder = os.path.join(path, folder)
+        os.makedirs(folder)
+        for index in range(FILES_PER_FOLDER):
+            file_path = os.path.join(folder, "File%05d.dll" % index)
+            open(file_path, "w").close()
+            file_paths.append(file_path)
+    return file_paths
+
+
+def listdir_fix_path_case(path):
+    """The lookup done by fix_path_case before it used an index"""
+    if not path or os.path.exists(path):
+        return path
+    parts = path.strip("/").split("/")
+    current_path = "/"
+    for part in parts:
+        if not os.path.exists(current_path):
+            return
+        tested_path = os.path.join(current_path, part)
+        if os.path.exists(tested_path):
+            current_path = tested_path
+            continue
+        for filename in os.listdir(current_path):
+            if filename.lower() == part.lower():
+                current_path = os.path.join(current_path, filename)
+                continue
+    if len(parts) == len(current_path.strip("/").split("/")):
+        return current_path
+
+
+def measure(name, func, paths):
+    start_time = time.monotonic()
+    for path in paths:
+        func(path)
+    print("%s: %0.3fs" % (name, time.monotonic() - start_time))
+
+
+def main():
+    prefix = tempfile.mkdtemp()
+    try:
+        print("Resolving %d paths in folders of %d files" % (PATH_COUNT, FILES_PER_FOLDER))
+        file_paths = create_prefix(prefix)
+        paths = [
+            os.path.join(prefix, os.path.relpath(path, prefix).upper())
+            for path in random.sample(file_paths, min(PATH_COUNT, len(file_paths)))
+        ]
+        measure("os.listdir per component", listdir_fix_path_case, paths)
+        measure("fix_path_case", system.fix_path_case, paths)
+    finally:
+        shutil.rmtree(prefix)
+
+
+if __name__ == "__main__":
+    main()
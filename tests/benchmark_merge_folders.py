@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Compare merge_folders with a sequential shutil.copy of the same tree.
+
+Usage: benchmark_merge_folders.py [small file count] [large file size in MB] [work dir]
+The work dir should be on the filesystem to test (reflinks need btrfs or XFS).
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lutris.util import system  # noqa: E402
+
+SMALL_FILE_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+LARGE_FILE_SIZE = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+WORK_DIR = sys.argv[3] if len(sys.argv) > 3 else None
+
+
+def create_tree(path):
+    for index in range(SMALL_FILE_COUNT):
+        folder = os.path.join(path, "data%02d" % (index % 50))
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, "file%05d" % index), "wb") as small_file:
+            small_file.write(os.urandom(4096))
+    for index in range(3):
+        with open(os.path.join(path, "large%d.pak" % index), "wb") as large_file:
+            for _chunk in range(LARGE_FILE_SIZE):
+                large_file.write(os.urandom(1024 * 1024))
+
+
+def sequential_copy(source, destination):
+    """The copy done by merge_folders before it used a pool of workers"""
+    for (dirpath, dirnames, filenames) in os.walk(source):
+        dst_abspath = os.path.join(destination, dirpath[len(source):].strip("/"))
+        for dirname in dirnames:
+            os.makedirs(os.path.join(dst_abspath, dirname), exist_ok=True)
+        for filename in filenames:
+            os.makedirs(dst_abspath, exist_ok=True)
+            shutil.copy(os.path.join(dirpath, filename), os.path.join(dst_abspath, filename))
+
+
+def measure(name, func, source, destination):
+    start_time = time.monotonic()
+    func(source, destination)
+    os.sync()
+    print("%s: %0.2fs" % (name, time.monotonic() - start_time))
+
+
+def main():
+    work_dir = tempfile.mkdtemp(dir=WORK_DIR)
+    try:
+        source = os.path.join(work_dir, "source")
+        print("Creating %d small files and 3 files of %dMB" % (SMALL_FILE_COUNT, LARGE_FILE_SIZE))
+        create_tree(source)
+        os.sync()
+        measure("sequential shutil.copy", sequential_copy, source, os.path.join(work_dir, "seq"))
+        measure("merge_folders", system.merge_folders, source, os.path.join(work_dir, "merged"))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Measure reading and writing a single value of a large synthetic Wine
+registry file.
+
+Usage: benchmark_registry.py [key count]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lutris.util.wine.registry import WineRegistry  # noqa: E402
+
+KEY_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+REPEATS = 3
+
+
+def create_registry(path):
+    with open(path, "w") as registry_file:
+        registry_file.write("WINE REGISTRY Version 2\n;; All keys relative to \\\\User\\\\S-1-5-21-0-0-0-1000\n\n")
+        registry_file.write("#arch=win64\n")
+        for index in range(KEY_COUNT):
+            registry_file.write(
+                "\n[Software\\\\Benchmark\\\\Key%d] 1477412318\n"
+                "#time=1d22edb71813e3c\n"
+                "\"Name\"=\"Value %d\"\n"
+                "\"Count\"=dword:%08x\n"
+                "\"Data\"=hex:01,02,03,04,05,06,07,08,09,0a,0b,0c,0d,0e,0f,10,11,12,13,14,15,\\\n"
+                "  16,17,18,19,1a,1b,1c,1d,1e,1f\n" % (index, index, index)
+            )
+        registry_file.write("\n[Software\\\\Benchmark] 1477412318\n#time=1d22edb71813e3c\n")
+
+
+def read_value(path):
+    assert WineRegistry(path).query("Software/Benchmark/Key%d" % (KEY_COUNT // 2), "Name") == "Value %d" % (
+        KEY_COUNT // 2
+    )
+
+
+def write_value(path):
+    registry = WineRegistry(path)
+    registry.set_value("Software/Benchmark/Key%d" % (KEY_COUNT // 2), "Name", "Changed")
+    registry.save()
+
+
+def measure(name, func, path):
+    timings = []
+    for _repeat in range(REPEATS):
+        start_time = time.monotonic()
+        func(path)
+        timings.append(time.monotonic() - start_time)
+    print("%s: %0.3fs" % (name, min(timings)))
+
+
+def main():
+    root = tempfile.mkdtemp()
+    try:
+        path = os.path.join(root, "user.reg")
+        create_registry(path)
+        print("Registry of %d keys, %d KB" % (KEY_COUNT, os.path.getsize(path) / 1024))
+        with open(path) as registry_file:
+            original_content = registry_file.read()
+        assert WineRegistry(path).render() == original_content
+        measure("Read a value", read_value, path)
+        measure("Write a value", write_value, path)
+        with open(path) as registry_file:
+            changed_content = registry_file.read()
+        assert len(changed_content) == len(original_content) + len("Changed") - len("Value %d" % (KEY_COUNT // 2))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
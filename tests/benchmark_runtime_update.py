@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Compare updating a runtime from its full archive with updating it from a
+manifest of its files, with two synthetic runtime versions served locally.
+
+Usage: benchmark_runtime_update.py [file count] [file size in KB] [changed %]
+"""
+import http.server
+import json
+import os
+import random
+import shutil
+import socketserver
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from functools import partial
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lutris.util import http as lutris_http  # noqa: E402
+from lutris.util.delta_update import FolderUpdate, create_manifest  # noqa: E402
+
+FILE_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+FILE_SIZE = (int(sys.argv[2]) if len(sys.argv) > 2 else 64) * 1024
+CHANGED_PERCENT = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+RUNTIME_NAME = "Ubuntu-18.04-x86_64"
+
+
+class CountingHandler(http.server.SimpleHTTPRequestHandler):
+    """Serve the files of `served_folder`, counting the bytes sent"""
+    served_folder = None
+    sent_bytes = 0
+
+    def translate_path(self, path):
+        return os.path.join(self.served_folder, os.path.relpath(super().translate_path(path), os.getcwd()))
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def copyfile(self, source, outputfile):
+        data = source.read()
+        CountingHandler.sent_bytes += len(data)
+        outputfile.write(data)
+
+
+class ThreadingServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+def write_random_file(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as runtime_file:
+        runtime_file.write(os.urandom(FILE_SIZE))
+
+
+def create_versions(root):
+    """Create two versions of a runtime, the second one with changed, added
+    and removed files.
+    """
+    old_path = os.path.join(root, "old", RUNTIME_NAME)
+    for index in range(FILE_COUNT):
+        write_random_file(os.path.join(old_path, "lib%d" % (index % 10), "lib%04d.so" % index))
+    new_path = os.path.join(root, "server", RUNTIME_NAME)
+    shutil.copytree(old_path, new_path)
+    changes = max(1, FILE_COUNT * CHANGED_PERCENT // 100)
+    files = sorted(
+        os.path.join(dirpath, filename)
+        for dirpath, _dirnames, filenames in os.walk(new_path)
+        for filename in filenames
+    )
+    for path in random.sample(files, changes):
+        write_random_file(path)
+    for path in random.sample(files, changes // 2):
+        os.remove(path)
+    for index in range(changes // 2):
+        write_random_file(os.path.join(new_path, "added", "libadded%d.so" % index))
+    with tarfile.open(os.path.join(root, "server", RUNTIME_NAME + ".tar.gz"), "w:gz") as archive:
+        archive.add(new_path, RUNTIME_NAME)
+    with open(os.path.join(root, "server", RUNTIME_NAME + ".json"), "w") as manifest_file:
+        json.dump(create_manifest(new_path), manifest_file)
+    return old_path, new_path
+
+
+def update_from_archive(url, runtime_path):
+    """The update done before manifests: replace the folder with the archive"""
+    archive_path = os.path.join(os.path.dirname(runtime_path), os.path.basename(url))
+    lutris_http.Request(url).get().write_to_file(archive_path)
+    shutil.rmtree(runtime_path)
+    with tarfile.open(archive_path) as archive:
+        archive.extractall(os.path.dirname(runtime_path))
+    os.remove(archive_path)
+
+
+def update_from_manifest(url, runtime_path):
+    manifest = lutris_http.Request(url + ".json").get().json
+    FolderUpdate(runtime_path, manifest, url + "/").run()
+
+
+def measure(name, func, old_path, work_path):
+    shutil.copytree(old_path, work_path)
+    CountingHandler.sent_bytes = 0
+    start_time = time.monotonic()
+    func(work_path)
+    print("%s: %0.3fs, %d KB downloaded" % (name, time.monotonic() - start_time, CountingHandler.sent_bytes / 1024))
+    return work_path
+
+
+def main():
+    root = tempfile.mkdtemp()
+    CountingHandler.served_folder = os.path.join(root, "server")
+    server = ThreadingServer(("127.0.0.1", 0), CountingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        print(
+            "Updating a runtime of %d files of %d KB, %d%% of them changed"
+            % (FILE_COUNT, FILE_SIZE / 1024, CHANGED_PERCENT)
+        )
+        old_path, new_path = create_versions(root)
+        url = "http://127.0.0.1:%d/%s" % (server.server_address[1], RUNTIME_NAME)
+        full_path = measure(
+            "Full archive", partial(update_from_archive, url + ".tar.gz"),
+            old_path, os.path.join(root, "full", RUNTIME_NAME)
+        )
+        delta_path = measure(
+            "Manifest", partial(update_from_manifest, url),
+            old_path, os.path.join(root, "delta", RUNTIME_NAME)
+        )
+        assert create_manifest(full_path) == create_manifest(new_path)
+        assert create_manifest(delta_path) == create_manifest(new_path)
+    finally:
+        server.shutdown()
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
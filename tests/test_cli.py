@@ -0,0 +1,20 @@
+from unittest import TestCase
+
+from lutris.cli import parse_headless_args
+
+
+class TestHeadlessArgs(TestCase):
+    def test_read_only_queries_are_headless(self):
+        self.assertEqual(parse_headless_args(["lutris", "--list-games"]), ("list-games", set()))
+        self.assertEqual(
+            parse_headless_args(["lutris", "-loj", "--trace", "trace.json"]),
+            ("list-games", {"installed", "json"})
+        )
+        self.assertEqual(parse_headless_args(["lutris", "-l", "-v"]), ("version", set()))
+
+    def test_other_commands_need_the_application(self):
+        self.assertIsNone(parse_headless_args(["lutris"]))
+        self.assertIsNone(parse_headless_args(["lutris", "-d"]))
+        self.assertIsNone(parse_headless_args(["lutris", "-l", "lutris:rungame/quake"]))
+        self.assertIsNone(parse_headless_args(["lutris", "--list-games", "--disk-usage"]))
+        self.assertIsNone(parse_headless_args(["lutris", "-ls"]))
@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from lutris import game as game_module
+from lutris.runners.runner import Runner
+from lutris.util import manifest as manifest_module
+from lutris.util.manifest import InstallManifest
+
+
+class SteamLikeRunner(Runner):
+    """Runner removing its games by itself"""
+    removed = False
+
+    def remove_game_data(self, appid=None, **kwargs):  # pylint: disable=arguments-differ
+        self.removed = True
+
+
+class TestRemoveGameData(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.game_dir = os.path.join(self.tmp_dir, "quake")
+        os.makedirs(os.path.join(self.game_dir, "id1"))
+        for name in ("quake.exe", "id1/pak0.pak"):
+            with open(os.path.join(self.game_dir, name), "w") as game_file:
+                game_file.write(name)
+        self.manifest_path = os.path.join(self.tmp_dir, "1.manifest")
+        manifest = InstallManifest(self.game_dir)
+        manifest.add_tree(self.game_dir)
+        manifest.save(self.manifest_path)
+
+        patcher = patch.object(manifest_module, "get_manifest_path", return_value=self.manifest_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_game_folder_is_removed_with_files_not_in_the_manifest(self):
+        with open(os.path.join(self.game_dir, "id1", "save0.sav"), "w") as save_file:
+            save_file.write("save")
+        game_module.remove_game_data(1, Runner(), self.game_dir)
+        self.assertFalse(os.path.exists(self.game_dir))
+
+    def test_game_folder_is_removed_from_the_manifest(self):
+        with patch.object(game_module.system, "remove_folder") as remove_folder:
+            game_module.remove_game_data(1, Runner(), self.game_dir)
+        remove_folder.assert_not_called()
+        self.assertFalse(os.path.exists(self.game_dir))
+
+    def test_runners_removing_their_games_are_used(self):
+        runner = SteamLikeRunner()
+        game_module.remove_game_data(1, runner, self.game_dir)
+        self.assertTrue(runner.removed)
+        self.assertTrue(os.path.exists(os.path.join(self.game_dir, "quake.exe")))
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from lutris.util.mountinfo import MountTable, parse_mountinfo
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+class TestParseMountinfo(TestCase):
+    def setUp(self):
+        with open(os.path.join(FIXTURES_PATH, 'mountinfo.txt')) as fixture:
+            self.mounts = parse_mountinfo(fixture.read())
+
+    def test_can_parse_mounts(self):
+        self.assertEqual(len(self.mounts), 8)
+        root = self.mounts[0]
+        self.assertEqual(root.mount_point, "/")
+        self.assertEqual(root.source, "/dev/sda2")
+        self.assertEqual(root.fstype, "ext4")
+        self.assertEqual(root.device, "8:2")
+
+    def test_can_parse_escaped_paths(self):
+        self.assertEqual(self.mounts[4].mount_point, "/home/user/Windows Games")
+
+    def test_can_parse_optional_fields(self):
+        self.assertEqual(self.mounts[7].fstype, "btrfs")
+        self.assertEqual(self.mounts[7].source, "/dev/sdc1")
+
+    def test_invalid_lines_are_skipped(self):
+        self.assertEqual(parse_mountinfo("22 1 8:2 / /\n\n"), [])
+
+
+class TestMountTable(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.mountinfo_path = os.path.join(self.tmp_dir, "mountinfo")
+        shutil.copy(os.path.join(FIXTURES_PATH, 'mountinfo.txt'), self.mountinfo_path)
+        udev_data_path = os.path.join(self.tmp_dir, "udev")
+        os.mkdir(udev_data_path)
+        with open(os.path.join(udev_data_path, "b8:17"), "w") as udev_file:
+            udev_file.write("S:disk/by-label/Games\nE:ID_FS_TYPE=ntfs\nE:ID_FS_USAGE=filesystem\n")
+        self.mount_table = MountTable(self.mountinfo_path, udev_data_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_can_find_mount_of_path(self):
+        self.assertEqual(self.mount_table.get_mount("/home/user/Windows Games/game.exe").source, "/dev/sdb1")
+        self.assertEqual(self.mount_table.get_mount("/home/user/Games").source, "/dev/sda3")
+        self.assertEqual(self.mount_table.get_mount("/usr/bin").source, "/dev/sda2")
+
+    def test_last_mount_hides_previous_ones(self):
+        self.assertEqual(self.mount_table.get_mount("/mnt/games").fstype, "btrfs")
+
+    def test_fuse_mounts_use_udev_fstype(self):
+        mount = self.mount_table.get_mount("/home/user/Windows Games")
+        self.assertEqual(mount.fstype, "fuseblk")
+        self.assertEqual(self.mount_table.get_fstype(mount), "ntfs")
+        self.assertEqual(self.mount_table.get_fstype(self.mount_table.get_mount("/home")), "ext4")
+
+    def test_mounts_are_read_again_when_they_change(self):
+        self.assertEqual(self.mount_table.get_mount("/media/usb").source, "/dev/sda2")
+        with open(self.mountinfo_path, "a") as mountinfo_file:
+            mountinfo_file.write("70 22 8:49 / /media/usb rw,relatime shared:50 - vfat /dev/sdd1 rw\n")
+        self.assertEqual(self.mount_table.get_mount("/media/usb").source, "/dev/sdd1")
+
+    def test_missing_mountinfo(self):
+        mount_table = MountTable(os.path.join(self.tmp_dir, "missing"))
+        self.assertIsNone(mount_table.get_mount("/home"))
+        self.assertEqual(mount_table.mounts, [])
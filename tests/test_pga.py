@@ -1,8 +1,11 @@
 import unittest
 import os
+import shutil
+import tempfile
 from sqlite3 import OperationalError
+from unittest.mock import patch
 from lutris import pga
-from lutris.util import sql
+from lutris.util import disk_usage, sql
 
 TEST_PGA_PATH = os.path.join(os.path.dirname(__file__), 'pga.db')
 
@@ -85,6 +88,73 @@ class TestDbCreator(DatabaseTester):
         self.assertEqual(results[0]['name'], "testok")
 
 
+class TestMediaMisses(DatabaseTester):
+    def test_add_media_misses(self):
+        pga.add_media_misses(["banner/quake", "icon/quake"], 1000)
+        pga.add_media_misses(["icon/quake"], 2000)
+        self.assertEqual(
+            pga.get_media_misses(),
+            {"banner/quake": 1000, "icon/quake": 2000}
+        )
+
+    def test_delete_media_misses(self):
+        pga.add_media_misses(["banner/quake", "icon/quake", "icon/doom"], 1000)
+        pga.delete_media_misses(["icon/quake"])
+        self.assertEqual(pga.get_media_misses(), {"banner/quake": 1000, "icon/doom": 1000})
+        pga.delete_media_misses()
+        self.assertEqual(pga.get_media_misses(), {})
+
+
+class TestDiskUsage(DatabaseTester):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.game_dir = os.path.join(self.tmp_dir, "game")
+        for path in ("game.exe", "data/level1", "data/music/track1", "saves/save1"):
+            self.write_file(path)
+        self.write_file("../game2/game.exe")
+        self.index = disk_usage.DiskUsageIndex()
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.tmp_dir)
+
+    def write_file(self, path, size=10000):
+        path = os.path.join(self.game_dir, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as game_file:
+            game_file.write(b"x" * size)
+
+    def get_size(self):
+        with patch.object(disk_usage, "get_folder_usage", wraps=disk_usage.get_folder_usage) as folder_usage:
+            size = self.index.get_size(self.game_dir)
+        return size, sorted(os.path.relpath(call[0][0], self.game_dir) for call in folder_usage.call_args_list)
+
+    def test_get_size(self):
+        size, listed_folders = self.get_size()
+        self.assertEqual(listed_folders, [".", "data", "data/music", "saves"])
+        self.assertGreaterEqual(size, 40000)
+        self.assertEqual(len(pga.get_disk_usage(self.game_dir)), 4)
+        self.assertEqual(self.get_size(), (size, []))
+
+    def test_only_lists_changed_folders(self):
+        size, _listed_folders = self.get_size()
+        self.write_file("data/music/track2")
+        new_size, listed_folders = self.get_size()
+        self.assertEqual(listed_folders, ["data/music"])
+        self.assertGreaterEqual(new_size, size + 10000)
+        self.assertEqual(new_size, self.index.get_size(self.game_dir, full=True))
+
+    def test_forgets_removed_folders(self):
+        self.get_size()
+        shutil.rmtree(os.path.join(self.game_dir, "data"))
+        self.assertEqual(self.get_size()[1], ["."])
+        self.assertEqual(
+            sorted(pga.get_disk_usage(self.game_dir)),
+            [self.game_dir, os.path.join(self.game_dir, "saves")]
+        )
+
+
 class TestMigration(DatabaseTester):
     def setUp(self):
         super(TestMigration, self).setUp()
@@ -1,5 +1,9 @@
 import os
+import shutil
+import tempfile
 from unittest import TestCase
+from unittest.mock import patch
+from lutris.util.wine.prefix import WinePrefixManager
 from lutris.util.wine.registry import WineRegistry, WineRegistryKey
 
 FIXTURES_PATH = os.path.join(os.path.dirname(__file__), 'fixtures')
@@ -86,6 +90,70 @@ class TestWineRegistry(TestCase):
         self.assertEqual(len(key.subkeys), 0)
 
 
+class TestWineRegistryKeys(TestCase):
+    content = (
+        'WINE REGISTRY Version 2\n'
+        ';; All keys relative to \\\\User\\\\S-1-5-21-0-0-0-1000\n\n'
+        '#arch=win64\n'
+        '\n[Control Panel\\\\Desktop] 1477412318\n'
+        '#time=1d22edb71813e3c\n'
+        '"DragWidth"="4"\n'
+        '\n[Control Panel\\\\Mouse] 1477412318\n'
+        '"DoubleClickSpeed"="500"\n'
+        '\n[Software\\\\Wine\\\\Direct3D] 1477412318\n'
+        '"Data"=hex:01,02,\\\n'
+        '  03,04\n'
+    )
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.registry_path = os.path.join(self.tmp_dir, 'user.reg')
+        with open(self.registry_path, 'w') as registry_file:
+            registry_file.write(self.content)
+        self.registry = WineRegistry(self.registry_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_keys_are_parsed_when_accessed(self):
+        self.assertEqual(list(self.registry.keys), [
+            'Control Panel/Desktop', 'Control Panel/Mouse', 'Software/Wine/Direct3D'
+        ])
+        with patch.object(WineRegistryKey, 'parse_lines') as parse_lines:
+            self.registry.query('Control Panel/Mouse', 'DoubleClickSpeed')
+            self.registry.render()
+        self.assertEqual(parse_lines.call_count, 1)
+
+    def test_last_value_split_on_several_lines(self):
+        self.assertEqual(
+            self.registry.keys['Software/Wine/Direct3D'].subkeys['Data'],
+            'hex:01,02,\\\n  03,04'
+        )
+        self.assertEqual(self.registry.render(), self.content)
+
+    def test_only_changed_keys_are_rendered_again(self):
+        self.registry.set_value('Control Panel/Mouse', 'DoubleClickSpeed', '300')
+        self.registry.set_value('Wine/DX11', 'FullyWorking', 'Yes')
+        del self.registry.keys['Control Panel/Desktop']
+        content = self.registry.render()
+        self.assertNotIn('Desktop', content)
+        self.assertIn('\n[Control Panel\\\\Mouse] 1477412318\n"DoubleClickSpeed"="300"\n\n[Software', content)
+        self.assertTrue(content.endswith('  03,04\n\n[Wine\\\\DX11] %s\n#time=%s\n"FullyWorking"="Yes"\n' % (
+            self.registry.keys['Wine/DX11'].raw_timestamp,
+            self.registry.keys['Wine/DX11'].get_meta('time'),
+        )))
+        self.registry.save()
+        self.assertEqual(WineRegistry(self.registry_path).query('Control Panel/Mouse', 'DoubleClickSpeed'), '300')
+
+    def test_keys_defined_twice_keep_their_last_content(self):
+        with open(self.registry_path, 'a') as registry_file:
+            registry_file.write('\n[Control Panel\\\\Desktop] 1477412319\n"DragWidth"="8"\n')
+        registry = WineRegistry(self.registry_path)
+        self.assertEqual(len(registry.keys), 3)
+        self.assertEqual(registry.query('Control Panel/Desktop', 'DragWidth'), '8')
+        self.assertEqual(registry.render().count('Desktop'), 1)
+
+
 class TestWineRegistryKey(TestCase):
     def test_creation_by_key_def_parses(self):
         key = WineRegistryKey(key_def='[Control Panel\\\\Desktop] 1477412318')
@@ -113,3 +181,46 @@ class TestWineRegistryKey(TestCase):
 
         key.parse('"\"C:\\Program Files\\Windows Media Player\\wmplayer.exe\""="Yes"')
         self.assertEqual(key.subkeys['\"C:\\Program Files\\Windows Media Player\\wmplayer.exe\"'], '"Yes"')
+
+
+class TestWinePrefixManager(TestCase):
+    def setUp(self):
+        self.prefix_path = tempfile.mkdtemp()
+        self.registry_path = os.path.join(self.prefix_path, 'user.reg')
+        shutil.copy(os.path.join(FIXTURES_PATH, 'user.reg'), self.registry_path)
+        self.prefix_manager = WinePrefixManager(self.prefix_path)
+        self.key = 'HKEY_CURRENT_USER/Software/Wine/DllOverrides'
+
+    def tearDown(self):
+        shutil.rmtree(self.prefix_path)
+
+    def test_transaction_reads_and_saves_once(self):
+        with patch.object(WineRegistry, 'parse_reg_file', autospec=True,
+                          side_effect=WineRegistry.parse_reg_file) as parse_reg_file:
+            with patch.object(WineRegistry, 'save', autospec=True, side_effect=WineRegistry.save) as save:
+                with self.prefix_manager.registry_transaction():
+                    for dll in ('d3d9', 'd3d10', 'd3d11'):
+                        self.prefix_manager.override_dll(dll, 'native')
+                    self.assertEqual(self.prefix_manager.get_registry_key(self.key, 'd3d11'), 'native')
+                    self.assertEqual(save.call_count, 0)
+        self.assertEqual(parse_reg_file.call_count, 1)
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(WineRegistry(self.registry_path).query('Software/Wine/DllOverrides', 'd3d10'), 'native')
+
+    def test_unchanged_registry_is_not_saved(self):
+        with patch.object(WineRegistry, 'save') as save:
+            self.prefix_manager.set_registry_key(
+                'HKEY_CURRENT_USER/Control Panel/Desktop', 'DragWidth', '4'
+            )
+            with self.prefix_manager.registry_transaction():
+                key = 'HKEY_CURRENT_USER/Software/Wine/Fonts'
+                self.prefix_manager.set_registry_key(key, 'Codepages', '437')
+                self.prefix_manager.set_registry_key(key, 'Codepages', '1252,437')
+        save.assert_not_called()
+
+    def test_failed_transaction_is_not_saved(self):
+        with self.assertRaises(RuntimeError):
+            with self.prefix_manager.registry_transaction():
+                self.prefix_manager.override_dll('d3d11', 'native')
+                raise RuntimeError
+        self.assertIsNone(self.prefix_manager.get_registry_key(self.key, 'd3d11'))
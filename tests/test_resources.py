@@ -1,6 +1,12 @@
+import os
+import shutil
+import tempfile
 from unittest import TestCase
+from unittest.mock import patch
 
 from lutris.api import parse_installer_url
+from lutris.util import media_pipeline, resources
+from lutris.util.media_pipeline import MediaPipeline
 
 
 class TestInstallerUrls(TestCase):
@@ -21,3 +27,142 @@ class TestInstallerUrls(TestCase):
         self.assertEqual(result['game_slug'], 'quake')
         self.assertEqual(result['revision'], None)
         self.assertEqual(result['action'], 'rungame')
+
+
+class FakeTimer:
+    """Stand-in for threading.Timer recording the timers started"""
+    timers = []
+
+    def __init__(self, interval, function):
+        self.interval = interval
+        self.function = function
+        self.daemon = False
+        self.started = False
+        self.cancelled = False
+        self.timers.append(self)
+
+    def start(self):
+        self.started = True
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TestMediaPipeline(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.pipeline = MediaPipeline(max_workers=2, batch_size=2)
+        self.requested_urls = []
+        FakeTimer.timers = []
+        patches = [
+            patch.object(resources, "get_media_pack", return_value=None),
+            patch.object(self.pipeline, "get_content", side_effect=self.get_content),
+            patch.object(media_pipeline.threading, "Timer", FakeTimer),
+        ]
+        for _patch in patches:
+            _patch.start()
+            self.addCleanup(_patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def get_content(self, url):
+        self.requested_urls.append(url)
+        if "broken" in url:
+            raise ValueError("Invalid image")
+        return b"image"
+
+    def get_downloads(self, slugs, media_type="banner"):
+        return [
+            (slug, media_type, "https://lutris.net/%s.jpg" % slug, os.path.join(self.tmp_dir, slug + ".jpg"))
+            for slug in slugs
+        ]
+
+    def test_downloads_are_reported_in_batches(self):
+        batches = []
+        slugs = ["quake", "doom", "hexen", "heretic", "strife"]
+        self.pipeline.fetch(self.get_downloads(slugs), callback=batches.append)
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual(sorted(slug for batch in batches for slug, _media_type in batch), sorted(slugs))
+        for slug in slugs:
+            with open(os.path.join(self.tmp_dir, slug + ".jpg"), "rb") as media_file:
+                self.assertEqual(media_file.read(), b"image")
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), sorted(slug + ".jpg" for slug in slugs))
+
+    def test_existing_files_are_kept_unless_overwritten(self):
+        with open(os.path.join(self.tmp_dir, "quake.jpg"), "wb") as media_file:
+            media_file.write(b"old image")
+        self.pipeline.fetch(self.get_downloads(["quake"]))
+        self.assertEqual(self.requested_urls, [])
+        self.pipeline.fetch(self.get_downloads(["quake"]), overwrite=True)
+        self.assertEqual(self.requested_urls, ["https://lutris.net/quake.jpg"])
+        with open(os.path.join(self.tmp_dir, "quake.jpg"), "rb") as media_file:
+            self.assertEqual(media_file.read(), b"image")
+
+    def test_failed_downloads_do_not_stop_the_others(self):
+        batches = []
+        with patch.object(media_pipeline.logger, "exception") as log_exception:
+            self.pipeline.fetch(self.get_downloads(["quake", "broken", "doom"]), callback=batches.append)
+        self.assertEqual(log_exception.call_count, 1)
+        self.assertEqual(sorted(slug for batch in batches for slug, _media_type in batch), ["doom", "quake"])
+
+    def test_icon_cache_update_is_debounced(self):
+        self.pipeline.fetch(self.get_downloads(["quake", "doom"], media_type="icon"))
+        self.pipeline.fetch(self.get_downloads(["hexen"], media_type="icon"))
+        self.assertEqual(len(FakeTimer.timers), 2)
+        self.assertTrue(FakeTimer.timers[0].cancelled)
+        self.assertTrue(FakeTimer.timers[1].started)
+        self.assertFalse(FakeTimer.timers[1].cancelled)
+        self.assertEqual(FakeTimer.timers[1].function, resources.update_desktop_icons)
+
+    def test_banners_do_not_update_the_icon_cache(self):
+        self.pipeline.fetch(self.get_downloads(["quake"]))
+        self.assertEqual(FakeTimer.timers, [])
+
+
+class TestMediaPackImport(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.pack_path = os.path.join(self.tmp_dir, "media.pack")
+        self.media_paths = {}
+        for media_type, name in (("banner", "quake.jpg"), ("icon", "lutris_quake.png"), ("coverart", "doom.jpg")):
+            folder = os.path.join(self.tmp_dir, media_type)
+            os.makedirs(folder)
+            self.media_paths[media_type] = os.path.join(folder, name)
+            with open(self.media_paths[media_type], "w") as media_file:
+                media_file.write(media_type)
+        patches = [
+            patch.object(resources.settings, "read_setting", return_value="True"),
+            patch.object(resources.settings, "MEDIA_PACK_PATH", self.pack_path),
+            patch.object(resources.settings, "BANNER_PATH", os.path.dirname(self.media_paths["banner"])),
+            patch.object(resources.settings, "ICON_PATH", os.path.dirname(self.media_paths["icon"])),
+            patch.object(resources.settings, "COVERART_PATH", os.path.dirname(self.media_paths["coverart"])),
+            patch.object(resources, "MEDIA_PACK", None),
+            patch.object(resources, "MEDIA_IMPORT", None),
+        ]
+        for _patch in patches:
+            _patch.start()
+            self.addCleanup(_patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_loose_media_are_imported_in_the_background(self):
+        self.assertIsNone(resources.get_media_pack())
+        self.assertTrue(resources.has_media("quake", "banner"))
+        resources.MEDIA_IMPORT.join()
+        pack = resources.get_media_pack()
+        self.assertEqual(sorted(pack.keys()), ["banner/quake", "coverart/doom", "icon/quake"])
+        self.assertEqual(resources.get_media_data("doom", "coverart"), b"coverart")
+        self.assertFalse(os.path.exists(self.media_paths["banner"]))
+        self.assertFalse(os.path.exists(self.media_paths["coverart"]))
+        self.assertTrue(os.path.exists(self.media_paths["icon"]))
+
+    def test_interrupted_import_is_resumed(self):
+        resources.MediaPack(self.pack_path).add("banner/quake", b"banner")
+        self.assertIsNone(resources.get_media_pack())
+        resources.MEDIA_IMPORT.join()
+        self.assertEqual(len(resources.get_media_pack()), 3)
+        resources.MEDIA_PACK = resources.MEDIA_IMPORT = None
+        self.assertIsNotNone(resources.get_media_pack())
+        self.assertIsNone(resources.MEDIA_IMPORT)
@@ -0,0 +1,49 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from lutris import runtime
+
+
+class TestRuntimeEnv(TestCase):
+    def setUp(self):
+        runtime.clear_env_cache()
+        self.build_calls = 0
+        build_paths = runtime.build_paths
+
+        def counting_build_paths(*args):
+            self.build_calls += 1
+            return build_paths(*args)
+
+        patches = [
+            patch.object(runtime, "build_paths", counting_build_paths),
+            patch.object(runtime.LINUX_SYSTEM, "iter_lib_folders", return_value=iter(["/usr/lib"])),
+        ]
+        for _patch in patches:
+            _patch.start()
+            self.addCleanup(_patch.stop)
+
+    def test_env_is_built_once(self):
+        env = runtime.get_env(version="Ubuntu-18.04", prefer_system_libs=True)
+        env["LD_LIBRARY_PATH"] = "changed by the caller"
+        env = runtime.get_env(version="Ubuntu-18.04", prefer_system_libs=True)
+        self.assertNotEqual(env["LD_LIBRARY_PATH"], "changed by the caller")
+        self.assertEqual(self.build_calls, 1)
+
+    def test_settings_have_their_own_env(self):
+        with_system_libs = runtime.get_paths(prefer_system_libs=True)
+        without_system_libs = runtime.get_paths(prefer_system_libs=False)
+        self.assertIn("/usr/lib", with_system_libs)
+        self.assertNotIn("/usr/lib", without_system_libs)
+        self.assertEqual(self.build_calls, 2)
+
+    def test_env_is_built_again_when_runtimes_change(self):
+        runtime.get_paths()
+        runtime.clear_env_cache()
+        runtime.get_paths()
+        self.assertEqual(self.build_calls, 2)
+
+    def test_env_is_built_again_when_system_libraries_change(self):
+        runtime.get_paths()
+        with patch.object(runtime.LINUX_SYSTEM.library_index, "generation", 1000):
+            runtime.get_paths()
+        self.assertEqual(self.build_calls, 2)
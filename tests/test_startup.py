@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from lutris import startup
+
+
+class TestStartupChecks(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.calls = []
+        self.barrier = threading.Barrier(2, timeout=5)
+        cache_path = os.path.join(self.tmp_dir, "startup-checks.json")
+        self.cache_key = {"ld_cache": 1}
+
+        def check_libs():
+            self.calls.append("check_libs")
+            self.barrier.wait()
+            return True
+
+        def check_vulkan():
+            self.calls.append("check_vulkan")
+            self.barrier.wait()
+            startup.defer_dialog("dismiss-test-warning", "Missing Vulkan")
+            return False
+
+        patches = [
+            patch.object(startup, "CHECK_CACHE_PATH", cache_path),
+            patch.object(startup, "STARTUP_CHECKS", [check_libs, check_vulkan]),
+            patch.object(startup, "get_checks_cache_key", lambda: self.cache_key),
+            patch.object(startup.settings, "read_setting", return_value=""),
+        ]
+        for _patch in patches:
+            _patch.start()
+            self.addCleanup(_patch.stop)
+        startup.pop_deferred_dialogs()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_checks_run_concurrently(self):
+        self.assertEqual(startup.run_all_checks(), ["check_libs"])
+        self.assertEqual(sorted(self.calls), ["check_libs", "check_vulkan"])
+        dialogs = startup.pop_deferred_dialogs()
+        self.assertEqual([dialog["setting"] for dialog in dialogs], ["dismiss-test-warning"])
+        self.assertEqual(startup.pop_deferred_dialogs(), [])
+
+    def test_passed_checks_are_skipped_until_the_system_changes(self):
+        startup.run_all_checks()
+        self.calls = []
+        self.barrier = threading.Barrier(1)
+        self.assertEqual(startup.run_all_checks(), ["check_libs"])
+        self.assertEqual(self.calls, ["check_vulkan"])
+
+        self.cache_key = {"ld_cache": 2}
+        self.calls = []
+        startup.run_all_checks()
+        self.assertEqual(sorted(self.calls), ["check_libs", "check_vulkan"])
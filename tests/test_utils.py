@@ -1,10 +1,43 @@
+import bz2
+import gzip
+import io
+import json
+import lzma
 import os
+import shutil
+import struct
+import tarfile
+import tempfile
+import threading
+import time
+import urllib.parse
 from collections import OrderedDict
 from unittest import TestCase
+from unittest.mock import patch
 from lutris.util import system
+from lutris.util.dedup import FileDeduplicator
+from lutris.util import generations as generations_module
+from lutris.util.generations import FolderGenerations
+from lutris.util.graphics.inventory import GraphicsInventory
+from lutris.util import ldcache
+from lutris.util.ldcache import SharedLibraryIndex, parse_ld_so_cache, parse_ldconfig_output
+from lutris.util.linux import LinuxSystem, SYSTEM_COMPONENTS
+from lutris.util.media_pack import MediaPack
+from lutris.util import extract
+from lutris.util import downloader as downloader_module
+from lutris.util.downloader import Downloader
+from lutris.util.extract import ArchiveStream, ExtractFailure
+from lutris.util.filecopy import FolderCopy, CopyCancelled
+from lutris.util import filecopy
+from lutris.util import delta_update
+from lutris.util.delta_update import DeltaUpdateError, FolderUpdate, create_manifest
+from lutris.util import manifest as manifest_module
+from lutris.util.manifest import InstallManifest
+from lutris.util.path_index import CaseInsensitiveIndex
 from lutris.util.steam import vdf
 from lutris.util import strings
 from lutris.util import fileio
+from lutris.util.tracing import Tracer, get_trace_path
 
 
 class TestFileUtils(TestCase):
@@ -87,6 +120,12 @@ class TestStringUtils(TestCase):
         self.assertEqual(strings.get_formatted_playtime(1.5), "1 hour and 30 minutes")
         self.assertEqual(strings.get_formatted_playtime(45.90), "45 hours and 53 minutes")
 
+    def test_get_formatted_size(self):
+        self.assertEqual(strings.get_formatted_size(512), "512 bytes")
+        self.assertEqual(strings.get_formatted_size(1536), "1.5 KB")
+        self.assertEqual(strings.get_formatted_size(3 * 1024 ** 3), "3.0 GB")
+        self.assertEqual(strings.get_formatted_size(2 * 1024 ** 4), "2.0 TB")
+
 class TestVersionSort(TestCase):
     def test_parse_version(self):
         self.assertEqual(strings.parse_version("3.6-staging"), ([3, 6], '', '-staging'))
@@ -166,3 +205,982 @@ class TestSubstitute(TestCase):
     def test_can_sub_game_files_with_dashes_in_key(self):
         replacements = {'steam-data': '/tmp'}
         self.assertEqual(system.substitute('--path=$steam-data', replacements), '--path=/tmp')
+
+
+class TestMediaPack(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.pack_path = os.path.join(self.tmp_dir, "media.pack")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_entries_are_persisted(self):
+        pack = MediaPack(self.pack_path)
+        pack.add("banner/quake", b"quake banner")
+        pack.add("icon/quake", b"quake icon")
+        pack.close()
+        pack = MediaPack(self.pack_path)
+        self.assertIn("banner/quake", pack)
+        self.assertEqual(pack.get("icon/quake"), b"quake icon")
+        self.assertIsNone(pack.get("icon/doom"))
+
+    def test_removed_and_replaced_entries(self):
+        pack = MediaPack(self.pack_path)
+        pack.add("icon/quake", b"old icon")
+        pack.add("icon/quake", b"new icon")
+        pack.add("icon/doom", b"doom icon")
+        pack.remove("icon/doom")
+        pack = MediaPack(self.pack_path)
+        self.assertEqual(pack.get("icon/quake"), b"new icon")
+        self.assertNotIn("icon/doom", pack)
+        self.assertEqual(pack.wasted_size, len(b"old icon") + len(b"doom icon"))
+
+    def test_truncated_entries_are_ignored(self):
+        pack = MediaPack(self.pack_path)
+        pack.add("icon/quake", b"quake icon")
+        with open(pack.index_path, "a") as index_file:
+            index_file.write("icon/doom\t10\t100\nicon/hexen\t11")
+        pack = MediaPack(self.pack_path)
+        self.assertEqual(pack.keys(), ["icon/quake"])
+
+    def test_compaction(self):
+        pack = MediaPack(self.pack_path)
+        pack.add("icon/quake", b"old icon")
+        pack.add("icon/quake", b"new icon")
+        pack.add("icon/doom", b"doom icon")
+        with open(os.path.join(self.pack_path, "imported"), "w"):
+            pass
+        self.assertEqual(pack.compact(), len(b"old icon"))
+        self.assertTrue(os.path.exists(os.path.join(self.pack_path, "imported")))
+        self.assertEqual(pack.get("icon/quake"), b"new icon")
+        pack = MediaPack(self.pack_path)
+        self.assertEqual(pack.get("icon/doom"), b"doom icon")
+        self.assertEqual(pack.wasted_size, 0)
+
+    def test_files_are_added_in_a_batch(self):
+        paths = []
+        for name in ("quake", "doom"):
+            paths.append(os.path.join(self.tmp_dir, name + ".png"))
+            with open(paths[-1], "wb") as icon_file:
+                icon_file.write(name.encode())
+        pack = MediaPack(self.pack_path)
+        with patch("lutris.util.media_pack.os.fsync") as fsync:
+            keys = pack.add_files([
+                ("icon/quake", paths[0]),
+                ("icon/doom", paths[1]),
+                ("icon/hexen", os.path.join(self.tmp_dir, "hexen.png")),
+            ])
+        self.assertEqual(fsync.call_count, 1)
+        self.assertEqual(keys, ["icon/quake", "icon/doom"])
+        pack = MediaPack(self.pack_path)
+        self.assertEqual(pack.get("icon/doom"), b"doom")
+        self.assertNotIn("icon/hexen", pack)
+
+    def test_export(self):
+        pack = MediaPack(self.pack_path)
+        pack.add("icon/quake", b"quake icon")
+        dest_path = os.path.join(self.tmp_dir, "lutris_quake.png")
+        self.assertEqual(pack.export("icon/quake", dest_path), dest_path)
+        with open(dest_path, "rb") as icon_file:
+            self.assertEqual(icon_file.read(), b"quake icon")
+        self.assertIsNone(pack.export("icon/doom", dest_path + ".doom"))
+
+
+class TestArchiveStream(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def get_archive(self, files, mode="w:xz"):
+        archive_file = io.BytesIO()
+        with tarfile.open(fileobj=archive_file, mode=mode) as archive:
+            for name, content in files.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                archive.addfile(info, io.BytesIO(content))
+        return archive_file.getvalue()
+
+    def feed(self, stream, data, chunk_size=7):
+        stream.start()
+        for index in range(0, len(data), chunk_size):
+            stream.write(data[index:index + chunk_size])
+        stream.close()
+
+    def test_extracts_archive(self):
+        data = self.get_archive({"runtime/lib/libfoo.so": b"foo", "runtime/bar": b"bar"})
+        stream = ArchiveStream("runtime.tar.xz", self.tmp_dir, merge_single=False)
+        self.feed(stream, data)
+        with open(os.path.join(self.tmp_dir, "runtime/lib/libfoo.so"), "rb") as lib_file:
+            self.assertEqual(lib_file.read(), b"foo")
+        self.assertEqual(os.listdir(self.tmp_dir), ["runtime"])
+
+    def test_replaces_existing_folder(self):
+        os.makedirs(os.path.join(self.tmp_dir, "runtime"))
+        with open(os.path.join(self.tmp_dir, "runtime/old"), "w") as old_file:
+            old_file.write("old")
+        data = self.get_archive({"runtime/new": b"new"}, mode="w:gz")
+        stream = ArchiveStream("runtime.tar.gz", self.tmp_dir, merge_single=False, replace=True)
+        self.feed(stream, data)
+        self.assertEqual(os.listdir(os.path.join(self.tmp_dir, "runtime")), ["new"])
+        self.assertEqual(os.listdir(self.tmp_dir), ["runtime"])
+
+    def test_corrupt_archive_raises(self):
+        data = self.get_archive({"runtime/new": b"new"}, mode="w:gz")
+        stream = ArchiveStream("runtime.tar.gz", self.tmp_dir)
+        with self.assertRaises(ExtractFailure):
+            self.feed(stream, data[:len(data) // 2])
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_extraction_errors_are_raised_with_their_message(self):
+        data = self.get_archive({"runtime/new": b"new"}, mode="w:gz")
+        stream = ArchiveStream("runtime.tar.gz", self.tmp_dir)
+        with patch.object(tarfile.TarFile, "extractall", side_effect=ValueError("Invalid member")):
+            with self.assertRaisesRegex(ExtractFailure, "Invalid member"):
+                self.feed(stream, data)
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+
+class TestExtractArchive(TestCase):
+    """Check the strategy used for each destination and the bytes it writes"""
+    files = {"game/data.pak": b"d" * 4096, "game/bin/game": b"g" * 1024}
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.archive_path = os.path.join(self.tmp_dir, "game.tar")
+        with tarfile.open(self.archive_path, "w") as archive:
+            for name, content in self.files.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                archive.addfile(info, io.BytesIO(content))
+        self.destination = os.path.join(self.tmp_dir, "games", "game")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def extract(self, fail_renames=False):
+        """Extract the archive and return the folder it was extracted to and
+        the number of bytes written"""
+        real_copy_file = filecopy.copy_file
+        written = {"bytes": 0}
+        extract_dirs = []
+
+        def counting_copy_file(src, dst, *args, **kwargs):
+            written["bytes"] += os.path.getsize(src)
+            return real_copy_file(src, dst, *args, **kwargs)
+
+        def counting_extract(archive, dest, *args):
+            extract_dirs.append(dest)
+            real_do_extract(archive, dest, *args)
+            written["bytes"] += sum(len(content) for content in self.files.values())
+
+        def cross_device_replace(src, dst):
+            # Copies are renamed over their destination in the same folder
+            if os.path.dirname(src) != os.path.dirname(dst):
+                raise OSError(extract.errno.EXDEV, "Invalid cross-device link")
+            real_replace(src, dst)
+
+        real_do_extract = extract._do_extract
+        real_replace = os.replace
+        with patch.object(extract, "_do_extract", counting_extract), \
+                patch.object(extract, "copy_file", counting_copy_file), \
+                patch.object(filecopy, "copy_file", counting_copy_file):
+            if fail_renames:
+                with patch.object(extract.os, "replace", cross_device_replace):
+                    extract.extract_archive(self.archive_path, self.destination)
+            else:
+                extract.extract_archive(self.archive_path, self.destination)
+        for name, content in self.files.items():
+            with open(os.path.join(self.destination, name[len("game/"):]), "rb") as game_file:
+                self.assertEqual(game_file.read(), content)
+        self.assertFalse([name for name in os.listdir(self.destination) if name.startswith(".")])
+        return extract_dirs[0], written["bytes"]
+
+    def test_extracts_in_place_to_absent_folder(self):
+        extract_dir, written = self.extract()
+        self.assertEqual(extract_dir, self.destination)
+        self.assertEqual(written, 5120)
+
+    def test_extracts_in_place_to_empty_folder(self):
+        os.makedirs(self.destination)
+        extract_dir, written = self.extract()
+        self.assertEqual(extract_dir, self.destination)
+        self.assertEqual(written, 5120)
+
+    def test_moves_files_to_existing_folder(self):
+        os.makedirs(os.path.join(self.destination, "bin"))
+        with open(os.path.join(self.destination, "bin", "game"), "wb") as old_file:
+            old_file.write(b"old")
+        with open(os.path.join(self.destination, "save"), "wb") as save_file:
+            save_file.write(b"save")
+        extract_dir, written = self.extract()
+        self.assertNotEqual(extract_dir, self.destination)
+        self.assertEqual(written, 5120)
+        self.assertEqual(sorted(os.listdir(self.destination)), ["bin", "data.pak", "save"])
+
+    def test_copies_files_across_filesystems(self):
+        os.makedirs(os.path.join(self.destination, "bin"))
+        with open(os.path.join(self.destination, "save"), "wb") as save_file:
+            save_file.write(b"save")
+        _extract_dir, written = self.extract(fail_renames=True)
+        self.assertEqual(written, 5120 * 2)
+
+    def test_failed_extraction_leaves_nothing(self):
+        with open(self.archive_path, "r+b") as archive_file:
+            archive_file.truncate(700)
+        with self.assertRaises(ExtractFailure):
+            extract.extract_archive(self.archive_path, self.destination)
+        self.assertFalse(os.path.exists(self.destination))
+
+    def test_lifts_single_folder_with_same_name(self):
+        os.makedirs(os.path.join(self.destination, "game"))
+        with open(os.path.join(self.destination, "game", "game"), "w") as game_file:
+            game_file.write("game")
+        extract.lift_single_folder(self.destination)
+        with open(os.path.join(self.destination, "game"), "r") as game_file:
+            self.assertEqual(game_file.read(), "game")
+
+
+class TestRunExtractor(TestCase):
+    def setUp(self):
+        self.archive = tempfile.NamedTemporaryFile()
+        self.archive.write(b"a" * 1000)
+        self.archive.flush()
+
+    def tearDown(self):
+        self.archive.close()
+
+    def test_reports_progress(self):
+        progress = []
+        command = ["sh", "-c", "printf '  5%% 1 - a\\b\\b\\b 50%% 2 - b\\r[====] 100.0%% 12 MiB/s\\nEverything is Ok\\n'"]
+        extract.run_extractor(
+            command,
+            self.archive.name,
+            callback=lambda extract_progress: progress.append(extract_progress.percent)
+        )
+        self.assertEqual(progress, [5, 50, 100])
+
+    def test_failed_extractor_raises(self):
+        with self.assertRaisesRegex(ExtractFailure, "sh exited with code 2"):
+            extract.run_extractor(["sh", "-c", "echo 'ERROR: Data Error'; exit 2"], self.archive.name)
+
+    def test_cancels_extractor(self):
+        cancel_event = threading.Event()
+        cancel_event.set()
+        start_time = time.monotonic()
+        with self.assertRaises(extract.ExtractCancelled):
+            extract.run_extractor(["sleep", "10"], self.archive.name, cancel_event=cancel_event)
+        self.assertLess(time.monotonic() - start_time, 5)
+
+
+class TestDecompress(TestCase):
+    content = os.urandom(1024) * 3000
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def compress(self, module, extension):
+        path = os.path.join(self.tmp_dir, "rom.bin" + extension)
+        with module.open(path, "wb") as compressed_file:
+            compressed_file.write(self.content)
+        return path
+
+    def check_decompress(self, path, compression, threaded):
+        dest_path = os.path.join(self.tmp_dir, "dest")
+        os.makedirs(dest_path)
+        progress = []
+        decompressed_path = extract.decompress(
+            path,
+            dest_path,
+            compression,
+            callback=lambda extract_progress: progress.append(extract_progress.fraction),
+            threaded=threaded
+        )
+        self.assertEqual(decompressed_path, os.path.join(dest_path, "rom.bin"))
+        with open(decompressed_path, "rb") as rom_file:
+            self.assertEqual(rom_file.read(), self.content)
+        self.assertEqual(progress, sorted(progress))
+        self.assertEqual(progress[-1], 1)
+        self.assertGreater(len(progress), 1)
+
+    def test_decompress(self):
+        for module, compression, extension in (
+                (gzip, "gzip", ".gz"),
+                (bz2, "bzip2", ".bz2"),
+                (lzma, "xz", ".xz")
+        ):
+            path = self.compress(module, extension)
+            for threaded in (False, True):
+                with self.subTest(compression=compression, threaded=threaded):
+                    self.check_decompress(path, compression, threaded)
+                    shutil.rmtree(os.path.join(self.tmp_dir, "dest"))
+
+    def test_extract_archive_decompresses_files(self):
+        path = self.compress(lzma, ".xz")
+        extract.extract_archive(path, os.path.join(self.tmp_dir, "dest"))
+        with open(os.path.join(self.tmp_dir, "dest", "rom.bin"), "rb") as rom_file:
+            self.assertEqual(rom_file.read(), self.content)
+
+    def test_corrupt_file_leaves_nothing(self):
+        path = self.compress(gzip, ".gz")
+        with open(path, "r+b") as compressed_file:
+            compressed_file.truncate(os.path.getsize(path) // 2)
+        with self.assertRaises(ExtractFailure):
+            extract.extract_archive(path, self.tmp_dir)
+        self.assertEqual(os.listdir(self.tmp_dir), ["rom.bin.gz"])
+
+
+class TestInstallManifest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.game_dir = os.path.join(self.tmp_dir, "game")
+        os.makedirs(os.path.join(self.game_dir, "saves"))
+        with open(os.path.join(self.game_dir, "saves", "save1"), "w") as save_file:
+            save_file.write("save")
+        self.archive_path = os.path.join(self.tmp_dir, "game.tar.gz")
+        with tarfile.open(self.archive_path, "w:gz") as archive:
+            for name, content in (("game/game.exe", b"exe"), ("game/data/level1", b"level")):
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                archive.addfile(info, io.BytesIO(content))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def get_manifest(self):
+        manifest = InstallManifest(self.game_dir)
+        extract.extract_archive(self.archive_path, self.game_dir, manifest=manifest)
+        return manifest
+
+    def test_records_extracted_files(self):
+        manifest = self.get_manifest()
+        self.assertEqual(sorted(manifest.entries), ["data/level1", "game.exe"])
+        self.assertEqual(manifest.verify(), {})
+
+    def test_records_merged_files(self):
+        manifest = InstallManifest(self.game_dir)
+        source = os.path.join(self.tmp_dir, "patch")
+        os.makedirs(os.path.join(source, "data"))
+        with open(os.path.join(source, "data", "level2"), "w") as level_file:
+            level_file.write("level2")
+        system.merge_folders(source, self.game_dir, manifest=manifest)
+        self.assertEqual(list(manifest.entries), ["data/level2"])
+        self.assertEqual(manifest.verify(), {})
+
+    def test_save_and_load(self):
+        manifest = self.get_manifest()
+        manifest_path = os.path.join(self.tmp_dir, "manifests", "1.manifest")
+        manifest.save(manifest_path)
+        loaded_manifest = InstallManifest(self.game_dir, manifest_path)
+        loaded_manifest.load()
+        self.assertEqual(loaded_manifest.entries, manifest.entries)
+
+    def test_verify(self):
+        manifest = self.get_manifest()
+        os.remove(os.path.join(self.game_dir, "data", "level1"))
+        with open(os.path.join(self.game_dir, "game.exe"), "w") as exe_file:
+            exe_file.write("cracked")
+        self.assertEqual(
+            manifest.verify(),
+            {"data/level1": manifest_module.FILE_MISSING, "game.exe": manifest_module.FILE_MODIFIED}
+        )
+
+    def test_verify_hashes(self):
+        manifest = InstallManifest(self.game_dir)
+        self.get_manifest()
+        manifest.add_tree(self.game_dir, with_hash=True)
+        os.utime(os.path.join(self.game_dir, "game.exe"), (1000000000, 1000000000))
+        self.assertEqual(manifest.verify(check_hashes=True), {})
+        with open(os.path.join(self.game_dir, "game.exe"), "w") as exe_file:
+            exe_file.write("EXE")
+        self.assertEqual(manifest.verify(check_hashes=True), {"game.exe": manifest_module.FILE_MODIFIED})
+
+    def test_remove_files(self):
+        manifest = self.get_manifest()
+        self.assertEqual(manifest.remove_files(), 2)
+        self.assertEqual(os.listdir(self.game_dir), ["saves"])
+
+    def test_remove_game_files(self):
+        manifest_path = os.path.join(self.tmp_dir, "manifests", "1.manifest")
+        with patch.object(manifest_module, "get_manifest_path", return_value=manifest_path):
+            self.assertFalse(manifest_module.remove_game_files(1, self.game_dir))
+            self.get_manifest().save(manifest_path)
+            self.assertTrue(manifest_module.remove_game_files(1, self.game_dir))
+            self.assertEqual(os.listdir(self.game_dir), ["saves"])
+            shutil.rmtree(os.path.join(self.game_dir, "saves"))
+            self.get_manifest().save(manifest_path)
+            self.assertTrue(manifest_module.remove_game_files(1, self.game_dir))
+        self.assertFalse(os.path.exists(self.game_dir))
+
+
+class TestLinuxSystem(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.tmp_dir, "linux_system.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_probes_are_lazy(self):
+        with patch("lutris.util.linux.shutil.which", return_value=None) as which:
+            linux_system = LinuxSystem(self.cache_path)
+            which.assert_not_called()
+            linux_system.get("7z")
+            self.assertEqual(which.call_count, len(SYSTEM_COMPONENTS["COMMANDS"]))
+
+    def test_probes_are_saved(self):
+        with patch("lutris.util.linux.shutil.which", return_value="/usr/bin/command"):
+            LinuxSystem(self.cache_path).get("7z")
+        with patch("lutris.util.linux.shutil.which") as which:
+            linux_system = LinuxSystem(self.cache_path)
+            self.assertEqual(linux_system.get("7z"), "/usr/bin/command")
+            which.assert_not_called()
+
+    def test_probes_are_run_again_when_the_system_changes(self):
+        with patch("lutris.util.linux.shutil.which", return_value="/usr/bin/command"):
+            LinuxSystem(self.cache_path).get("7z")
+        with patch("lutris.util.linux.get_mtime", return_value=1), \
+                patch("lutris.util.linux.shutil.which", return_value=None):
+            self.assertIsNone(LinuxSystem(self.cache_path).get("7z"))
+
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def build_ld_so_cache(libraries, old_format=False):
+    """Return the content of a ld.so.cache file listing the libraries"""
+    arch_flags = {"": 0x0000, "x86-64": 0x0300, "x32": 0x0800}
+    table_size = 48 + 24 * len(libraries)
+    strings = b""
+    entries = b""
+    for name, flags, path in libraries:
+        flags = [flag.strip() for flag in flags.split(",")]
+        hwcap = 0
+        if flags[-1].startswith("hwcap: "):
+            hwcap = int(flags.pop().split()[1], 16)
+        arch = flags[1] if len(flags) > 1 else ""
+        name_offset = table_size + len(strings)
+        strings += name.encode() + b"\0"
+        path_offset = table_size + len(strings)
+        strings += path.encode() + b"\0"
+        entries += struct.pack("<iIIIQ", 0x0003 | arch_flags[arch], name_offset, path_offset, 0, hwcap)
+    header = b"glibc-ld.so.cache1.1" + struct.pack("<IIB3xI12x", len(libraries), len(strings), 2, 0)
+    content = header + entries + strings
+    if old_format:
+        # An empty table in the libc5 format, padded to 8 bytes
+        content = b"ld.so-1.7.0\0" + struct.pack("<I", 0) + content
+    return content
+
+
+class TestSharedLibraryIndex(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.tmp_dir, "shared_libraries.json")
+        self.ld_cache_path = os.path.join(self.tmp_dir, "ld.so.cache")
+        with open(os.path.join(FIXTURES_PATH, "ldconfig-multiarch.txt")) as fixture:
+            self.libraries = parse_ldconfig_output(fixture.read())
+        with open(self.ld_cache_path, "wb") as ld_cache_file:
+            ld_cache_file.write(build_ld_so_cache(self.libraries))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_can_parse_ldconfig_output(self):
+        self.assertEqual(len(self.libraries), 9)
+        self.assertEqual(self.libraries[3], ["libz.so.1", "libc6,x32", "/usr/libx32/libz.so.1"])
+
+    def test_can_parse_ld_so_cache(self):
+        self.assertEqual(parse_ld_so_cache(build_ld_so_cache(self.libraries)), self.libraries)
+        self.assertEqual(parse_ld_so_cache(build_ld_so_cache(self.libraries, old_format=True)), self.libraries)
+        with self.assertRaises(ValueError):
+            parse_ld_so_cache(b"not a cache")
+
+    def test_libraries_are_indexed_by_arch(self):
+        index = SharedLibraryIndex(self.cache_path, self.ld_cache_path)
+        self.assertEqual(index.get_paths("libz.so.1", "x32"), ["/usr/libx32/libz.so.1"])
+        self.assertEqual(index.get_paths("libz.so.1", "i386"), ["/lib/i386-linux-gnu/libz.so.1"])
+        self.assertEqual(len(index.get_paths("libcrypto.so.1.1", "x86_64")), 2)
+        self.assertFalse(index.has_library("libcrypto.so.1.1", "i386"))
+        self.assertEqual(index.get_names(["i386"]), {"libvulkan.so.1", "libz.so.1", "libGL.so.1"})
+
+    def test_lib_folders_are_sorted_by_library_count(self):
+        lib_folders = SharedLibraryIndex(self.cache_path, self.ld_cache_path).get_lib_folders(["i386", "x86_64"])
+        self.assertEqual(lib_folders[-2:], ["/usr/lib/i386-linux-gnu", "/usr/lib/x86_64-linux-gnu"])
+        self.assertEqual(len(lib_folders), 5)
+        self.assertNotIn("/usr/libx32", lib_folders)
+
+    def test_index_is_saved_until_the_cache_changes(self):
+        SharedLibraryIndex(self.cache_path, self.ld_cache_path).entries
+        with patch.object(ldcache, "parse_ld_so_cache") as parse:
+            self.assertEqual(SharedLibraryIndex(self.cache_path, self.ld_cache_path).entries, self.libraries)
+            parse.assert_not_called()
+        os.utime(self.ld_cache_path, ns=(0, 0))
+        with patch.object(ldcache, "parse_ld_so_cache", return_value=[]) as parse:
+            self.assertEqual(SharedLibraryIndex(self.cache_path, self.ld_cache_path).entries, [])
+            parse.assert_called_once()
+
+
+class FakeResponse:
+    """Stand-in for a streamed requests response"""
+
+    def __init__(self, chunks, headers=None, cancel_event=None):
+        self.status_code = 200
+        self.chunks = chunks
+        self.headers = headers or {"Content-Length": str(sum(len(chunk) for chunk in chunks))}
+        # Set before the last chunk is sent
+        self.cancel_event = cancel_event
+        self.chunk_sent = threading.Event()
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=None):
+        for index, chunk in enumerate(self.chunks):
+            if self.cancel_event and index == len(self.chunks) - 1:
+                self.chunk_sent.set()
+                self.cancel_event.wait()
+            yield chunk
+
+
+class TestDownloader(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.dest = os.path.join(self.tmp_dir, "dxvk-1.7.tar.gz")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def download(self, response, wait=True):
+        downloader = Downloader("http://files/dxvk-1.7.tar.gz", self.dest)
+        with patch.object(downloader_module.requests, "get", return_value=response):
+            downloader.start()
+            if wait:
+                downloader.thread.join()
+        return downloader
+
+    def test_file_is_renamed_when_complete(self):
+        downloader = self.download(FakeResponse([b"dxvk", b"1.7"]))
+        self.assertEqual(downloader.state, downloader.COMPLETED)
+        self.assertEqual(downloader.check_progress(), 1.0)
+        self.assertFalse(os.path.exists(downloader.tmp_dest))
+        with open(self.dest, "rb") as dest_file:
+            self.assertEqual(dest_file.read(), b"dxvk1.7")
+
+    def test_progress_is_complete_once_the_file_is_in_place(self):
+        downloader = Downloader("http://files/dxvk-1.7.tar.gz", self.dest)
+        downloader.full_size = downloader.downloaded_size = 7
+        self.assertLess(downloader.check_progress(), 1)
+        downloader.finalized = True
+        self.assertEqual(downloader.check_progress(), 1.0)
+
+    def test_interrupted_download_is_removed(self):
+        downloader = self.download(FakeResponse([b"dxvk"], headers={"Content-Length": "100"}))
+        self.assertEqual(downloader.state, downloader.ERROR)
+        self.assertFalse(os.path.exists(downloader.tmp_dest))
+        self.assertFalse(os.path.exists(self.dest))
+
+    def test_encoded_download_size_is_not_checked(self):
+        downloader = self.download(
+            FakeResponse([b"decoded content"], headers={"Content-Length": "10", "Content-Encoding": "gzip"})
+        )
+        self.assertEqual(downloader.state, downloader.COMPLETED)
+        self.assertTrue(os.path.exists(self.dest))
+
+    def test_encoded_download_is_not_preallocated(self):
+        downloader = self.download(
+            FakeResponse([b"decoded"], headers={"Content-Length": "100", "Content-Encoding": "gzip"})
+        )
+        self.assertEqual(downloader.state, downloader.COMPLETED)
+        with open(self.dest, "rb") as dest_file:
+            self.assertEqual(dest_file.read(), b"decoded")
+
+    def test_completed_download_is_not_cancelled(self):
+        downloader = self.download(FakeResponse([b"dxvk", b"1.7"]))
+        downloader.cancel()
+        self.assertEqual(downloader.state, downloader.COMPLETED)
+        self.assertTrue(os.path.exists(self.dest))
+
+    def test_cancelled_download_is_removed(self):
+        cancel_event = threading.Event()
+        response = FakeResponse([b"dxvk", b"1.7"], cancel_event=cancel_event)
+        downloader = self.download(response, wait=False)
+        response.chunk_sent.wait()
+        downloader.cancel()
+        cancel_event.set()
+        downloader.thread.join()
+        self.assertEqual(downloader.state, downloader.CANCELLED)
+        self.assertFalse(os.path.exists(downloader.tmp_dest))
+        self.assertFalse(os.path.exists(self.dest))
+
+
+class FakeRequest:
+    """Stand-in for http.Request serving the files of a folder"""
+    served_folder = None
+    requested_urls = []
+
+    def __init__(self, url, stop_request=None):
+        self.url = url
+        self.content = b""
+
+    def get(self):
+        self.requested_urls.append(self.url)
+        relpath = urllib.parse.unquote(self.url[len("http://files/"):])
+        with open(os.path.join(self.served_folder, relpath), "rb") as served_file:
+            self.content = served_file.read()
+        return self
+
+
+class TestFolderUpdate(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.old_path = os.path.join(self.tmp_dir, "old")
+        self.new_path = os.path.join(self.tmp_dir, "new")
+        self.local_path = os.path.join(self.tmp_dir, "local")
+        self.write_files(self.old_path, {
+            "lib/libfoo.so.1.0": "foo 1.0",
+            "lib/libbar.so.1": "bar",
+            "share/removed.txt": "removed",
+        })
+        os.symlink("libfoo.so.1.0", os.path.join(self.old_path, "lib/libfoo.so.1"))
+        self.write_files(self.new_path, {
+            "lib/libfoo.so.1.1": "foo 1.1",
+            "lib/libbar.so.1": "bar",
+            "lib/new/libnew.so": "new",
+        })
+        os.symlink("libfoo.so.1.1", os.path.join(self.new_path, "lib/libfoo.so.1"))
+        shutil.copytree(self.old_path, self.local_path, symlinks=True)
+        FakeRequest.served_folder = self.new_path
+        FakeRequest.requested_urls = []
+        request_patch = patch.object(delta_update.http, "Request", FakeRequest)
+        request_patch.start()
+        self.addCleanup(request_patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @staticmethod
+    def write_files(root, files):
+        for relpath, content in files.items():
+            path = os.path.join(root, relpath)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file_handle:
+                file_handle.write(content)
+
+    def test_only_changed_files_are_downloaded(self):
+        result = FolderUpdate(self.local_path, create_manifest(self.new_path), "http://files").run()
+        self.assertEqual(sorted(FakeRequest.requested_urls), [
+            "http://files/lib/libfoo.so.1.1",
+            "http://files/lib/new/libnew.so",
+        ])
+        self.assertEqual(result["downloaded_bytes"], len("foo 1.1") + len("new"))
+        self.assertEqual(result["removed_files"], 2)
+        self.assertEqual(create_manifest(self.local_path), create_manifest(self.new_path))
+        self.assertFalse(os.path.exists(os.path.join(self.local_path, "share")))
+
+    def test_saved_manifest_is_used_by_the_next_update(self):
+        FolderUpdate(self.local_path, create_manifest(self.new_path), "http://files").run()
+        FakeRequest.requested_urls = []
+        with patch.object(delta_update, "create_manifest") as create:
+            result = FolderUpdate(self.local_path, create_manifest(self.new_path), "http://files").run()
+            create.assert_not_called()
+        self.assertEqual(result["downloaded_files"], 0)
+        self.assertEqual(FakeRequest.requested_urls, [])
+
+    def test_folder_is_unchanged_when_a_download_is_invalid(self):
+        manifest = create_manifest(self.new_path)
+        manifest["files"][-1]["sha256"] = "0" * 64
+        with self.assertRaises(DeltaUpdateError):
+            FolderUpdate(self.local_path, manifest, "http://files").run()
+        self.assertEqual(create_manifest(self.local_path), create_manifest(self.old_path))
+
+    def test_paths_outside_the_folder_are_rejected(self):
+        with self.assertRaises(DeltaUpdateError):
+            FolderUpdate(self.local_path, {"files": [{"path": "../evil", "link": "/"}]}, "http://files")
+
+
+class TestFolderGenerations(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "Ubuntu-18.04-x86_64")
+        os.makedirs(self.path)
+        self.write_file(os.path.join(self.path, "libfoo.so"), "1")
+        self.generations = FolderGenerations(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @staticmethod
+    def write_file(path, content):
+        with open(path, "w") as file_handle:
+            file_handle.write(content)
+
+    @staticmethod
+    def read_file(path):
+        with open(path) as file_handle:
+            return file_handle.read()
+
+    def stage(self, content):
+        staging_path = os.path.join(self.generations.create_staging(), "content")
+        os.makedirs(staging_path)
+        self.write_file(os.path.join(staging_path, "libfoo.so"), content)
+        return staging_path
+
+    def test_existing_folder_is_replaced_by_a_generation(self):
+        self.assertIsNone(self.generations.current_generation)
+        self.assertEqual(self.generations.publish(self.stage("2")), 1)
+        self.assertTrue(os.path.islink(self.path))
+        self.assertEqual(self.generations.current_generation, 1)
+        self.assertEqual(self.read_file(os.path.join(self.path, "libfoo.so")), "2")
+        self.assertEqual(self.generations.get_generations(), [0, 1])
+
+    def test_existing_folder_is_replaced_without_exchange(self):
+        with patch.object(generations_module, "exchange_paths", return_value=False):
+            self.generations.publish(self.stage("2"))
+        self.assertEqual(self.read_file(os.path.join(self.path, "libfoo.so")), "2")
+        self.assertEqual(self.generations.get_generations(), [0, 1])
+
+    def test_previous_generation_is_removed_by_the_next_update(self):
+        self.generations.publish(self.stage("2"))
+        self.generations.publish(self.stage("3"))
+        self.assertEqual(self.generations.get_generations(), [1, 2])
+        self.assertEqual(self.read_file(os.path.join(self.path, "libfoo.so")), "3")
+
+    def test_cloned_files_are_not_changed_by_updates(self):
+        self.generations.publish(self.stage("2"))
+        staging_path = os.path.join(self.generations.create_staging(), "content")
+        self.generations.clone_current(staging_path)
+        new_path = os.path.join(staging_path, "libfoo.so.new")
+        self.write_file(new_path, "3")
+        os.replace(new_path, os.path.join(staging_path, "libfoo.so"))
+        self.assertEqual(self.read_file(os.path.join(self.path, "libfoo.so")), "2")
+        self.generations.publish(staging_path)
+        self.assertEqual(self.read_file(os.path.join(self.path, "libfoo.so")), "3")
+
+
+class TestFileDeduplicator(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.runtime_dir = os.path.join(self.tmp_dir, "runtime")
+        self.runner_dir = os.path.join(self.tmp_dir, "runners")
+        self.record_path = os.path.join(self.tmp_dir, "cache", "deduplicated_files.json")
+        self.write_file(os.path.join(self.runtime_dir, "dxvk", "x64", "d3d11.dll"), b"dxvk" * 100)
+        self.write_file(os.path.join(self.runner_dir, "wine", "lutris-5.7", "d3d11.dll"), b"dxvk" * 100)
+        self.write_file(os.path.join(self.runner_dir, "wine", "lutris-5.6", "d3d11.dll"), b"dxvk" * 100)
+        self.write_file(os.path.join(self.runner_dir, "wine", "lutris-5.6", "wined3d.dll"), b"wine" * 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @staticmethod
+    def write_file(path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file_handle:
+            file_handle.write(content)
+
+    def deduplicate(self):
+        deduplicator = FileDeduplicator([self.runtime_dir, self.runner_dir], self.record_path, min_size=1)
+        return deduplicator.run()
+
+    def test_identical_files_are_linked(self):
+        self.assertEqual(self.deduplicate(), {"linked_files": 2, "reclaimed_bytes": 800})
+        dll_stat = os.stat(os.path.join(self.runtime_dir, "dxvk", "x64", "d3d11.dll"))
+        self.assertEqual(dll_stat.st_nlink, 3)
+        self.assertEqual(os.stat(os.path.join(self.runner_dir, "wine", "lutris-5.6", "wined3d.dll")).st_nlink, 1)
+        self.assertEqual(self.deduplicate(), {"linked_files": 0, "reclaimed_bytes": 0})
+
+    def test_files_with_other_modes_are_not_linked(self):
+        os.chmod(os.path.join(self.runner_dir, "wine", "lutris-5.6", "d3d11.dll"), 0o755)
+        self.assertEqual(self.deduplicate()["linked_files"], 1)
+
+    def test_replaced_files_are_linked_again(self):
+        self.deduplicate()
+        replaced_path = os.path.join(self.runner_dir, "wine", "lutris-5.7", "d3d11.dll")
+        self.write_file(replaced_path + ".new", b"dxvk" * 100)
+        os.replace(replaced_path + ".new", replaced_path)
+        self.assertEqual(os.stat(os.path.join(self.runtime_dir, "dxvk", "x64", "d3d11.dll")).st_nlink, 2)
+        with patch("lutris.util.dedup.get_file_hash", wraps=delta_update.get_file_hash) as get_file_hash:
+            self.assertEqual(self.deduplicate(), {"linked_files": 1, "reclaimed_bytes": 400})
+        # Only the replaced file is hashed, the others are in the record
+        get_file_hash.assert_called_once_with(replaced_path)
+
+
+class TestGraphicsInventory(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.root, "graphics.json")
+        self.write_file("sys/class/drm/card0/device/uevent", "DRIVER=amdgpu\nPCI_ID=1002:687F\n")
+        self.write_file("sys/bus/pci/devices/0000:01:00.0/class", "0x030000\n")
+        self.write_file("sys/bus/pci/devices/0000:01:00.0/vendor", "0x1002\n")
+        self.write_file("sys/bus/pci/devices/0000:01:00.0/device", "0x687f\n")
+        self.write_file("sys/bus/pci/devices/0000:00:1f.3/class", "0x040300\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write_file(self, path, content):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file_handle:
+            file_handle.write(content)
+
+    def test_reads_gpus_from_sysfs(self):
+        inventory = GraphicsInventory(self.cache_path, root=self.root)
+        self.assertTrue(inventory.is_amd)
+        self.assertFalse(inventory.is_nvidia)
+        self.assertEqual(inventory.nvidia_gpus, [])
+        self.assertEqual(inventory.gpus["card0"]["PCI_ID"], "1002:687F")
+        self.assertEqual(inventory.graphics_adapters, [("0000:01:00.0", "1002:687f")])
+
+    def test_vulkan_support_is_saved(self):
+        with patch("lutris.util.graphics.inventory.vkquery.is_vulkan_supported", return_value=True) as query:
+            self.assertTrue(GraphicsInventory(self.cache_path, root=self.root).vulkan_supported)
+            self.assertTrue(GraphicsInventory(self.cache_path, root=self.root).vulkan_supported)
+            self.assertEqual(query.call_count, 1)
+
+    def test_vulkan_support_is_probed_again_when_the_driver_changes(self):
+        with patch("lutris.util.graphics.inventory.vkquery.is_vulkan_supported", return_value=True):
+            GraphicsInventory(self.cache_path, root=self.root).vulkan_supported
+        self.write_file("sys/class/drm/card0/device/uevent", "DRIVER=radeon\nPCI_ID=1002:687F\n")
+        with patch("lutris.util.graphics.inventory.vkquery.is_vulkan_supported", return_value=False):
+            self.assertFalse(GraphicsInventory(self.cache_path, root=self.root).vulkan_supported)
+
+
+class TestTracer(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.trace_path = os.path.join(self.tmp_dir, "trace.json")
+        self.tracer = Tracer()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_spans_are_not_recorded_without_trace(self):
+        with self.tracer.span("startup"):
+            pass
+        self.assertEqual(self.tracer.events, [])
+
+    def test_writes_chrome_trace(self):
+        with patch("lutris.util.tracing.atexit.register"):
+            self.tracer.start(self.trace_path)
+        with self.tracer.span("startup"):
+            thread = threading.Thread(target=lambda: self.tracer.instant("job"), name="worker")
+            thread.start()
+            thread.join()
+        self.tracer.save()
+        with open(self.trace_path) as trace_file:
+            events = json.load(trace_file)["traceEvents"]
+        thread_names = {event["tid"]: event["args"]["name"] for event in events if event["ph"] == "M"}
+        span = [event for event in events if event["ph"] == "X"][0]
+        instant = [event for event in events if event["ph"] == "i"][0]
+        self.assertEqual(span["name"], "startup")
+        self.assertLessEqual(span["ts"], instant["ts"])
+        self.assertGreaterEqual(span["ts"] + span["dur"], instant["ts"])
+        self.assertEqual(thread_names[instant["tid"]], "worker")
+
+    def test_get_trace_path(self):
+        self.assertEqual(get_trace_path(["lutris", "--trace", "out.json"]), "out.json")
+        self.assertEqual(get_trace_path(["lutris", "--trace=out.json", "-d"]), "out.json")
+        with patch.dict(os.environ, {"LUTRIS_TRACE": "env.json"}):
+            self.assertEqual(get_trace_path(["lutris"]), "env.json")
+
+
+class TestFixPathCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.tmp_dir, "drive_c/Program Files/Game"))
+        open(os.path.join(self.tmp_dir, "drive_c/Program Files/Game/Game.exe"), "w").close()
+        self.index = CaseInsensitiveIndex()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_fixes_path_case(self):
+        self.assertEqual(
+            system.fix_path_case(os.path.join(self.tmp_dir, "DRIVE_C/program files/game/GAME.EXE"), self.index),
+            os.path.join(self.tmp_dir, "drive_c/Program Files/Game/Game.exe")
+        )
+        self.assertIsNone(
+            system.fix_path_case(os.path.join(self.tmp_dir, "drive_c/program files/other"), self.index)
+        )
+
+    def test_prefers_exact_names(self):
+        os.makedirs(os.path.join(self.tmp_dir, "drive_c/program files/Game"))
+        self.assertEqual(
+            system.fix_path_case(os.path.join(self.tmp_dir, "drive_c/program files/GAME"), self.index),
+            os.path.join(self.tmp_dir, "drive_c/program files/Game")
+        )
+
+    def test_folders_are_listed_once(self):
+        with patch("lutris.util.path_index.os.listdir", wraps=os.listdir) as listdir:
+            for name in ("GAME.EXE", "game.exe", "Game.EXE"):
+                path = os.path.join(self.tmp_dir, "drive_c/program files/game", name)
+                self.assertTrue(system.fix_path_case(path, self.index).endswith("Game/Game.exe"))
+        listed_folders = [call[0][0] for call in listdir.call_args_list]
+        self.assertEqual(len(listed_folders), len(set(listed_folders)))
+
+    def test_changed_folders_are_listed_again(self):
+        game_dir = os.path.join(self.tmp_dir, "drive_c/Program Files/Game")
+        self.index.resolve(os.path.join(game_dir, "game.exe"))
+        open(os.path.join(game_dir, "Setup.exe"), "w").close()
+        self.assertEqual(self.index.resolve(os.path.join(game_dir, "SETUP.EXE")), os.path.join(game_dir, "Setup.exe"))
+        os.rename(os.path.join(game_dir, "Game.exe"), os.path.join(game_dir, "Launcher.exe"))
+        os.utime(game_dir, ns=(0, os.stat(game_dir).st_mtime_ns + 1000000000))
+        self.assertIsNone(self.index.resolve(os.path.join(game_dir, "game.exe")))
+
+
+class TestMergeFolders(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmp_dir, "source")
+        self.destination = os.path.join(self.tmp_dir, "destination")
+        for path, content in (("a", b"a" * 100), ("data/b", b"b"), ("data/empty/c", b"")):
+            path = os.path.join(self.source, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as source_file:
+                source_file.write(content)
+        os.chmod(os.path.join(self.source, "a"), 0o750)
+        os.utime(os.path.join(self.source, "a"), (1000000000, 1000000000))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_merge_folders(self):
+        os.makedirs(os.path.join(self.destination, "data"))
+        with open(os.path.join(self.destination, "data/existing"), "w") as existing_file:
+            existing_file.write("existing")
+        progress = []
+        system.merge_folders(self.source, self.destination, callback=lambda *args: progress.append(args))
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.destination, "data"))),
+            ["b", "empty", "existing"]
+        )
+        with open(os.path.join(self.destination, "a"), "rb") as dest_file:
+            self.assertEqual(dest_file.read(), b"a" * 100)
+        dest_stat = os.stat(os.path.join(self.destination, "a"))
+        self.assertEqual(dest_stat.st_mode & 0o777, 0o750)
+        self.assertEqual(dest_stat.st_mtime, 1000000000)
+        self.assertEqual(progress[-1], (3, 3, 101, 101))
+
+    def test_merge_into_deduplicated_folder(self):
+        os.makedirs(self.destination)
+        linked_path = os.path.join(self.tmp_dir, "linked")
+        with open(linked_path, "w") as linked_file:
+            linked_file.write("linked")
+        os.link(linked_path, os.path.join(self.destination, "a"))
+        system.merge_folders(self.source, self.destination)
+        with open(os.path.join(self.destination, "a"), "rb") as dest_file:
+            self.assertEqual(dest_file.read(), b"a" * 100)
+        with open(linked_path) as linked_file:
+            self.assertEqual(linked_file.read(), "linked")
+        self.assertEqual(sorted(os.listdir(self.destination)), ["a", "data"])
+
+    def test_cancelled_copy(self):
+        folder_copy = FolderCopy(self.source, self.destination)
+        folder_copy.cancel()
+        with self.assertRaises(CopyCancelled):
+            folder_copy.copy()